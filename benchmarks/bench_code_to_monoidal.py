@@ -0,0 +1,74 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Compare Python functions with their translations into monoidal expressions
+
+Run from the top of the repository with
+``python -m benchmarks.bench_code_to_monoidal``.
+"""
+
+import timeit
+
+from mathdonewrong.code_to_monoidal import function_to_monoidal, translation_cache
+from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions, PipelineCategory
+
+def twice(f, x):
+    return f(f(x))
+
+def pick(x, y, z):
+    return z
+
+def compose_abs(f, x):
+    g = lambda y: abs(f(y))
+    return g(x)
+
+CASES = [
+    (twice, (lambda n: n + 1, 5)),
+    (pick, (1, 2, 3)),
+    (compose_abs, (lambda n: n - 10, 3)),
+]
+
+def nest(args: tuple):
+    """Make the left-nested tuple that a translated function takes"""
+    if not args:
+        return None
+
+    value = args[0]
+    for arg in args[1:]:
+        value = (value, arg)
+    return value
+
+def bench(label: str, stmt, number: int):
+    seconds = min(timeit.repeat(stmt, number=number, repeat=5))
+    print(f'  {label:<28} {seconds / number * 1e6:8.2f} us')
+
+def main():
+    number = 20000
+
+    for f, args in CASES:
+        print(f'{f.__name__}:')
+
+        bench('translate (cold cache)', lambda: (translation_cache.clear(), function_to_monoidal(f)), 200)
+        bench('translate (cached)', lambda: function_to_monoidal(f), 200)
+
+        expr = function_to_monoidal(f)
+        unary = expr.evaluate_in(CategoryOfUnaryFunctions(), {})
+        pipeline = PipelineCategory().evaluate(expr, {})
+
+        value = nest(args)
+        assert unary(value) == pipeline(value) == f(*args)
+
+        bench('original function', lambda: f(*args), number)
+        bench('CategoryOfUnaryFunctions', lambda: unary(value), number)
+        bench('PipelineCategory', lambda: pipeline(value), number)
+
+if __name__ == '__main__':
+    main()
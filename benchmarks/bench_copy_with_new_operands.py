@@ -0,0 +1,107 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Measure the cost of rebuilding expression nodes
+
+Each case is measured twice: once with the real node classes, and once with
+baseline classes which store their fields in ``__dict__`` and copy them one
+``setattr`` at a time, the way expression nodes worked before they had
+``__slots__``.
+
+Run from the top of the repository with
+``python -m benchmarks.bench_copy_with_new_operands``.
+"""
+
+import timeit
+
+from mathdonewrong.boolean_algebra.boolexpr import And, Var as BoolVar
+from mathdonewrong.code_to_expression import substitute_vars
+from mathdonewrong.expressions import Expression, Literal, Oper, Var
+from mathdonewrong.monoidal_categories.monoidalexpr import Compose, Var as MonoidalVar
+
+class DictVar(Expression):
+    def __init__(self, name: str):
+        self.name = name
+
+    @property
+    def tag(self):
+        return 'var'
+
+class DictOper(Expression):
+    def __init__(self, name: str, *operands: Expression):
+        self.name = name
+        self.operands = operands
+
+    @property
+    def tag(self):
+        return 'oper'
+
+    def copy_with_new_operands(self, new_operands):
+        copy = type(self).__new__(type(self))
+        for name, value in self.__dict__.items():
+            setattr(copy, name, value)
+        copy.operands = tuple(new_operands)
+        return copy
+
+class DictNamedOper(DictOper):
+    def __init__(self, *operands: Expression):
+        super().__init__(type(self).__name__, *operands)
+
+class DictCompose(DictNamedOper):
+    pass
+
+NODES = [
+    ('Oper', Oper('f', Var('x'), Var('y')), DictOper('f', DictVar('x'), DictVar('y'))),
+    ('BinaryOper (BoolExpr)', And(BoolVar('x'), BoolVar('y')), DictOper('And', DictVar('x'), DictVar('y'))),
+    ('NamedOper (MonoidalExpr)', Compose(MonoidalVar('f'), MonoidalVar('g')), DictCompose(DictVar('f'), DictVar('g'))),
+]
+
+def balanced_tree(depth: int, var=Var, oper=Oper):
+    if depth == 0:
+        return var('x')
+    else:
+        return oper('f', balanced_tree(depth - 1, var, oper), balanced_tree(depth - 1, var, oper))
+
+def compare(label: str, baseline_stmt, current_stmt, number: int, per: int = 1):
+    # The two are timed in alternation, so that a change in the speed of the
+    # machine affects both the same way.
+    baseline_times, current_times = [], []
+    for _ in range(7):
+        baseline_times.append(timeit.timeit(baseline_stmt, number=number))
+        current_times.append(timeit.timeit(current_stmt, number=number))
+
+    baseline = min(baseline_times) / number / per * 1e9
+    current = min(current_times) / number / per * 1e9
+    print(f'  {label:<28} {baseline:8.1f} ns -> {current:8.1f} ns per node ({baseline / current:.2f}x)')
+
+def main():
+    print('copy_with_new_operands (__dict__ baseline -> current):')
+    for label, node, baseline_node in NODES:
+        compare(
+            label,
+            lambda: baseline_node.copy_with_new_operands(baseline_node.operands),
+            lambda: node.copy_with_new_operands(node.operands),
+            200_000)
+
+    size = 2 ** 15 - 1
+    tree = balanced_tree(14)
+    baseline_tree = balanced_tree(14, DictVar, DictOper)
+    context = {'x': Literal(1)}
+
+    print('substitute_vars (__dict__ baseline -> current):')
+    compare(
+        f'balanced tree ({size} nodes)',
+        lambda: substitute_vars(baseline_tree, context),
+        lambda: substitute_vars(tree, context),
+        10, size)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Compare the memory use of expression objects with an ExpressionArena
+
+Run from the top of the repository with
+``python -m benchmarks.bench_expression_arena``.
+"""
+
+import random
+import timeit
+import tracemalloc
+
+from mathdonewrong.expression_arena import ExpressionArena
+from mathdonewrong.expressions import Literal, Oper, Var
+from mathdonewrong.monoidlike.monoids import IntAddition
+
+def random_expr(rng: random.Random, depth: int):
+    if depth == 0:
+        return Var(rng.choice('abcd')) if rng.random() < 0.5 else Literal(rng.randrange(10))
+    else:
+        return Oper('Mop', random_expr(rng, depth - 1), random_expr(rng, depth - 1))
+
+def traced(make):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = make()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main():
+    rng = random.Random(48)
+    exprs, expr_bytes = traced(lambda: [random_expr(rng, 10) for _ in range(200)])
+
+    arena = ExpressionArena()
+    roots, arena_bytes = traced(lambda: arena.add_all(exprs))
+    nodes = len(arena)
+
+    print(f'{nodes} nodes:')
+    print(f'  Expression objects  {expr_bytes / nodes:6.1f} bytes per node')
+    print(f'  ExpressionArena     {arena_bytes / nodes:6.1f} bytes per node '
+          f'({arena.nbytes() / nodes:.1f} in the node arrays)')
+
+    algebra, context = IntAddition(), {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+    for label, stmt in [
+        ('evaluate_in', lambda: [expr.evaluate_in(algebra, context) for expr in exprs]),
+        ('ExpressionArena.evaluate_all', lambda: arena.evaluate_all(algebra, context)),
+    ]:
+        seconds = min(timeit.repeat(stmt, number=1, repeat=5))
+        print(f'  {label:<28} {seconds / nodes * 1e9:6.1f} ns per node')
+
+if __name__ == '__main__':
+    main()
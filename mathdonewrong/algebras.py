@@ -33,9 +33,12 @@ class AlgebraClass(type):
         cls._variety = None
 
     def extract_expr(cls, attr_name):
+        return cls.extract_func_expr(getattr(cls, attr_name))
+
+    def extract_func_expr(cls, func):
         from mathdonewrong.python_exprs.depythonize import depythonize
 
-        source = textwrap.dedent(inspect.getsource(getattr(cls, attr_name)))
+        source = textwrap.dedent(inspect.getsource(func))
         return depythonize(source, cls)
 
     def attr_name_to_oper_name(cls, attr_name):
@@ -56,7 +59,10 @@ class AlgebraClass(type):
                     operator = Operator(member.name)
                     variety.operators.append(operator)
                 elif isinstance(member, AlgebraRelation):
-                    lhs = cls.extract_expr(member.attr_name)
+                    # A subclass may override the relation's method to do
+                    # something else (as MonoidEqualityAlgebra does), so the
+                    # relation is read from the function that declared it.
+                    lhs = cls.extract_func_expr(member.func)
                     rhs = cls.extract_expr(member.attr_name + '_rhs')
                     relation = Relation(lhs, rhs)
                     variety.relations.append(relation)
@@ -81,15 +87,17 @@ class Algebra(metaclass=AlgebraClass):
     functions (implementing the monoid operators) satisfying the monoid axioms.
     """
     def operate(self, operator_name, operands):
+        return self.get_operator(operator_name)(*operands)
+
+    def get_operator(self, operator_name):
+        """Get the method which implements an operator, so it can be looked up once and called many times"""
         if (member := type(self).members.get(operator_name)) is not None:
-            operator = getattr(self, member.attr_name)
+            return getattr(self, member.attr_name)
         elif (operator := getattr(self, oper_name_to_attr_name(operator_name), None)) is not None:
-            pass
+            return operator
         else:
             raise NotImplementedError(f"operator {operator_name} not implemented in {self}")
 
-        return operator(*operands)
-
 @dataclass
 class AlgebraMember:
     name: str
@@ -8,4 +8,4 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
-from mathdonewrong.boolean_algebra.boolexpr import And, BooleanAlgebra, BoolExpr, Const, F, Not, Or, StandardBooleanAlgebra, T, Var
+from mathdonewrong.boolean_algebra.boolexpr import And, BooleanAlgebra, BoolExpr, Const, F, Not, Or, StandardBooleanAlgebra, T, Var, parse
@@ -10,6 +10,7 @@
 
 from mathdonewrong.algebras import Algebra, operator
 import mathdonewrong.expressions as ex
+from mathdonewrong.parsing import Grammar
 
 class BoolExpr(ex.Expression):
     def evaluate(self, context=None):
@@ -52,6 +53,12 @@ class Not(BoolExpr, ex.PrefixOper):
     name = '~'
     precedence = 80
 
+grammar = Grammar(binary=[And, Or], prefix=[Not], constants={'True': T, 'False': F}, var=Var)
+
+def parse(text: str) -> BoolExpr:
+    """Parse a Boolean expression written the way ``str`` writes it, like ``a & ~(b | True)``"""
+    return grammar.parse(text)
+
 class BooleanAlgebra(Algebra):
     @operator('True')
     def true(self):
@@ -32,3 +32,23 @@ class DictCategory(Category):
 
     def compose(self, f: dict[A, B], g: dict[B, C]) -> dict[A, C]:
         return {x: g[f[x]] for x in f}
+
+class EndomorphismMonoid(Monoid):
+    r"""
+    The monoid of arrows from an object to itself
+
+    Given a category and an object :math:`A` of that category, the arrows
+    :math:`A \to A` form a monoid under composition. For example, the
+    permutations of a list ``xs`` in a :class:`DictCategory` form the monoid
+    ``EndomorphismMonoid(DictCategory(), xs)``.
+    """
+
+    def __init__(self, category: Category, obj: Any):
+        self.category = category
+        self.obj = obj
+
+    def id_(self) -> Any:
+        return self.category.id(self.obj)
+
+    def mop_(self, f: Any, g: Any) -> Any:
+        return self.category.compose(f, g)
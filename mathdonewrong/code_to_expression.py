@@ -11,27 +11,28 @@
 import ast
 from ast import NodeVisitor
 import inspect
-from typing import Any, Callable
+import textwrap
+from typing import Any, Callable, Optional
 
-from mathdonewrong.expressions import Expression, Oper, Var
-#from mathdonewrong.lambda_calc.lambda_exprs import Apply, LamConst, LamVar, Lambda
+from mathdonewrong.expressions import Expression, Oper, Substitution
+from mathdonewrong.lambda_calc.lambda_exprs import Apply, LConst, LVar, Lambda
 
-class SubstitutionVisitor:
-    def __init__(self, context: dict[str, Expression]):
-        self.context = context
+class LambdaSubstitution(Substitution):
+    r"""Substitute for the ``LVar``\s in a lambda expression"""
 
-    def visit_var(self, expr: Var) -> Expression:
-        if expr.name in self.context:
-            return self.context[expr.name]
+    def enter_oper(self, expr: Oper) -> Optional[Expression]:
+        if isinstance(expr, LVar):
+            return self.context.get(expr.varname)
         else:
-            return expr
-
-    def visit_oper(self, expr: Oper) -> Expression:
-        new_operands = [operand.traverse(self) for operand in expr.operands]
-        return expr.copy_with_new_operands(new_operands)
+            return None
 
 def substitute_vars(expr: Expression, context: dict[str, Expression]) -> Expression:
-    return expr.traverse(SubstitutionVisitor(context))
+    """Replace the variables in an expression which appear in ``context``
+
+    Only the operators above a replaced variable are copied; everything else is
+    shared with the original expression.
+    """
+    return Substitution(context).fold(expr)
 
 class ExpressionizeNodeVisitor(NodeVisitor):
     def __init__(self):
@@ -59,7 +60,7 @@ class ExpressionizeNodeVisitor(NodeVisitor):
 
     def visit_Return(self, node) -> Expression:
         return_expression = self.visit(node.value)
-        return substitute_vars(return_expression, self.locals)
+        return LambdaSubstitution(self.locals).fold(return_expression)
 
     # Expressions
 
@@ -69,7 +70,7 @@ class ExpressionizeNodeVisitor(NodeVisitor):
         return Apply(func, *args)
 
     def visit_Constant(self, node) -> Expression:
-        return LamConst(repr(node.value))
+        return LConst(repr(node.value))
 
     def visit_Lambda(self, node) -> Expression:
         param, = node.args.args
@@ -78,10 +79,10 @@ class ExpressionizeNodeVisitor(NodeVisitor):
         return Lambda(param_name, body)
 
     def visit_Name(self, node) -> Expression:
-        return LamVar(node.id)
+        return LVar(node.id)
 
 def code_to_expression(f: Callable) -> Expression:
-    tree = ast.parse(inspect.getsource(f))
+    tree = ast.parse(textwrap.dedent(inspect.getsource(f)))
     return ExpressionizeNodeVisitor().visit(tree)
 
 def expressionize(f: Callable) -> Callable:
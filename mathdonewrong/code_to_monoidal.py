@@ -9,59 +9,287 @@
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
 from __future__ import annotations
+from ast import literal_eval
+import builtins
 from dataclasses import dataclass
+from functools import update_wrapper
 import inspect
+from types import CodeType
 from typing import Callable
+from weakref import WeakKeyDictionary
 
-from mathdonewrong.algebras import Algebra
+from mathdonewrong.algebras import Algebra, operator
 from mathdonewrong.code_to_expression import code_to_expression
-#from mathdonewrong.lambda_calc.lambda_exprs import LambdaExpr
-from mathdonewrong.monoidal_categories.monoidalexpr import Compose, Drop, Id, MonoidalExpr, Stack, Unit, Var
+from mathdonewrong.expressions import Transformer
+from mathdonewrong.lambda_calc.lambda_exprs import LambdaExpr
+from mathdonewrong.monoidal_categories.make_braid import VarTree, make_braid
+from mathdonewrong.monoidal_categories.monoidalexpr import Compose, Const, Curry, CurryInv, Exp, Id, Literal, MonoidalExpr, Stack, Unit, UnitLeft, UnitLeftInv, UnitRight
 
-def context_to_object_expr(context: tuple[str, ...]) -> MonoidalExpr:
+# Objects for arrows whose types aren't being worked out. (CategoryOfUnaryFunctions
+# ignores objects anyway.)
+VALUE = Literal('value')
+
+def value_object(var_name: str) -> MonoidalExpr:
+    return VALUE
+
+@dataclass(frozen=True)
+class TypeVariable:
+    """A type which the translation hasn't worked out (or which can be anything)"""
+    number: int
+
+    def __str__(self):
+        return f't{self.number}'
+
+def is_type_variable(A: MonoidalExpr) -> bool:
+    return A.tag == 'literal' and isinstance(A.value, TypeVariable)
+
+class Unifier:
+    r"""Type variables, and what they've turned out to stand for
+
+    Types are object expressions built out of ``Unit``, ``Stack``, ``Exp`` and
+    type variables, which are ``Literal``\s holding :class:`TypeVariable`\s.
+    Type variables are literals, rather than ``Var``\s, so that translated
+    expressions can still be evaluated without a context.
+    """
+
+    def __init__(self):
+        self.bindings: dict[TypeVariable, MonoidalExpr] = {}
+        self.count = 0
+
+    def fresh(self) -> MonoidalExpr:
+        self.count += 1
+        return Literal(TypeVariable(self.count - 1))
+
+    def resolve(self, A: MonoidalExpr) -> MonoidalExpr:
+        """Follow the bindings of a type variable, until reaching a type that isn't a bound variable"""
+        while is_type_variable(A) and A.value in self.bindings:
+            A = self.bindings[A.value]
+        return A
+
+    def occurs(self, var: TypeVariable, A: MonoidalExpr) -> bool:
+        stack = [A]
+
+        while stack:
+            A = self.resolve(stack.pop())
+            if is_type_variable(A):
+                if A.value == var:
+                    return True
+            else:
+                stack.extend(A.operands)
+
+        return False
+
+    def unify(self, A: MonoidalExpr, B: MonoidalExpr):
+        """Make two types equal, binding type variables as needed
+
+        Raise ``TypeError`` if that can't be done.
+        """
+        stack = [(A, B)]
+
+        while stack:
+            A, B = stack.pop()
+            A, B = self.resolve(A), self.resolve(B)
+
+            if is_type_variable(B) and not is_type_variable(A):
+                A, B = B, A
+
+            if is_type_variable(A):
+                if is_type_variable(B) and A.value == B.value:
+                    continue
+                if self.occurs(A.value, B):
+                    raise TypeError(f"the type {A} would have to contain itself: {self.substitute(B)}")
+                self.bindings[A.value] = B
+            elif A.tag == 'oper' and B.tag == 'oper' and A.name == B.name and len(A.operands) == len(B.operands):
+                stack.extend(zip(A.operands, B.operands))
+            else:
+                raise TypeError(f"the types {self.substitute(A)} and {self.substitute(B)} don't match")
+
+    def substitute(self, expr: MonoidalExpr) -> MonoidalExpr:
+        """Replace each bound type variable in an expression (an arrow or an object) by its type"""
+        return TypeSubstitution(self).fold(expr)
+
+class TypeSubstitution(Transformer):
+    def __init__(self, unifier: Unifier):
+        self.unifier = unifier
+        self.resolved: dict[TypeVariable, MonoidalExpr] = {}
+
+    def fold_literal(self, expr: Literal) -> MonoidalExpr:
+        if not is_type_variable(expr) or expr.value not in self.unifier.bindings:
+            return expr
+
+        if (resolved := self.resolved.get(expr.value)) is None:
+            resolved = self.resolved[expr.value] = self.fold(self.unifier.bindings[expr.value])
+        return resolved
+
+def context_to_vartree(context: tuple[str, ...]) -> VarTree:
+    tree = None
+
+    for var_name in context:
+        if tree is None:
+            tree = var_name
+        else:
+            tree = (tree, var_name)
+
+    return tree
+
+def context_to_object_expr(
+        context: tuple[str, ...], object_of: Callable[[str], MonoidalExpr] = value_object) -> MonoidalExpr:
     expr = None
 
     for var_name in context:
         if expr is None:
-            expr = Var(var_name)
+            expr = object_of(var_name)
         else:
-            expr = Stack(expr, Var(var_name))
+            expr = Stack(expr, object_of(var_name))
 
     return expr or Unit()
 
+def merge_contexts(*contexts: tuple[str, ...]) -> tuple[str, ...]:
+    return tuple(dict.fromkeys(name for context in contexts for name in context))
+
 @dataclass
 class MonoidalExprWithContext():
+    """A monoidal expression whose domain is a context of variables
+
+    The domain of ``expr`` is the left-nested ``Stack`` of the types of the
+    variables in ``context`` (or ``Unit()`` if the context is empty). ``types``
+    gives the type of each variable in the context, and ``codomain`` is the
+    type of the result.
+    """
+
     context: tuple[str, ...]
     expr: MonoidalExpr
+    types: dict[str, MonoidalExpr]
+    codomain: MonoidalExpr
 
     @staticmethod
-    def var(name: str) -> MonoidalExprWithContext:
-        return MonoidalExprWithContext((name,), Var(name))
+    def var(name: str, A: MonoidalExpr = VALUE) -> MonoidalExprWithContext:
+        return MonoidalExprWithContext((name,), Id(A), {name: A}, A)
+
+    def adjust_context(self, new_context: tuple[str, ...], types: dict[str, MonoidalExpr]) -> MonoidalExprWithContext:
+        """Change the domain to a different context, whose variables have the given types"""
+        new_types = {name: types[name] for name in new_context}
 
-    def adjust_context(self, new_context: tuple[str, ...]) -> MonoidalExprWithContext:
         if self.context == new_context:
-            return self
+            return MonoidalExprWithContext(new_context, self.expr, new_types, self.codomain)
         else:
-            adjustment = MonoidalExprWithContext.make_adjustment(self.context, new_context)
-            new_expr = Compose(adjustment, self)
-            return MonoidalExprWithContext(new_context, new_expr)
+            adjustment = MonoidalExprWithContext.make_adjustment(self.context, new_context, types.__getitem__)
+            new_expr = Compose(adjustment, self.expr)
+            return MonoidalExprWithContext(new_context, new_expr, new_types, self.codomain)
 
     @staticmethod
-    def make_adjustment(old_context: tuple[str, ...], new_context: tuple[str, ...]) -> MonoidalExpr:
-        if old_context == new_context:
-            domain = context_to_object_expr(new_context)
-            return Id(domain)
+    def make_adjustment(
+            old_context: tuple[str, ...], new_context: tuple[str, ...],
+            object_of: Callable[[str], MonoidalExpr] = value_object) -> MonoidalExpr:
+        """Make an arrow from the new context to the old one
+
+        Every variable in the old context has to be in the new context; the
+        rest are dropped. Raise ``ValueError`` if either context contains a
+        variable more than once. The type of each variable is given by
+        ``object_of``.
+        """
+        for context in [old_context, new_context]:
+            if len(set(context)) != len(context):
+                raise ValueError(f"the context {context} contains a variable more than once")
+
+        return make_braid(context_to_vartree(new_context), context_to_vartree(old_context), object_of)
+
+def pair_up(left: MonoidalExprWithContext, right: MonoidalExprWithContext, unifier: Unifier) -> MonoidalExprWithContext:
+    """Combine two expressions into one which produces a pair
+
+    A variable used by both expressions must have the same type in both.
+    """
+    types = dict(left.types)
+    for name, A in right.types.items():
+        if name in types:
+            unifier.unify(types[name], A)
+        else:
+            types[name] = A
+
+    context = merge_contexts(left.context, right.context)
+    split = make_braid(
+        context_to_vartree(context),
+        (context_to_vartree(left.context), context_to_vartree(right.context)),
+        types.__getitem__)
 
-        elif len(old_context) == 0:
-            domain = context_to_object_expr(new_context)
-            return Drop(domain)
+    return MonoidalExprWithContext(
+        context, Compose(split, Stack(left.expr, right.expr)), types, Stack(left.codomain, right.codomain))
 
 class LambdaToMonoidalAlgebra(Algebra):
-    pass
+    r"""Translate lambda expressions into :class:`MonoidalExprWithContext`\s
+
+    Along the way, every variable and subexpression is given a simple type,
+    with type variables standing for anything not pinned down by the way it's
+    used. Once the whole expression has been translated, :meth:`finish`
+    replaces each type variable with what it turned out to be, so that the
+    result typechecks.
+    """
+
+    def __init__(self):
+        self.unifier = Unifier()
+
+    @operator('LVar')
+    def l_var(self, name: str) -> MonoidalExprWithContext:
+        return MonoidalExprWithContext.var(name, self.unifier.fresh())
+
+    @operator('LConst')
+    def l_const(self, value_repr: str) -> MonoidalExprWithContext:
+        A = self.unifier.fresh()
+        return MonoidalExprWithContext((), Const(A, Literal(literal_eval(value_repr))), {}, A)
+
+    @operator('Lambda')
+    def lambda_(self, param: str, body: MonoidalExprWithContext) -> MonoidalExprWithContext:
+        # The body is an arrow from (outer context) * param, which gets curried
+        # into an arrow from the outer context.
+        param_type = body.types.get(param) or self.unifier.fresh()
+        outer_context = tuple(name for name in body.context if name != param)
+        body_expr = body.adjust_context(outer_context + (param,), {**body.types, param: param_type}).expr
+
+        if not outer_context:
+            body_expr = Compose(UnitLeftInv(param_type), body_expr)
+
+        outer_types = {name: body.types[name] for name in outer_context}
+        return MonoidalExprWithContext(outer_context, Curry(body_expr), outer_types, Exp(param_type, body.codomain))
+
+    @operator('Apply')
+    def apply(self, func: MonoidalExprWithContext, *args: MonoidalExprWithContext) -> MonoidalExprWithContext:
+        # Calls with several arguments pass all of them as a single
+        # left-nested tuple, the same way expressionize_m functions take them.
+        if not args:
+            arg = MonoidalExprWithContext((), Id(Unit()), {}, Unit())
+        else:
+            arg = args[0]
+            for next_arg in args[1:]:
+                arg = pair_up(arg, next_arg, self.unifier)
+
+        result_type = self.unifier.fresh()
+        func_type = Exp(arg.codomain, result_type)
+        self.unifier.unify(func.codomain, func_type)
+
+        func_and_arg = pair_up(func, arg, self.unifier)
+        evaluate = CurryInv(Id(func_type))
+        return MonoidalExprWithContext(
+            func_and_arg.context, Compose(func_and_arg.expr, evaluate), func_and_arg.types, result_type)
+
+    def with_types(self, translated: MonoidalExprWithContext, context: tuple[str, ...]) -> dict[str, MonoidalExpr]:
+        """The types of the variables in a context, making up new ones for variables that aren't used"""
+        return {name: translated.types.get(name) or self.unifier.fresh() for name in context}
+
+    def finish(self, translated: MonoidalExprWithContext) -> MonoidalExprWithContext:
+        """Fill in the types that have been worked out"""
+        substitute = self.unifier.substitute
+        return MonoidalExprWithContext(
+            translated.context,
+            substitute(translated.expr),
+            {name: substitute(A) for name, A in translated.types.items()},
+            substitute(translated.codomain))
 
 class LambdaToMonoidalVarDict():
+    def __init__(self, algebra: LambdaToMonoidalAlgebra):
+        self.algebra = algebra
+
     def __getitem__(self, key: str):
-        return MonoidalExprWithContext.var(key)
+        return self.algebra.l_var(key)
 
 def expression_to_monoidal(context: tuple[str, ...], expr: LambdaExpr) -> MonoidalExpr:
     """Convert a lambda expression to an equivalent monoidal expression
@@ -71,13 +299,116 @@ def expression_to_monoidal(context: tuple[str, ...], expr: LambdaExpr) -> Monoid
     the given context, and the codomain corresponds to the return type of the
     lambda expression.
     """
+    algebra = LambdaToMonoidalAlgebra()
+    translated = expr.evaluate_in(algebra, LambdaToMonoidalVarDict(algebra))
+    translated = translated.adjust_context(context, algebra.with_types(translated, context))
+    return algebra.finish(translated).expr
+
+# Translations of functions, keyed on their code objects. A translation still
+# has the function's free variables (globals, builtins and closure variables)
+# in its context; their values are filled in by bind_free_vars. The keys are
+# weak, so that translations go away along with the functions they're for.
+translation_cache: WeakKeyDictionary[CodeType, MonoidalExprWithContext] = WeakKeyDictionary()
+
+def parameters(f: Callable) -> tuple[str, ...]:
+    code = f.__code__
+    return code.co_varnames[:code.co_argcount + code.co_kwonlyargcount]
+
+def translate_function(f: Callable) -> MonoidalExprWithContext:
+    code = f.__code__
+
+    if (cached := translation_cache.get(code)) is not None:
+        return cached
+
+    algebra = LambdaToMonoidalAlgebra()
+    translated = code_to_expression(f).evaluate_in(algebra, LambdaToMonoidalVarDict(algebra))
+
+    params = parameters(f)
+    context = params + tuple(name for name in translated.context if name not in params)
+    translated = algebra.finish(translated.adjust_context(context, algebra.with_types(translated, context)))
+
+    translation_cache[code] = translated
+    return translated
+
+def free_var_values(f: Callable, names: tuple[str, ...]) -> list:
+    closure_vars = inspect.getclosurevars(f)
+    scopes = [closure_vars.nonlocals, closure_vars.globals, closure_vars.builtins, vars(builtins)]
+
+    values = []
+    for name in names:
+        for scope in scopes:
+            if name in scope:
+                values.append(scope[name])
+                break
+        else:
+            raise ValueError(f"{f.__name__} refers to {name}, which isn't defined")
+
+    return values
+
+def constants(types: list[MonoidalExpr], values: list) -> MonoidalExpr:
+    """Make an arrow from the unit to a left-nested tuple of constants of the given types"""
+    expr = Const(types[0], Literal(values[0]))
+
+    for A, value in zip(types[1:], values[1:]):
+        expr = Compose(UnitLeft(Unit()), Stack(expr, Const(A, Literal(value))))
+
+    return expr
+
+def bind_free_vars(f: Callable, translated: MonoidalExprWithContext) -> MonoidalExpr:
+    params = parameters(f)
+    free_vars = translated.context[len(params):]
+
+    if not free_vars:
+        return translated.expr
+
+    object_of = translated.types.__getitem__
+    consts = constants([object_of(name) for name in free_vars], free_var_values(f, free_vars))
+
+    if not params:
+        return Compose(consts, translated.expr)
+
+    # params -> params * 1 -> params * free_vars
+    params_obj = context_to_object_expr(params, object_of)
+    with_consts = Compose(UnitRight(params_obj), Stack(Id(params_obj), consts))
+
+    # Make the free variables part of the same left-nested tuple as the params.
+    regroup = make_braid(
+        (context_to_vartree(params), context_to_vartree(free_vars)),
+        context_to_vartree(translated.context),
+        object_of)
+
+    return Compose(Compose(with_consts, regroup), translated.expr)
+
+def function_to_monoidal(f: Callable) -> MonoidalExpr:
+    """Translate a Python function into a monoidal expression
+
+    The domain of the expression is the left-nested tuple of the function's
+    parameters. The translation of each code object is cached, so translating
+    the same function again only needs to look up the values of its free
+    variables.
+    """
+    return bind_free_vars(f, translate_function(f))
+
+class MonoidalFunction:
+    """A function, along with its translation into a monoidal expression
+
+    The translation is made when :attr:`expression` is used, not when the
+    function is defined, and the function's free variables are looked up
+    again each time, just as they are each time the function is called. So
+    the function can use globals which are defined after it, and the
+    expression sees globals which have been changed.
+    """
+
+    def __init__(self, f: Callable):
+        update_wrapper(self, f)
+        self.f = f
+
+    def __call__(self, *args, **kwargs):
+        return self.f(*args, **kwargs)
 
-    monoidal_w_context = expr.evaluate_in(LambdaToMonoidalAlgebra(), LambdaToMonoidalVarDict())
-    monoidal_w_context_adjusted = monoidal_w_context.adjust_context(context)
-    return monoidal_w_context_adjusted.expr
+    @property
+    def expression(self) -> MonoidalExpr:
+        return function_to_monoidal(self.f)
 
-def expressionize_m(f: Callable) -> Callable:
-    lambda_expr = code_to_expression(f)
-    params = tuple(inspect.signature(f).parameters)
-    f.expression = expression_to_monoidal(params, lambda_expr)
-    return f
+def expressionize_m(f: Callable) -> MonoidalFunction:
+    return MonoidalFunction(f)
@@ -0,0 +1,442 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+E-graphs and equality saturation
+
+A :class:`~mathdonewrong.rewriting.RewriteSystem` applies each rule in one
+direction, and once a rule has been applied, the original expression is gone.
+That's a problem when a rule needs to be applied "backwards" before a better
+simplification becomes possible.
+
+An :class:`EGraph` stores many equivalent expressions at once. Each *e-class*
+is a set of expressions which are known to be equal, and each *e-node* is an
+operator applied to e-classes (rather than to expressions). Applying a rewrite
+rule never removes anything; it only adds the right-hand side and merges it
+into the same e-class as the left-hand side. When no rule adds anything new,
+the e-graph is *saturated*, and every expression which the rules can reach is
+in it. Then :meth:`EGraph.extract` picks the cheapest expression out of an
+e-class, according to a cost model.
+
+Saturation often never happens (associativity alone generates exponentially
+many expressions), so :meth:`EGraph.run` stops after a number of iterations,
+once the e-graph has too many nodes, or after a time limit.
+
+.. autoclass:: EGraph
+   :members:
+
+.. autofunction:: rules_from_relations
+
+.. autofunction:: saturate
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+from mathdonewrong.expression_table import Key
+from mathdonewrong.expressions import Expression, Oper
+from mathdonewrong.rewriting import Rule, is_rule
+from mathdonewrong.varieties import Relation, Variety
+
+# A cost model is given the key of an e-node (with e-class ids in place of
+# operands) and the costs of its operands, and returns the cost of the e-node.
+Cost = Callable[[Key, list[float]], float]
+
+def size_cost(key: Key, operand_costs: list[float]) -> float:
+    """The default cost model: the number of nodes in an expression"""
+    return 1 + sum(operand_costs)
+
+def rules_from_relations(relations: Iterable[Relation | tuple[Expression, Expression]]) -> list[Rule]:
+    r"""Make rewrite rules out of relations, in both directions where possible
+
+    ``relations`` can be :class:`~mathdonewrong.varieties.Relation`\s or pairs of
+    expressions. A direction is left out if its left-hand side is a variable or
+    its right-hand side has variables which its left-hand side doesn't.
+    """
+    rules = []
+
+    for relation in relations:
+        lhs, rhs = (relation.lhs, relation.rhs) if isinstance(relation, Relation) else relation
+
+        if is_rule(lhs, rhs):
+            rules.append(Rule(lhs, rhs))
+        if is_rule(rhs, lhs):
+            rules.append(Rule(rhs, lhs))
+
+    return rules
+
+def rules_from_variety(variety: Variety) -> list[Rule]:
+    return rules_from_relations(variety.relations)
+
+@dataclass
+class Report:
+    """What happened during :meth:`EGraph.run`
+
+    ``stop_reason`` is one of ``'saturated'``, ``'iteration limit'``, ``'node
+    limit'`` or ``'time limit'``.
+    """
+
+    iterations: int
+    stop_reason: str
+    nodes: int
+    classes: int
+
+class EGraph:
+    """
+    A union-find over e-classes, with a hash-consed table of e-nodes
+
+    E-nodes have keys like those of
+    :class:`~mathdonewrong.expression_table.ExpressionTable`, except that the
+    operands of ``('oper', name, operand_ids)`` are e-class ids. Each e-node
+    also records the class of the expression node it was made from, so that
+    extraction gives nodes of the same classes.
+    """
+
+    def __init__(self):
+        self.parent: list[int] = []
+        self.hashcons: dict[Key, int] = {}
+        # The e-nodes of each e-class, with their node classes, in the order
+        # they were added, so that ties in extraction are broken the same way
+        # every time
+        self.nodes: dict[int, dict[Key, Optional[type]]] = {}
+        self.uses: dict[int, list[tuple[Key, int]]] = {}
+        self.pending: list[int] = []
+
+        # Expressions used to build extracted expressions: the original
+        # variables and literals, and an example of each operator of each
+        # class, so that the results have the same classes as the expressions
+        # that were added.
+        self.leaves: dict[Key, Expression] = {}
+        self.templates: dict[tuple[type, str], Oper] = {}
+
+    def __len__(self) -> int:
+        """The number of e-nodes"""
+        return len(self.hashcons)
+
+    def find(self, class_id: int) -> int:
+        parent = self.parent
+
+        while parent[class_id] != class_id:
+            parent[class_id] = parent[parent[class_id]]
+            class_id = parent[class_id]
+
+        return class_id
+
+    def canonicalize(self, key: Key) -> Key:
+        if key[0] != 'oper':
+            return key
+        return ('oper', key[1], tuple(self.find(operand_id) for operand_id in key[2]))
+
+    def add_key(self, key: Key, node_class: Optional[type] = None) -> int:
+        """Get the e-class of an e-node, adding the e-node if necessary
+
+        ``node_class`` is the class of an operator e-node, which should have an
+        entry in ``templates``. It's only used if the e-node is new.
+        """
+        key = self.canonicalize(key)
+
+        if (class_id := self.hashcons.get(key)) is not None:
+            return self.find(class_id)
+
+        class_id = len(self.parent)
+        self.parent.append(class_id)
+        self.hashcons[key] = class_id
+        self.nodes[class_id] = {key: node_class}
+        self.uses[class_id] = []
+
+        if key[0] == 'oper':
+            for operand_id in set(key[2]):
+                self.uses.setdefault(operand_id, []).append((key, class_id))
+
+        return class_id
+
+    def add(self, expr: Expression) -> int:
+        """Add an expression, returning its e-class
+
+        This doesn't use recursion, so it works on arbitrarily deep expressions.
+        """
+        results: dict[int, int] = {}
+        stack = [(expr, False)]
+
+        while stack:
+            node, operands_done = stack.pop()
+            if id(node) in results:
+                continue
+
+            tag = node.tag
+            if tag == 'var':
+                key = ('var', node.name)
+                self.leaves.setdefault(key, node)
+            elif tag == 'literal':
+                key = ('literal', node.value)
+                self.leaves.setdefault(key, node)
+            elif operands_done:
+                key = ('oper', node.name, tuple(results[id(operand)] for operand in node.operands))
+                self.templates.setdefault((type(node), node.name), node)
+            else:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands)
+                continue
+
+            results[id(node)] = self.add_key(key, type(node))
+
+        return results[id(expr)]
+
+    def union(self, class1: int, class2: int) -> bool:
+        """Merge two e-classes, returning whether they were different
+
+        Call :meth:`rebuild` afterwards, before searching the e-graph again.
+        """
+        class1, class2 = self.find(class1), self.find(class2)
+        if class1 == class2:
+            return False
+
+        if len(self.nodes[class1]) < len(self.nodes[class2]):
+            class1, class2 = class2, class1
+
+        self.parent[class2] = class1
+        self.nodes[class1].update(self.nodes.pop(class2))
+        self.uses.setdefault(class1, []).extend(self.uses.pop(class2, []))
+        self.pending.append(class1)
+        return True
+
+    def rebuild(self):
+        """Restore the invariants broken by :meth:`union`
+
+        E-nodes whose operands were merged are re-canonicalized, and e-nodes
+        which have become the same (like ``f(a)`` and ``f(b)`` after merging
+        ``a`` and ``b``) have their e-classes merged in turn.
+        """
+        while self.pending:
+            todo = {self.find(class_id) for class_id in self.pending}
+            self.pending = []
+            for class_id in todo:
+                self.repair(class_id)
+
+        for class_id, keys in self.nodes.items():
+            canonical = {}
+            for key, node_class in keys.items():
+                canonical.setdefault(self.canonicalize(key), node_class)
+            self.nodes[class_id] = canonical
+
+    def repair(self, class_id: int):
+        uses = self.uses.pop(class_id, [])
+
+        for key, user_id in uses:
+            self.hashcons.pop(key, None)
+            self.hashcons[self.canonicalize(key)] = self.find(user_id)
+
+        new_uses: dict[Key, int] = {}
+        for key, user_id in uses:
+            key = self.canonicalize(key)
+            if (other_id := new_uses.get(key)) is not None:
+                self.union(user_id, other_id)
+            new_uses[key] = self.find(user_id)
+
+        self.uses.setdefault(self.find(class_id), []).extend(new_uses.items())
+
+    def equivalent(self, expr1: Expression, expr2: Expression) -> bool:
+        """Tell whether two expressions are known to be equal"""
+        return self.find(self.add(expr1)) == self.find(self.add(expr2))
+
+    def match(self, pattern: Expression, class_id: int, bindings: dict[str, int]) -> Iterator[dict[str, int]]:
+        """Find the ways a pattern matches some e-node in an e-class
+
+        Each result extends ``bindings`` with the e-classes that the pattern's
+        variables are bound to. It also has an entry for each operator in the
+        pattern, keyed on the class and name of the operator, giving the class
+        of the first e-node that the operator matched; :meth:`instantiate`
+        uses these to build new e-nodes with the classes of the ones they
+        replace.
+        """
+        tag = pattern.tag
+
+        if tag == 'var':
+            bound = bindings.get(pattern.name)
+            if bound is None:
+                yield {**bindings, pattern.name: class_id}
+            elif bound == class_id:
+                yield bindings
+        elif tag == 'literal':
+            if ('literal', pattern.value) in self.nodes[class_id]:
+                yield bindings
+        else:
+            name, arity = pattern.name, len(pattern.operands)
+            operator = (type(pattern), name)
+            for key, node_class in list(self.nodes[class_id].items()):
+                if key[0] == 'oper' and key[1] == name and len(key[2]) == arity:
+                    if operator not in bindings:
+                        key_bindings = {**bindings, operator: node_class}
+                    else:
+                        key_bindings = bindings
+                    yield from self.match_operands(pattern.operands, key[2], key_bindings)
+
+    def match_operands(self, patterns, class_ids, bindings) -> Iterator[dict[str, int]]:
+        if not patterns:
+            yield bindings
+            return
+
+        for new_bindings in self.match(patterns[0], class_ids[0], bindings):
+            yield from self.match_operands(patterns[1:], class_ids[1:], new_bindings)
+
+    def search(self, pattern: Expression) -> list[tuple[int, dict[str, int]]]:
+        """Find every match of a pattern in the e-graph"""
+        if pattern.tag == 'oper':
+            name, arity = pattern.name, len(pattern.operands)
+            candidates = [class_id for class_id, keys in self.nodes.items()
+                          if any(key[0] == 'oper' and key[1] == name and len(key[2]) == arity for key in keys)]
+        else:
+            candidates = list(self.nodes)
+
+        return [(class_id, bindings)
+                for class_id in candidates
+                for bindings in self.match(pattern, class_id, {})]
+
+    def instantiate(self, pattern: Expression, bindings: dict) -> int:
+        """Add a pattern with its variables replaced by e-classes, returning its e-class
+
+        An operator of the same class and name as one that was matched (as
+        recorded in ``bindings`` by :meth:`match`) gets the class of the e-node
+        it matched; any other operator keeps its own class.
+        """
+        results: dict[int, int] = {}
+        stack = [(pattern, False)]
+
+        while stack:
+            node, operands_done = stack.pop()
+
+            if node.tag == 'var':
+                results[id(node)] = bindings[node.name]
+            elif node.tag == 'literal':
+                key = ('literal', node.value)
+                self.leaves.setdefault(key, node)
+                results[id(node)] = self.add_key(key)
+            elif not operands_done:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands)
+            else:
+                operator = (type(node), node.name)
+                self.templates.setdefault(operator, node)
+                node_class = bindings.get(operator, type(node))
+                operand_ids = tuple(results[id(operand)] for operand in node.operands)
+                results[id(node)] = self.add_key(('oper', node.name, operand_ids), node_class)
+
+        return results[id(pattern)]
+
+    def run(self, rules: Iterable[Rule], iter_limit: int = 30, node_limit: int = 10_000,
+            time_limit: Optional[float] = 5.0) -> Report:
+        """Apply rules until the e-graph is saturated or a limit is reached
+
+        Each iteration finds all the matches of all the rules first, and only
+        then adds the right-hand sides, so the order of the rules doesn't
+        matter. ``time_limit`` is in seconds, and may be ``None``. It's checked
+        after searching for each rule and after applying each match, so an
+        iteration can be cut short.
+        """
+        rules = list(rules)
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        self.rebuild()
+
+        def report(iterations: int, stop_reason: str) -> Report:
+            return Report(iterations, stop_reason, len(self.hashcons), len(self.nodes))
+
+        def out_of_time() -> bool:
+            return deadline is not None and time.monotonic() > deadline
+
+        for iteration in range(1, iter_limit + 1):
+            cut_short = False
+            matches = []
+            for rule in rules:
+                if cut_short := out_of_time():
+                    break
+                matches.extend((rule, class_id, bindings) for class_id, bindings in self.search(rule.lhs))
+
+            changed = False
+            for rule, class_id, bindings in matches:
+                if len(self.hashcons) > node_limit or (cut_short := out_of_time()):
+                    break
+                changed |= self.union(class_id, self.instantiate(rule.rhs, bindings))
+
+            self.rebuild()
+
+            if cut_short:
+                return report(iteration, 'time limit')
+            elif not changed:
+                return report(iteration, 'saturated')
+            elif len(self.hashcons) > node_limit:
+                return report(iteration, 'node limit')
+            elif out_of_time():
+                return report(iteration, 'time limit')
+
+        return report(iter_limit, 'iteration limit')
+
+    def best_nodes(self, cost: Cost = size_cost) -> dict[int, tuple[float, Key]]:
+        """Find the cheapest e-node in each e-class
+
+        The cost of an operator should be greater than the costs of its
+        operands, or the cheapest "expression" might be infinitely deep.
+        """
+        self.rebuild()
+        best: dict[int, tuple[float, Key]] = {}
+
+        changed = True
+        while changed:
+            changed = False
+            for class_id, keys in self.nodes.items():
+                for key in keys:
+                    if key[0] == 'oper':
+                        if not all(operand_id in best for operand_id in key[2]):
+                            continue
+                        node_cost = cost(key, [best[operand_id][0] for operand_id in key[2]])
+                    else:
+                        node_cost = cost(key, [])
+
+                    if class_id not in best or node_cost < best[class_id][0]:
+                        best[class_id] = (node_cost, key)
+                        changed = True
+
+        return best
+
+    def extract(self, class_id: int, cost: Cost = size_cost) -> tuple[float, Expression]:
+        """Find the cheapest expression in an e-class, along with its cost"""
+        best = self.best_nodes(cost)
+        root = self.find(class_id)
+        results: dict[int, Expression] = {}
+        stack = [(root, False)]
+
+        while stack:
+            class_id, operands_done = stack.pop()
+            if class_id in results:
+                continue
+
+            key = best[class_id][1]
+            if key[0] != 'oper':
+                results[class_id] = self.leaves[key]
+            elif not operands_done:
+                stack.append((class_id, True))
+                stack.extend((operand_id, False) for operand_id in key[2])
+            else:
+                operands = [results[operand_id] for operand_id in key[2]]
+                template = self.templates[self.nodes[class_id][key], key[1]]
+                results[class_id] = template.copy_with_new_operands(operands)
+
+        return best[root][0], results[root]
+
+def saturate(expr: Expression, rules: Iterable[Rule], cost: Cost = size_cost, **limits) -> Expression:
+    """Find the cheapest expression equal to ``expr`` under some rules
+
+    ``limits`` are passed on to :meth:`EGraph.run`.
+    """
+    egraph = EGraph()
+    class_id = egraph.add(expr)
+    egraph.run(rules, **limits)
+    return egraph.extract(class_id, cost)[1]
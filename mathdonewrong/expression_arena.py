@@ -0,0 +1,285 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+Compact storage for large numbers of expressions
+
+Each :class:`~mathdonewrong.expressions.Expression` node is a Python object,
+which costs around a hundred bytes even with ``__slots__``. An
+:class:`ExpressionArena` instead stores nodes as rows of a few parallel
+``array.array``\s, so a node costs a few dozen bytes:
+
+* ``kinds``: whether each node is a variable, a literal or an operator;
+* ``symbols``: for variables and operators, an index into the table of names;
+  for literals, an index into the pool of literal values;
+* ``operand_starts`` and ``operands``: the operands of node ``i`` are the nodes
+  ``operands[operand_starts[i]:operand_starts[i + 1]]``;
+* ``node_classes``: an index into a small table of the node classes used, so
+  that converting back to expressions gives nodes of the same classes as the
+  ones that were added.
+
+Nodes are always added after their operands, so evaluating the nodes in order
+of their ids computes every operand before it's needed.
+
+Variables and literals are rebuilt from their classes. Operators are rebuilt
+by copying an operand-less example of each operator and class, which keeps any
+attributes an operator class stores on its instances.
+
+.. autoclass:: ExpressionArena
+   :members:
+"""
+
+from __future__ import annotations
+from array import array
+from typing import Any, Iterable, Optional
+
+from mathdonewrong.expressions import Expression, Literal, Oper, Var
+
+VAR = 0
+LITERAL = 1
+OPER = 2
+
+KIND_TAGS = ('var', 'literal', 'oper')
+
+class ExpressionArena:
+    """
+    A collection of expressions stored as parallel arrays
+
+    If ``share_equal`` is true, equal subexpressions of the same class are
+    stored only once (much as in
+    :class:`~mathdonewrong.expression_table.ExpressionTable`), at the cost of
+    keeping a dictionary of every node. Otherwise, only subexpressions which
+    are the same object are shared.
+    """
+
+    def __init__(self, share_equal: bool = False):
+        self.kinds = array('B')
+        self.symbols = array('i')
+        self.operand_starts = array('q', [0])
+        self.operands = array('i')
+        self.node_classes = array('H')
+
+        # The table of node classes starts with the plain classes, so that the
+        # class id of a plain node is its kind.
+        self.classes: list[type] = [Var, Literal, Oper]
+        self.class_ids: dict[type, int] = {cls: i for i, cls in enumerate(self.classes)}
+
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+        self.literals: list[Any] = []
+        self.literal_ids: dict[tuple, int] = {}
+
+        # An operator with no operands for each (class id, symbol), which is
+        # copied when converting back to expressions.
+        self.templates: dict[tuple[int, int], Oper] = {}
+
+        self.share_equal = share_equal
+        self.node_ids: dict[tuple, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def nbytes(self) -> int:
+        """The number of bytes used by the node arrays"""
+        arrays = (self.kinds, self.symbols, self.operand_starts, self.operands, self.node_classes)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def name_id(self, name: str) -> int:
+        if (name_id := self.name_ids.get(name)) is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def literal_id(self, value) -> int:
+        try:
+            # The type is part of the key so that, for example, True and 1 are
+            # kept apart.
+            key = (type(value), value)
+            hash(key)
+        except TypeError:
+            self.literals.append(value)
+            return len(self.literals) - 1
+
+        if (literal_id := self.literal_ids.get(key)) is None:
+            literal_id = self.literal_ids[key] = len(self.literals)
+            self.literals.append(value)
+        return literal_id
+
+    def class_id(self, cls: type) -> int:
+        if (class_id := self.class_ids.get(cls)) is None:
+            class_id = self.class_ids[cls] = len(self.classes)
+            self.classes.append(cls)
+        return class_id
+
+    def add_node(self, kind: int, symbol: int, operand_ids: Iterable[int] = (), class_id: Optional[int] = None) -> int:
+        """Add a node whose operands are already in the arena, returning its id
+
+        If ``class_id`` isn't given, the node is a plain ``Var``, ``Literal``
+        or ``Oper``.
+        """
+        operand_ids = tuple(operand_ids)
+        if class_id is None:
+            class_id = kind
+
+        if self.share_equal:
+            key = (kind, symbol, class_id, operand_ids)
+            if (node_id := self.node_ids.get(key)) is not None:
+                return node_id
+
+        node_id = len(self.kinds)
+        self.kinds.append(kind)
+        self.symbols.append(symbol)
+        self.operands.extend(operand_ids)
+        self.operand_starts.append(len(self.operands))
+        self.node_classes.append(class_id)
+
+        if self.share_equal:
+            self.node_ids[key] = node_id
+
+        return node_id
+
+    def add(self, expr: Expression) -> int:
+        """Add an expression, returning the id of its root node
+
+        This doesn't use recursion, so it works on arbitrarily deep expressions.
+        """
+        results: dict[int, int] = {}
+        stack = [(expr, False)]
+
+        while stack:
+            node, operands_done = stack.pop()
+            if id(node) in results:
+                continue
+
+            tag = node.tag
+            if tag == 'var':
+                kind, symbol, operand_ids = VAR, self.name_id(node.name), ()
+            elif tag == 'literal':
+                kind, symbol, operand_ids = LITERAL, self.literal_id(node.value), ()
+            elif operands_done:
+                kind, symbol = OPER, self.name_id(node.name)
+                operand_ids = [results[id(operand)] for operand in node.operands]
+            else:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands)
+                continue
+
+            class_id = self.class_id(type(node))
+            if kind == OPER and (class_id, symbol) not in self.templates:
+                self.templates[class_id, symbol] = node.copy_with_new_operands(())
+
+            results[id(node)] = self.add_node(kind, symbol, operand_ids, class_id)
+
+        return results[id(expr)]
+
+    def add_all(self, exprs: Iterable[Expression]) -> list[int]:
+        return [self.add(expr) for expr in exprs]
+
+    def tag(self, node_id: int) -> str:
+        return KIND_TAGS[self.kinds[node_id]]
+
+    def name(self, node_id: int) -> str:
+        """The name of a variable or operator node"""
+        if self.kinds[node_id] == LITERAL:
+            raise ValueError(f"node {node_id} is a literal, which has no name")
+        return self.names[self.symbols[node_id]]
+
+    def value(self, node_id: int):
+        """The value of a literal node"""
+        if self.kinds[node_id] != LITERAL:
+            raise ValueError(f"node {node_id} is not a literal")
+        return self.literals[self.symbols[node_id]]
+
+    def operand_ids(self, node_id: int) -> array:
+        return self.operands[self.operand_starts[node_id]:self.operand_starts[node_id + 1]]
+
+    def reachable(self, root_id: int) -> list[int]:
+        """The ids of the nodes in the expression with the given root, in increasing order"""
+        operands, starts = self.operands, self.operand_starts
+        seen = {root_id}
+        stack = [root_id]
+
+        while stack:
+            node_id = stack.pop()
+            for operand_id in operands[starts[node_id]:starts[node_id + 1]]:
+                if operand_id not in seen:
+                    seen.add(operand_id)
+                    stack.append(operand_id)
+
+        return sorted(seen)
+
+    def template(self, class_id: int, symbol: int) -> Oper:
+        if (template := self.templates.get((class_id, symbol))) is None:
+            cls = self.classes[class_id]
+            template = self.templates[class_id, symbol] = cls.__new__(cls)
+            template.name = self.names[symbol]
+            template.operands = ()
+        return template
+
+    def to_expr(self, root_id: int) -> Expression:
+        """Convert the expression with the given root back into ``Expression`` objects
+
+        A node which is shared in the arena becomes a single shared object.
+        """
+        kinds, symbols, operands, starts = self.kinds, self.symbols, self.operands, self.operand_starts
+        node_classes, classes, names, literals = self.node_classes, self.classes, self.names, self.literals
+        results: dict[int, Expression] = {}
+
+        for node_id in self.reachable(root_id):
+            kind, symbol, class_id = kinds[node_id], symbols[node_id], node_classes[node_id]
+
+            if kind == OPER:
+                operand_exprs = [results[i] for i in operands[starts[node_id]:starts[node_id + 1]]]
+                results[node_id] = self.template(class_id, symbol).copy_with_new_operands(operand_exprs)
+            else:
+                # Leaves are built without calling __init__, as
+                # copy_with_new_operands does for operators.
+                cls = classes[class_id]
+                node = results[node_id] = cls.__new__(cls)
+                if kind == VAR:
+                    node.name = names[symbol]
+                else:
+                    node.value = literals[symbol]
+
+        return results[root_id]
+
+    def evaluate(self, root_id: int, algebra, context: Optional[dict[str, Any]] = None):
+        """Evaluate the expression with the given root in an algebra
+
+        This does the same thing as ``evaluate_in`` on a plain expression, but
+        walks the arrays directly, and looks up each operator only once.
+        """
+        return self.evaluate_nodes(self.reachable(root_id), algebra, context, {})[root_id]
+
+    def evaluate_all(self, algebra, context: Optional[dict[str, Any]] = None) -> list:
+        """Evaluate every node in the arena, returning a list of values indexed by node id"""
+        return self.evaluate_nodes(range(len(self)), algebra, context, [None] * len(self))
+
+    def evaluate_nodes(self, node_ids: Iterable[int], algebra, context: Optional[dict[str, Any]], values):
+        """Evaluate some nodes, in order, storing the results in ``values`` (a dict or list)"""
+        kinds, symbols, operands, starts = self.kinds, self.symbols, self.operands, self.operand_starts
+        names, literals = self.names, self.literals
+        context = context or {}
+        operators: dict[int, Any] = {}
+        get_value = values.__getitem__
+
+        for node_id in node_ids:
+            kind, symbol = kinds[node_id], symbols[node_id]
+
+            if kind == OPER:
+                if (operator := operators.get(symbol)) is None:
+                    operator = operators[symbol] = algebra.get_operator(names[symbol])
+                values[node_id] = operator(*map(get_value, operands[starts[node_id]:starts[node_id + 1]]))
+            elif kind == LITERAL:
+                values[node_id] = literals[symbol]
+            else:
+                values[node_id] = context[names[symbol]]
+
+        return values
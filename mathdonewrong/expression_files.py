@@ -0,0 +1,523 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+A binary file format for expressions
+
+A file holds a sequence of expressions. It's laid out like this:
+
+* a header: the magic bytes ``MDWEXPR\0`` and a format version;
+* node records, one for each node, in the order they were written. A record
+  is a kind (variable, literal or operator, as in
+  :mod:`~mathdonewrong.expression_arena`), a class (an index into the class
+  table), a symbol (an index into the name table or the literal table), an
+  arity, and the node ids of the operands, all little-endian. Operands always
+  come before the nodes that use them;
+* the name table, the literal table and the class table;
+* an index giving the file offset of each node record, and the node id of the
+  root of each expression;
+* a footer giving the offset and length of each of those tables.
+
+The tables come after the node records so that :class:`ExpressionWriter` can
+write each expression as soon as it's given one, keeping only the tables in
+memory. Literals can be ``None``, ``bool``\s, ``int``\s, ``float``\s,
+``str``\s or ``bytes``; nothing is pickled.
+
+As in an :class:`~mathdonewrong.expression_arena.ExpressionArena`, each node's
+class is recorded, so reading a file gives back nodes of the same classes that
+were written. Classes are recorded by module and qualified name, and looked up
+(importing the module if need be) when the file is read. Nodes are rebuilt
+without calling ``__init__``, by setting a variable's name, a literal's value,
+or an operator's name and operands; an operator class which keeps other
+attributes needs an example of each such operator to be passed as a template.
+
+:func:`read_expressions` reads a file one expression at a time.
+:class:`MappedExpressions` maps a file into memory with ``mmap`` instead, so
+that many processes can share one read-only copy, and only the parts which are
+actually looked at get decoded. The mapping itself can't be sent to another
+process, so pickling a :class:`MappedExpressions` pickles its path, and
+unpickling it maps the file again.
+
+.. autoclass:: ExpressionWriter
+   :members:
+
+.. autofunction:: read_expressions
+
+.. autoclass:: MappedExpressions
+   :members:
+"""
+
+from __future__ import annotations
+from array import array
+import mmap
+import struct
+import sys
+from importlib import import_module
+from typing import Any, BinaryIO, Iterable, Iterator
+
+from mathdonewrong.expression_arena import LITERAL, OPER, VAR
+from mathdonewrong.expressions import Expression, Literal, Oper, Var
+
+MAGIC = b'MDWEXPR\0'
+VERSION = 2
+
+HEADER = struct.Struct('<8sI4x')
+RECORD = struct.Struct('<BxHiI')
+FOOTER = struct.Struct('<10Q8s')
+
+# Tags for the types of literal values
+NONE, FALSE, TRUE, INT, BIG_INT, FLOAT, STR, BYTES = range(8)
+
+INT64 = struct.Struct('<q')
+FLOAT64 = struct.Struct('<d')
+LENGTH = struct.Struct('<I')
+
+def encode_literal(value) -> bytes:
+    if value is None:
+        return bytes([NONE])
+    elif value is False:
+        return bytes([FALSE])
+    elif value is True:
+        return bytes([TRUE])
+    elif type(value) is int:
+        if -2**63 <= value < 2**63:
+            return bytes([INT]) + INT64.pack(value)
+        digits = str(value).encode('ascii')
+        return bytes([BIG_INT]) + LENGTH.pack(len(digits)) + digits
+    elif type(value) is float:
+        return bytes([FLOAT]) + FLOAT64.pack(value)
+    elif type(value) is str:
+        data = value.encode('utf-8')
+        return bytes([STR]) + LENGTH.pack(len(data)) + data
+    elif type(value) is bytes:
+        return bytes([BYTES]) + LENGTH.pack(len(value)) + value
+    else:
+        raise TypeError(f"can't write a literal of type {type(value).__name__}")
+
+def little_endian_bytes(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def decode_literal(buffer, offset: int) -> tuple[Any, int]:
+    """Decode the literal at ``offset``, returning it and the offset just after it"""
+    tag = buffer[offset]
+    offset += 1
+
+    if tag == NONE:
+        return None, offset
+    elif tag == FALSE:
+        return False, offset
+    elif tag == TRUE:
+        return True, offset
+    elif tag == INT:
+        return INT64.unpack_from(buffer, offset)[0], offset + INT64.size
+    elif tag == FLOAT:
+        return FLOAT64.unpack_from(buffer, offset)[0], offset + FLOAT64.size
+
+    length, = LENGTH.unpack_from(buffer, offset)
+    offset += LENGTH.size
+    data = bytes(buffer[offset:offset + length])
+    offset += length
+
+    if tag == BIG_INT:
+        return int(data.decode('ascii')), offset
+    elif tag == STR:
+        return data.decode('utf-8'), offset
+    elif tag == BYTES:
+        return data, offset
+    else:
+        raise ValueError(f"unknown literal tag {tag}")
+
+def decode_names(buffer, offset: int, count: int) -> list[str]:
+    names = []
+    for _ in range(count):
+        length, = LENGTH.unpack_from(buffer, offset)
+        offset += LENGTH.size
+        names.append(bytes(buffer[offset:offset + length]).decode('utf-8'))
+        offset += length
+    return names
+
+def decode_classes(buffer, offset: int, count: int) -> list[type]:
+    return [find_class(path) for path in decode_names(buffer, offset, count)]
+
+def decode_literals(buffer, offset: int, count: int) -> list:
+    literals = []
+    for _ in range(count):
+        value, offset = decode_literal(buffer, offset)
+        literals.append(value)
+    return literals
+
+def class_path(cls: type) -> str:
+    """Name a node class as ``module:qualname``, checking that it can be found again"""
+    path = f'{cls.__module__}:{cls.__qualname__}'
+    if '<' in cls.__qualname__ or find_class(path) is not cls:
+        raise TypeError(f"can't write a node of class {cls.__qualname__}, "
+                        "which isn't defined at the top level of a module")
+    return path
+
+def find_class(path: str) -> type:
+    """Find the node class named by :func:`class_path`"""
+    module_name, _, qualname = path.partition(':')
+    try:
+        found = import_module(module_name)
+        for part in qualname.split('.'):
+            found = getattr(found, part)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"can't find the node class {path}") from e
+
+    if not (isinstance(found, type) and issubclass(found, Expression)):
+        raise ValueError(f"{path} is not an expression class")
+    return found
+
+class NodeBuilder:
+    """Builds nodes out of records, given the tables of a file"""
+
+    def __init__(self, names: list[str], literals: list, classes: list[type], templates: Iterable[Oper]):
+        self.names = names
+        self.literals = literals
+        self.classes = classes
+        self.templates: dict[tuple[type, str], Oper] = {
+            (type(template), template.name): template for template in templates}
+
+    def template(self, cls: type, name: str) -> Oper:
+        if (template := self.templates.get((cls, name))) is None:
+            template = self.templates[cls, name] = cls.__new__(cls)
+            template.name = name
+            template.operands = ()
+        return template
+
+    def build(self, kind: int, class_id: int, symbol: int, operands: list[Expression]) -> Expression:
+        cls = self.classes[class_id]
+        if kind == OPER:
+            return self.template(cls, self.names[symbol]).copy_with_new_operands(operands)
+
+        node = cls.__new__(cls)
+        if kind == VAR:
+            node.name = self.names[symbol]
+        else:
+            node.value = self.literals[symbol]
+        return node
+
+class ExpressionWriter:
+    """
+    Writes expressions to a binary file, one at a time
+
+    The file must be opened for writing in binary mode. Nothing is readable
+    until :meth:`close` has written the tables at the end; using the writer as
+    a context manager does that automatically. Closing the writer doesn't close
+    the file.
+
+    Nodes are shared within an expression when they're the same object, but not
+    between expressions, so each expression can be read back on its own.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.offset = 0
+        self.node_offsets = array('Q')
+        self.roots = array('Q')
+
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+        self.literals: list[bytes] = []
+        self.literal_ids: dict[bytes, int] = {}
+
+        # As in ExpressionArena, the class table starts with the plain classes.
+        self.classes: list[type] = [Var, Literal, Oper]
+        self.class_ids: dict[type, int] = {cls: i for i, cls in enumerate(self.classes)}
+
+        self.emit(HEADER.pack(MAGIC, VERSION))
+
+    def __enter__(self) -> ExpressionWriter:
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+
+    def emit(self, data: bytes):
+        self.file.write(data)
+        self.offset += len(data)
+
+    def name_id(self, name: str) -> int:
+        if (name_id := self.name_ids.get(name)) is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def literal_id(self, value) -> int:
+        encoded = encode_literal(value)
+        # The encoding includes the type, so True and 1 are kept apart.
+        if (literal_id := self.literal_ids.get(encoded)) is None:
+            literal_id = self.literal_ids[encoded] = len(self.literals)
+            self.literals.append(encoded)
+        return literal_id
+
+    def class_id(self, cls: type) -> int:
+        if (class_id := self.class_ids.get(cls)) is None:
+            class_path(cls)
+            class_id = self.class_ids[cls] = len(self.classes)
+            self.classes.append(cls)
+        return class_id
+
+    def write_node(self, node: Expression, kind: int, symbol: int, operand_ids: list[int]) -> int:
+        node_id = len(self.node_offsets)
+        class_id = self.class_id(type(node))
+        self.node_offsets.append(self.offset)
+        self.emit(RECORD.pack(kind, class_id, symbol, len(operand_ids)) + struct.pack(f'<{len(operand_ids)}I', *operand_ids))
+        return node_id
+
+    def write(self, expr: Expression) -> int:
+        """Write an expression, returning its index in the file
+
+        This doesn't use recursion, so it works on arbitrarily deep expressions.
+        """
+        results: dict[int, int] = {}
+        stack = [(expr, False)]
+
+        while stack:
+            node, operands_done = stack.pop()
+            if id(node) in results:
+                continue
+
+            tag = node.tag
+            if tag == 'var':
+                results[id(node)] = self.write_node(node, VAR, self.name_id(node.name), [])
+            elif tag == 'literal':
+                results[id(node)] = self.write_node(node, LITERAL, self.literal_id(node.value), [])
+            elif operands_done:
+                operand_ids = [results[id(operand)] for operand in node.operands]
+                results[id(node)] = self.write_node(node, OPER, self.name_id(node.name), operand_ids)
+            else:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands)
+
+        self.roots.append(results[id(expr)])
+        return len(self.roots) - 1
+
+    def close(self):
+        """Write the tables and the footer"""
+        names_offset = self.offset
+        for name in self.names:
+            data = name.encode('utf-8')
+            self.emit(LENGTH.pack(len(data)) + data)
+
+        literals_offset = self.offset
+        self.emit(b''.join(self.literals))
+
+        classes_offset = self.offset
+        for cls in self.classes:
+            data = class_path(cls).encode('utf-8')
+            self.emit(LENGTH.pack(len(data)) + data)
+
+        index_offset = self.offset
+        self.emit(little_endian_bytes(self.node_offsets))
+
+        roots_offset = self.offset
+        self.emit(little_endian_bytes(self.roots))
+
+        self.emit(FOOTER.pack(names_offset, len(self.names), literals_offset, len(self.literals),
+                              classes_offset, len(self.classes), index_offset, len(self.node_offsets), roots_offset, len(self.roots), MAGIC))
+
+def write_expressions(file: BinaryIO, exprs: Iterable[Expression]) -> int:
+    """Write a sequence of expressions to a file, returning how many there were"""
+    with ExpressionWriter(file) as writer:
+        for expr in exprs:
+            writer.write(expr)
+        return len(writer.roots)
+
+def read_footer(header: bytes, footer: bytes) -> tuple[int, ...]:
+    """Check the header and footer of a file, returning the offsets and lengths of the tables"""
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError("this isn't an expression file")
+
+    _, version = HEADER.unpack(header)
+    if version != VERSION:
+        raise ValueError(f"can't read version {version} of the expression file format")
+
+    if len(footer) < FOOTER.size or footer[-len(MAGIC):] != MAGIC:
+        raise ValueError("the expression file is incomplete")
+
+    *fields, _ = FOOTER.unpack(footer)
+    return tuple(fields)
+
+def read_expressions(file: BinaryIO, templates: Iterable[Oper] = ()) -> Iterator[Expression]:
+    """Read the expressions in a file, one at a time
+
+    The file must be seekable, since the tables are at the end. Only the nodes
+    of one expression are kept in memory at a time.
+
+    Each node is read as a node of the class it was written as. An operator of
+    the same class and name as one of ``templates`` is made by copying the
+    template, which keeps any other attributes the template has (so, for
+    example, ``[T, F]`` gives Boolean constants their values).
+    """
+    start = file.tell()
+
+    file.seek(0, 2)
+    end = file.tell()
+    if end - start < HEADER.size + FOOTER.size:
+        raise ValueError("this isn't an expression file")
+
+    file.seek(end - FOOTER.size)
+    footer = file.read(FOOTER.size)
+    file.seek(start)
+    header = file.read(HEADER.size)
+
+    (names_offset, n_names, literals_offset, n_literals, classes_offset, n_classes,
+     index_offset, n_nodes, roots_offset, n_roots) = read_footer(header, footer)
+
+    file.seek(start + names_offset)
+    tables = file.read(index_offset - names_offset)
+    builder = NodeBuilder(
+        decode_names(tables, 0, n_names),
+        decode_literals(tables, literals_offset - names_offset, n_literals),
+        decode_classes(tables, classes_offset - names_offset, n_classes),
+        templates)
+
+    file.seek(start + roots_offset)
+    roots = struct.unpack(f'<{n_roots}Q', file.read(8 * n_roots))
+
+    file.seek(start + HEADER.size)
+    nodes: dict[int, Expression] = {}
+    node_id = 0
+
+    for root in roots:
+        while node_id <= root:
+            kind, class_id, symbol, arity = RECORD.unpack(file.read(RECORD.size))
+            operand_ids = struct.unpack(f'<{arity}I', file.read(4 * arity))
+            operands = [nodes[operand_id] for operand_id in operand_ids]
+            nodes[node_id] = builder.build(kind, class_id, symbol, operands)
+            node_id += 1
+
+        yield nodes[root]
+        nodes.clear()
+
+class MappedExpressions:
+    """
+    An expression file mapped into memory
+
+    The name and literal tables are decoded when the file is opened; node
+    records are only decoded when they're asked for. Indexing gives the
+    expressions in the file, built on demand, and :meth:`expr` builds the
+    subexpression rooted at any node. ``templates`` is as in
+    :func:`read_expressions`.
+
+    Use it as a context manager, or call :meth:`close`, to unmap the file.
+    Pickling it (to send it to a worker process, say) pickles only the path and
+    the templates, so the file has to be at the same path when it's unpickled.
+    """
+
+    def __init__(self, path: str, templates: Iterable[Oper] = ()):
+        self.path = path
+        self.templates = tuple(templates)
+
+        with open(path, 'rb') as file:
+            file.seek(0, 2)
+            if file.tell() < HEADER.size + FOOTER.size:
+                raise ValueError("this isn't an expression file")
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = self.buffer
+        (names_offset, n_names, literals_offset, n_literals, classes_offset, n_classes,
+         self.index_offset, self.n_nodes, self.roots_offset, self.n_roots) = \
+            read_footer(buffer[:HEADER.size], buffer[len(buffer) - FOOTER.size:])
+
+        self.builder = NodeBuilder(
+            decode_names(buffer, names_offset, n_names),
+            decode_literals(buffer, literals_offset, n_literals),
+            decode_classes(buffer, classes_offset, n_classes),
+            self.templates)
+        self.names = self.builder.names
+        self.literals = self.builder.literals
+
+    def __reduce__(self):
+        return (MappedExpressions, (self.path, self.templates))
+
+    def __enter__(self) -> MappedExpressions:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+
+    def __len__(self) -> int:
+        """The number of expressions in the file"""
+        return self.n_roots
+
+    def __getitem__(self, index: int) -> Expression:
+        return self.expr(self.root(index))
+
+    def __iter__(self) -> Iterator[Expression]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def root(self, index: int) -> int:
+        """The node id of the root of an expression"""
+        if not 0 <= index < self.n_roots:
+            raise IndexError(f"expression index {index} out of range")
+        return struct.unpack_from('<Q', self.buffer, self.roots_offset + 8 * index)[0]
+
+    def node(self, node_id: int) -> tuple[int, int, int, tuple[int, ...]]:
+        """Decode a node record, giving its kind, class id, symbol and operand ids"""
+        if not 0 <= node_id < self.n_nodes:
+            raise IndexError(f"node id {node_id} out of range")
+
+        offset, = struct.unpack_from('<Q', self.buffer, self.index_offset + 8 * node_id)
+        kind, class_id, symbol, arity = RECORD.unpack_from(self.buffer, offset)
+        operand_ids = struct.unpack_from(f'<{arity}I', self.buffer, offset + RECORD.size)
+        return kind, class_id, symbol, operand_ids
+
+    def tag(self, node_id: int) -> str:
+        return ('var', 'literal', 'oper')[self.node(node_id)[0]]
+
+    def name(self, node_id: int) -> str:
+        kind, _, symbol, _ = self.node(node_id)
+        if kind == LITERAL:
+            raise ValueError(f"node {node_id} is a literal, which has no name")
+        return self.names[symbol]
+
+    def value(self, node_id: int):
+        kind, _, symbol, _ = self.node(node_id)
+        if kind != LITERAL:
+            raise ValueError(f"node {node_id} is not a literal")
+        return self.literals[symbol]
+
+    def operand_ids(self, node_id: int) -> tuple[int, ...]:
+        return self.node(node_id)[3]
+
+    def node_class(self, node_id: int) -> type:
+        """The class of a node"""
+        return self.builder.classes[self.node(node_id)[1]]
+
+    def expr(self, node_id: int) -> Expression:
+        """Build the subexpression rooted at a node, decoding only the nodes in it"""
+        results: dict[int, Expression] = {}
+        stack = [(node_id, None)]
+
+        while stack:
+            current, record = stack.pop()
+            if current in results:
+                continue
+
+            if record is None:
+                record = self.node(current)
+                stack.append((current, record))
+                stack.extend((operand_id, None) for operand_id in record[3] if operand_id not in results)
+            else:
+                kind, class_id, symbol, operand_ids = record
+                operands = [results[operand_id] for operand_id in operand_ids]
+                results[current] = self.builder.build(kind, class_id, symbol, operands)
+
+        return results[node_id]
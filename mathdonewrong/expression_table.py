@@ -0,0 +1,107 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Tables of interned expressions
+
+An :class:`ExpressionTable` assigns a small integer id to each distinct
+expression it sees (this is often called "hash-consing"). Two expressions get
+the same id if and only if they're equal, so once expressions have been
+interned, they can be compared in constant time.
+
+.. autoclass:: ExpressionTable
+   :members:
+"""
+
+from __future__ import annotations
+from typing import Hashable, Sequence
+
+from mathdonewrong.expressions import Expression, Oper
+
+Key = tuple[Hashable, ...]
+
+class ExpressionTable:
+    """
+    Hash-consed table of expressions
+
+    Each distinct expression is stored once, along with a *key*: ``('var',
+    name)``, ``('literal', value)``, or ``('oper', name, operand_ids)``. Keys
+    follow the same notion of equality as ``Expression.__eq__``, so, for
+    example, a ``Var`` and a ``MonVar`` with the same name get the same id.
+    Literal values must be hashable.
+    """
+
+    def __init__(self):
+        self.ids: dict[Key, int] = {}
+        self.keys: list[Key] = []
+        self.exprs: list[Expression] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: Key, expr: Expression) -> int:
+        if (expr_id := self.ids.get(key)) is None:
+            expr_id = self.ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.exprs.append(expr)
+
+        return expr_id
+
+    def intern(self, expr: Expression) -> int:
+        """Get the id of an expression, adding it (and its subexpressions) if necessary
+
+        This doesn't use recursion, so it works on arbitrarily deep expressions.
+        """
+        results: dict[int, int] = {}
+        stack = [(expr, False)]
+
+        while stack:
+            node, operands_done = stack.pop()
+            if id(node) in results:
+                continue
+
+            tag = node.tag
+            if tag == 'var':
+                key = ('var', node.name)
+            elif tag == 'literal':
+                key = ('literal', node.value)
+            elif operands_done:
+                key = ('oper', node.name, tuple(results[id(operand)] for operand in node.operands))
+            else:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands)
+                continue
+
+            results[id(node)] = self.add(key, node)
+
+        return results[id(expr)]
+
+    def intern_oper(self, template: Oper, operand_ids: Sequence[int]) -> int:
+        """Get the id of an operator applied to already-interned operands
+
+        The operator's name (and, if the result is new, its class) is taken from
+        ``template``. This takes constant time, not counting the operands.
+        """
+        operand_ids = tuple(operand_ids)
+        key = ('oper', template.name, operand_ids)
+
+        if (expr_id := self.ids.get(key)) is not None:
+            return expr_id
+
+        expr = template.copy_with_new_operands([self.exprs[i] for i in operand_ids])
+        return self.add(key, expr)
+
+    def expr(self, expr_id: int) -> Expression:
+        """Get the expression with the given id"""
+        return self.exprs[expr_id]
+
+    def key(self, expr_id: int) -> Key:
+        """Get the key of the expression with the given id"""
+        return self.keys[expr_id]
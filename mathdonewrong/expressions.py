@@ -9,11 +9,16 @@
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Optional, Sequence
 
 class Expression:
     """An Expression is an expression tree, consisting of operators, variables, and literals."""
 
+    # The node classes here declare their fields in __slots__, so nodes are
+    # small and quick to copy. Subclasses elsewhere can still add attributes
+    # of their own.
+    __slots__ = ()
+
     precedence = 100
 
     def __str__(self):
@@ -49,6 +54,8 @@ class Expression:
 
 @dataclass
 class Var(Expression):
+    __slots__ = ('name',)
+
     name: str
 
     def __str__(self):
@@ -74,6 +81,8 @@ class Var(Expression):
 
 @dataclass
 class Literal(Expression):
+    __slots__ = ('value',)
+
     value: Any
 
     def __str__(self):
@@ -100,6 +109,8 @@ class Literal(Expression):
 
 @dataclass
 class Oper(Expression):
+    __slots__ = ('name', 'operands')
+
     name: str
     operands: tuple[Expression, ...]
 
@@ -124,10 +135,20 @@ class Oper(Expression):
         return visitor.visit_oper(self)
 
     def copy_with_new_operands(self, new_operands):
-        # This feels like an awful hack, but it seems to work.
-        copy = type(self).__new__(type(self))
-        for name, value in self.__dict__.items():
-            setattr(copy, name, value)
+        """Make a node just like this one, but with different operands
+
+        This skips ``__init__``, so it works for subclasses whose constructors
+        take different arguments.
+        """
+        cls = type(self)
+        copy = cls.__new__(cls)
+
+        # Subclasses without __slots__ keep any extra attributes (and, for
+        # BinaryOper and PrefixOper subclasses, the name) in __dict__.
+        if cls.__dictoffset__:
+            copy.__dict__.update(self.__dict__)
+
+        copy.name = self.name
         copy.operands = tuple(new_operands)
         return copy
 
@@ -139,6 +160,8 @@ class Oper(Expression):
         return 'oper'
 
 class Const(Oper):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(str(value))
 
@@ -149,6 +172,8 @@ class Const(Oper):
         return f'{type(self).__name__}({self.name!r})'
 
 class BinaryOper(Oper):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(self.name, left, right)
 
@@ -159,6 +184,8 @@ class BinaryOper(Oper):
         return self.repr_like_named_oper()
 
 class PrefixOper(Oper):
+    __slots__ = ()
+
     def __init__(self, operand):
         super().__init__(self.name, operand)
 
@@ -170,6 +197,8 @@ class PrefixOper(Oper):
         return self.repr_like_named_oper()
 
 class NamedOper(Oper):
+    __slots__ = ()
+
     def __init__(self, *operands):
         super().__init__(type(self).__name__, *operands)
 
@@ -178,3 +207,96 @@ class NamedOper(Oper):
 
     def __repr__(self):
         return self.repr_like_named_oper()
+
+class Fold:
+    """
+    A bottom-up computation over an expression, done without recursion
+
+    Subclasses define what to do with a variable, a literal, and an operator
+    whose operands have already been folded. :meth:`enter_oper` is called on
+    each operator before its operands, and can return a result for the whole
+    operator, in which case the operands aren't visited at all.
+
+    A subexpression which appears several times (as the same object) is only
+    folded once.
+    """
+
+    def fold_var(self, expr: Var):
+        raise NotImplementedError
+
+    def fold_literal(self, expr: Literal):
+        raise NotImplementedError
+
+    def enter_oper(self, expr: Oper) -> Optional[Any]:
+        return None
+
+    def fold_oper(self, expr: Oper, operand_results: Sequence):
+        raise NotImplementedError
+
+    def fold(self, expr: Expression):
+        results: dict[int, Any] = {}
+        stack = [(expr, False)]
+
+        while stack:
+            node, operands_done = stack.pop()
+            if not operands_done and id(node) in results:
+                continue
+
+            tag = node.tag
+            if tag == 'var':
+                results[id(node)] = self.fold_var(node)
+            elif tag == 'literal':
+                results[id(node)] = self.fold_literal(node)
+            elif operands_done:
+                results[id(node)] = self.fold_oper(node, [results[id(operand)] for operand in node.operands])
+            elif (result := self.enter_oper(node)) is not None:
+                results[id(node)] = result
+            else:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands if id(operand) not in results)
+
+        return results[id(expr)]
+
+class Transformer(Fold):
+    """
+    A :class:`Fold` which turns an expression into another expression
+
+    By default, everything is left alone. An operator is only copied if one of
+    its operands changed, so the parts of an expression which a transformation
+    doesn't touch are shared with the result, not copied.
+    """
+
+    def fold_var(self, expr: Var) -> Expression:
+        return expr
+
+    def fold_literal(self, expr: Literal) -> Expression:
+        return expr
+
+    def fold_oper(self, expr: Oper, operand_results: Sequence[Expression]) -> Expression:
+        if all(new is old for new, old in zip(operand_results, expr.operands)):
+            return expr
+        else:
+            return expr.copy_with_new_operands(operand_results)
+
+class Substitution(Transformer):
+    """Replace variables by the expressions they're mapped to in ``context``"""
+
+    def __init__(self, context: dict[str, Expression]):
+        self.context = context
+
+    def fold_var(self, expr: Var) -> Expression:
+        return self.context.get(expr.name, expr)
+
+def var_names(expr: Expression) -> list[str]:
+    """Get the names of the variables in an expression, in order of first appearance"""
+    names = {}
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+        if node.tag == 'var':
+            names[node.name] = None
+        elif node.tag == 'oper':
+            stack.extend(reversed(node.operands))
+
+    return list(names)
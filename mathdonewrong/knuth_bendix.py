@@ -0,0 +1,499 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Knuth-Bendix completion
+
+A set of rewrite rules is *confluent* if the order in which rules are applied
+doesn't matter: every expression has exactly one normal form. If the rules come
+from the relations of a variety, then two expressions are equal in the variety
+exactly when they have the same normal form, so a confluent set of rules decides
+the word problem.
+
+The rules we get by orienting relations (as in
+:mod:`~mathdonewrong.rewriting`) usually aren't confluent. Knuth-Bendix
+completion fixes this by looking for *critical pairs* (expressions where two
+rules overlap and lead to different results) and adding new rules to join them.
+New rules are oriented using a *reduction ordering*, either a lexicographic
+path ordering (:class:`LPO`) or a Knuth-Bendix ordering (:class:`KBO`).
+
+Completion can fail (if it finds an equation that the ordering can't orient) or
+go on forever, in which case it gives up after ``max_rules`` rules.
+
+A completed system can be saved with :func:`save_rules` and loaded again with
+:func:`load_rules`, so that completion only has to be done once.
+
+.. autofunction:: complete
+
+.. autofunction:: complete_presentation
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+import heapq
+from itertools import count
+import json
+import re
+from typing import IO, Iterable, Optional
+
+from mathdonewrong.expressions import Expression, Literal, Oper, Substitution, Var, var_names
+from mathdonewrong.rewriting import RewriteSystem, Rule, expr_size, head
+from mathdonewrong.varieties import Relation, Variety
+
+# Terms and substitutions
+
+def symbol(term: Expression):
+    """The function symbol at the head of a term (a literal counts as a constant)"""
+    if term.tag == 'oper':
+        return term.name
+    else:
+        return repr(term.value)
+
+def arity(term: Expression) -> int:
+    return len(term.operands) if term.tag == 'oper' else 0
+
+def occurs(name: str, term: Expression) -> bool:
+    stack = [term]
+
+    while stack:
+        node = stack.pop()
+        if node.tag == 'var' and node.name == name:
+            return True
+        elif node.tag == 'oper':
+            stack.extend(node.operands)
+
+    return False
+
+class ChainedSubstitution(Substitution):
+    # Substitutions from unify can refer to each other, so the replacement for a
+    # variable is substituted into as well.
+    def fold_var(self, expr: Var) -> Expression:
+        if expr.name in self.context:
+            return self.fold(self.context[expr.name])
+        else:
+            return expr
+
+def substitute(term: Expression, subst: dict[str, Expression]) -> Expression:
+    return ChainedSubstitution(subst).fold(term)
+
+def unify(s: Expression, t: Expression) -> Optional[dict[str, Expression]]:
+    """Find a most general unifier of two terms, or ``None`` if there isn't one"""
+    subst = {}
+    stack = [(s, t)]
+
+    def resolve(term):
+        while term.tag == 'var' and term.name in subst:
+            term = subst[term.name]
+        return term
+
+    while stack:
+        s, t = stack.pop()
+        s, t = resolve(s), resolve(t)
+
+        if s.tag == 'var' and t.tag == 'var' and s.name == t.name:
+            continue
+        elif s.tag == 'var':
+            if occurs(s.name, substitute(t, subst)):
+                return None
+            subst[s.name] = t
+        elif t.tag == 'var':
+            if occurs(t.name, substitute(s, subst)):
+                return None
+            subst[t.name] = s
+        elif s.tag == 'literal' or t.tag == 'literal':
+            if s != t:
+                return None
+        elif s.name != t.name or len(s.operands) != len(t.operands):
+            return None
+        else:
+            stack.extend(zip(s.operands, t.operands))
+
+    return subst
+
+def rule_var_names(rule: Rule) -> list[str]:
+    return list(dict.fromkeys(var_names(rule.lhs) + var_names(rule.rhs)))
+
+def rename_apart(rule: Rule, avoid: set[str]) -> Rule:
+    """Rename the variables of a rule so that none of them are in ``avoid``
+
+    Each variable ``x`` becomes ``x_n`` for a counter ``n``, skipping names
+    which are already in use (in ``avoid`` or in the rule itself).
+    """
+    names = rule_var_names(rule)
+    taken = avoid | set(names)
+    renaming = {}
+    counter = 0
+
+    for name in names:
+        base = re.sub(r'_\d+$', '', name)
+        while f'{base}_{counter}' in taken:
+            counter += 1
+
+        new_name = f'{base}_{counter}'
+        taken.add(new_name)
+        renaming[name] = Var(new_name)
+
+    # The new names are all fresh, so a plain (unchained) substitution is
+    # enough.
+    rename = Substitution(renaming).fold
+    return Rule(rename(rule.lhs), rename(rule.rhs))
+
+def positions(term: Expression) -> list[tuple[int, ...]]:
+    """The positions of the non-variable subterms of a term"""
+    result = []
+    stack = [((), term)]
+
+    while stack:
+        position, node = stack.pop()
+        if node.tag != 'var':
+            result.append(position)
+        if node.tag == 'oper':
+            stack.extend((position + (i,), operand) for i, operand in enumerate(node.operands))
+
+    return result
+
+def subterm(term: Expression, position: tuple[int, ...]) -> Expression:
+    for i in position:
+        term = term.operands[i]
+    return term
+
+def replace_at(term: Expression, position: tuple[int, ...], replacement: Expression) -> Expression:
+    if not position:
+        return replacement
+
+    i, rest = position[0], position[1:]
+    operands = list(term.operands)
+    operands[i] = replace_at(operands[i], rest, replacement)
+    return term.copy_with_new_operands(operands)
+
+# Reduction orderings
+
+def default_precedence(terms: Iterable[Expression]) -> dict[str, int]:
+    """Rank symbols by arity, and then by name"""
+    symbols = {}
+    stack = list(terms)
+
+    while stack:
+        node = stack.pop()
+        if node.tag != 'var':
+            symbols[symbol(node)] = arity(node)
+        if node.tag == 'oper':
+            stack.extend(node.operands)
+
+    ranked = sorted(symbols, key=lambda name: (symbols[name], name))
+    return {name: rank for rank, name in enumerate(ranked)}
+
+class LPO:
+    """The lexicographic path ordering for a given precedence on symbols"""
+
+    def __init__(self, precedence: dict[str, int]):
+        self.precedence = precedence
+
+    def rank(self, term: Expression) -> int:
+        return self.precedence.get(symbol(term), -1)
+
+    def greater(self, s: Expression, t: Expression) -> bool:
+        if s.tag == 'var':
+            return False
+        elif t.tag == 'var':
+            return occurs(t.name, s)
+
+        s_args = s.operands if s.tag == 'oper' else ()
+        t_args = t.operands if t.tag == 'oper' else ()
+
+        if any(arg == t or self.greater(arg, t) for arg in s_args):
+            return True
+        elif not all(self.greater(s, arg) for arg in t_args):
+            return False
+        elif symbol(s) != symbol(t):
+            return self.rank(s) > self.rank(t)
+        else:
+            for s_arg, t_arg in zip(s_args, t_args):
+                if s_arg != t_arg:
+                    return self.greater(s_arg, t_arg)
+            return False
+
+class KBO:
+    """The Knuth-Bendix ordering for given symbol weights and precedence
+
+    Every symbol has weight 1 unless ``weights`` says otherwise, and every
+    variable has weight 1.
+    """
+
+    def __init__(self, precedence: dict[str, int], weights: Optional[dict[str, int]] = None):
+        self.precedence = precedence
+        self.weights = weights or {}
+
+    def weight(self, term: Expression) -> int:
+        total = 0
+        stack = [term]
+
+        while stack:
+            node = stack.pop()
+            total += 1 if node.tag == 'var' else self.weights.get(symbol(node), 1)
+            if node.tag == 'oper':
+                stack.extend(node.operands)
+
+        return total
+
+    @staticmethod
+    def var_counts(term: Expression) -> dict[str, int]:
+        counts = {}
+        stack = [term]
+
+        while stack:
+            node = stack.pop()
+            if node.tag == 'var':
+                counts[node.name] = counts.get(node.name, 0) + 1
+            elif node.tag == 'oper':
+                stack.extend(node.operands)
+
+        return counts
+
+    def greater(self, s: Expression, t: Expression) -> bool:
+        s_counts, t_counts = self.var_counts(s), self.var_counts(t)
+        if any(s_counts.get(name, 0) < count for name, count in t_counts.items()):
+            return False
+
+        s_weight, t_weight = self.weight(s), self.weight(t)
+        if s_weight != t_weight:
+            return s_weight > t_weight
+        elif s.tag == 'var':
+            return False
+        elif t.tag == 'var':
+            # s is f(...(f(t))...) for a unary f.
+            return s != t
+        elif symbol(s) != symbol(t):
+            return self.precedence.get(symbol(s), -1) > self.precedence.get(symbol(t), -1)
+        else:
+            for s_arg, t_arg in zip(s.operands if s.tag == 'oper' else (), t.operands if t.tag == 'oper' else ()):
+                if s_arg != t_arg:
+                    return self.greater(s_arg, t_arg)
+            return False
+
+# Completion
+
+def overlap(rule1: Rule, position: tuple[int, ...], rule2: Rule) -> Optional[tuple[Expression, Expression]]:
+    """Find the critical pair where ``rule2`` overlaps ``rule1``'s left side at a position, if they overlap
+
+    The two rules must not have any variables in common.
+    """
+    subst = unify(subterm(rule1.lhs, position), rule2.lhs)
+    if subst is None:
+        return None
+
+    return substitute(rule1.rhs, subst), substitute(replace_at(rule1.lhs, position, rule2.rhs), subst)
+
+def critical_pairs(rule1: Rule, rule2: Rule, same_rule: bool = False) -> list[tuple[Expression, Expression]]:
+    """Find the critical pairs where ``rule2`` overlaps a subterm of the left side of ``rule1``"""
+    rule2 = rename_apart(rule2, set(rule_var_names(rule1)))
+    rule2_head = head(rule2.lhs)
+    pairs = []
+
+    for position in positions(rule1.lhs):
+        if same_rule and position == ():
+            continue
+        if head(subterm(rule1.lhs, position)) != rule2_head:
+            continue
+
+        if (pair := overlap(rule1, position, rule2)) is not None:
+            pairs.append(pair)
+
+    return pairs
+
+def variant_key(s: Expression, t: Expression) -> tuple:
+    """A key for an equation which is the same for equations that differ only in the names of their variables"""
+    names = {}
+    key = []
+    stack = [t, s]
+
+    while stack:
+        node = stack.pop()
+        if node.tag == 'var':
+            key.append(('var', names.setdefault(node.name, len(names))))
+        elif node.tag == 'literal':
+            key.append(('literal', node.value))
+        else:
+            key.append(('oper', node.name, len(node.operands)))
+            stack.extend(reversed(node.operands))
+
+    return tuple(key)
+
+@dataclass
+class Completion:
+    ordering: LPO | KBO
+    max_rules: int = 1000
+    rules: list[Rule] = field(default_factory=list)
+    system: RewriteSystem = field(default_factory=RewriteSystem)
+
+    # The non-variable positions in the left sides of the rules, indexed by
+    # the head of the subterm at each position, for finding overlaps.
+    overlaps: dict[tuple, list[tuple[Rule, tuple[int, ...]]]] = field(default_factory=dict)
+
+    def rebuild(self):
+        self.system = RewriteSystem(self.rules)
+        self.overlaps = {}
+        for rule in self.rules:
+            self.index_overlaps(rule)
+
+    def add_rule(self, rule: Rule):
+        self.rules.append(rule)
+        self.system.add_rule(rule)
+        self.index_overlaps(rule)
+
+    def index_overlaps(self, rule: Rule):
+        for position in positions(rule.lhs):
+            self.overlaps.setdefault(head(subterm(rule.lhs, position)), []).append((rule, position))
+
+    def orient(self, s: Expression, t: Expression) -> Rule:
+        if self.ordering.greater(s, t):
+            return Rule(s, t)
+        elif self.ordering.greater(t, s):
+            return Rule(t, s)
+        else:
+            raise ValueError(f"completion failed: can't orient {s} = {t}")
+
+    def new_critical_pairs(self, new_rule: Rule) -> Iterable[tuple[Expression, Expression]]:
+        """Find the critical pairs between a new rule and the rules (including itself)
+
+        Only pairs of positions with the same head symbol are tried.
+        """
+        taken = {name for rule in self.rules for name in rule_var_names(rule)}
+        fresh = rename_apart(new_rule, taken)
+
+        # The new rule overlapping a subterm of a rule's left side. A rule
+        # trivially overlaps itself at the root.
+        for rule, position in self.overlaps.get(head(fresh.lhs), ()):
+            if rule is new_rule and position == ():
+                continue
+            if (pair := overlap(rule, position, fresh)) is not None:
+                yield pair
+
+        # A rule overlapping a subterm of the new rule's left side.
+        for position in positions(fresh.lhs):
+            for rule in self.system.index.get(head(subterm(fresh.lhs, position)), ()):
+                if rule is not new_rule and (pair := overlap(fresh, position, rule)) is not None:
+                    yield pair
+
+    def run(self, equations: Iterable[tuple[Expression, Expression]]) -> RewriteSystem:
+        # Pending equations are kept in a heap, so that the smallest one is
+        # dealt with first. An equation is only queued once, up to renaming
+        # variables, unless it comes back from inter-reduction.
+        pending = []
+        seen = set()
+        counter = count()
+
+        def queue(s: Expression, t: Expression):
+            heapq.heappush(pending, (expr_size(s) + expr_size(t), next(counter), s, t))
+
+        def queue_new(s: Expression, t: Expression):
+            key = variant_key(s, t)
+            if key not in seen and variant_key(t, s) not in seen:
+                seen.add(key)
+                queue(s, t)
+
+        for s, t in equations:
+            queue_new(s, t)
+
+        while pending:
+            _, _, s, t = heapq.heappop(pending)
+
+            s, t = self.system.normalize(s), self.system.normalize(t)
+            if s == t:
+                continue
+
+            new_rule = self.orient(s, t)
+            if len(self.rules) >= self.max_rules:
+                raise ValueError(f"completion gave up after {self.max_rules} rules")
+
+            # Inter-reduce: rules whose left sides can be rewritten by the new
+            # rule are subsumed by it, and go back to being equations.
+            new_system = RewriteSystem([new_rule])
+            kept = []
+            for rule in self.rules:
+                if new_system.normalize(rule.lhs) != rule.lhs:
+                    queue(rule.lhs, rule.rhs)
+                else:
+                    kept.append(rule)
+
+            if len(kept) == len(self.rules):
+                self.add_rule(new_rule)
+            else:
+                self.rules = kept + [new_rule]
+                self.rebuild()
+
+            # The right sides of the other rules were already normal, so
+            # only the ones the new rule applies to need normalizing again.
+            # Changing a right side in place doesn't affect the index, which
+            # only looks at left sides.
+            for rule in kept:
+                if new_system.normalize(rule.rhs) != rule.rhs:
+                    rule.rhs = self.system.normalize(rule.rhs)
+
+            for pair in self.new_critical_pairs(new_rule):
+                queue_new(*pair)
+
+        return self.system
+
+def complete(relations: Iterable[Relation | tuple[Expression, Expression]], ordering: LPO | KBO | None = None, max_rules: int = 1000) -> RewriteSystem:
+    r"""Run Knuth-Bendix completion, producing a confluent rewrite system
+
+    ``relations`` can be :class:`~mathdonewrong.varieties.Relation`\s or
+    ``(lhs, rhs)`` pairs. If no ordering is given, an :class:`LPO` is used,
+    with symbols ranked by arity and then by name. Raise ``ValueError`` if
+    completion fails or gives up.
+    """
+    equations = [(r.lhs, r.rhs) if isinstance(r, Relation) else tuple(r) for r in relations]
+
+    if ordering is None:
+        ordering = LPO(default_precedence(side for equation in equations for side in equation))
+
+    return Completion(ordering, max_rules).run(equations)
+
+def complete_variety(variety: Variety, **options) -> RewriteSystem:
+    return complete(variety.relations, **options)
+
+def complete_presentation(algebra, **options) -> RewriteSystem:
+    """Complete the relations of an algebra's variety along with its own ``relations``
+
+    For example, ``complete_presentation(bool_xor)`` gives a confluent system
+    for the monoid presented by one generator ``True`` with ``True | True =
+    Id()``.
+    """
+    return complete(list(type(algebra).variety.relations) + list(algebra.relations), **options)
+
+def equal_in(system: RewriteSystem, lhs: Expression, rhs: Expression) -> bool:
+    """Decide whether two expressions are equal, using a confluent rewrite system"""
+    return system.normalize(lhs) == system.normalize(rhs)
+
+# Saving and loading
+
+def term_to_json(term: Expression):
+    if term.tag == 'var':
+        return {'var': term.name}
+    elif term.tag == 'literal':
+        return {'literal': term.value}
+    else:
+        return {'oper': term.name, 'operands': [term_to_json(operand) for operand in term.operands]}
+
+def term_from_json(data) -> Expression:
+    if 'var' in data:
+        return Var(data['var'])
+    elif 'literal' in data:
+        return Literal(data['literal'])
+    else:
+        return Oper(data['oper'], *(term_from_json(operand) for operand in data['operands']))
+
+def save_rules(system: RewriteSystem, file: IO[str]):
+    """Save the rules of a rewrite system as JSON (literal values must be JSON values)"""
+    json.dump([{'lhs': term_to_json(rule.lhs), 'rhs': term_to_json(rule.rhs)} for rule in system.rules], file)
+
+def load_rules(file: IO[str]) -> RewriteSystem:
+    return RewriteSystem(Rule(term_from_json(rule['lhs']), term_from_json(rule['rhs'])) for rule in json.load(file))
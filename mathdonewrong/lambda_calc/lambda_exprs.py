@@ -8,6 +8,7 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
+from ast import literal_eval
 from dataclasses import dataclass
 from mathdonewrong.algebras import Algebra, operator
 from mathdonewrong.expressions import Literal, NamedOper
@@ -53,6 +54,23 @@ class LVar(LambdaExpr, NamedOper):
         context = context or {}
         return context[self.varname]
 
+class LConst(LambdaExpr, NamedOper):
+    """A constant, given by the ``repr`` of its value"""
+
+    def __init__(self, value_repr):
+        super().__init__(Literal(value_repr))
+
+    def __repr__(self):
+        return f"LConst({self.operands[0].value!r})"
+
+    @property
+    def value_repr(self):
+        value_repr_, = self.operands
+        return value_repr_.value
+
+    def l_eval(self, context=None):
+        return literal_eval(self.value_repr)
+
 class Apply(LambdaExpr, NamedOper):
     @property
     def func(self):
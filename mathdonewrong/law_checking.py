@@ -0,0 +1,164 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Checking laws by evaluation
+
+Nothing stops us from writing an "algebra" which doesn't actually satisfy the
+relations of its variety, or a "homomorphism" which doesn't actually respect
+the monoid operation. The functions in this module look for counterexamples by
+evaluating both sides of each law on lots of elements.
+
+Given a list of elements, the checkers either try every possible assignment of
+elements to variables (the default), or, if ``samples`` is given, that many
+randomly chosen assignments. If an ``executor`` is given, assignments are
+checked in the executor in chunks, at most ``max_pending`` of which are in
+flight at once, and checking stops as soon as a counterexample is found.
+
+.. autofunction:: check_variety
+
+.. autofunction:: check_homomorphism
+
+.. autoclass:: Counterexample
+"""
+
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from itertools import product
+import random
+from typing import Any, Iterable, Optional
+
+from mathdonewrong.algebras import Algebra
+from mathdonewrong.expressions import var_names
+from mathdonewrong.monoidlike.monoids import MonoidHomomorphism, chunked
+from mathdonewrong.varieties import Relation
+
+@dataclass
+class Counterexample:
+    """An assignment of values for which the two sides of a law differ"""
+    law: str
+    assignment: dict[str, Any]
+    lhs_value: Any
+    rhs_value: Any
+
+@dataclass
+class RelationLaw:
+    algebra: Algebra
+    relation: Relation
+
+    def __post_init__(self):
+        self.var_names = list(dict.fromkeys(var_names(self.relation.lhs) + var_names(self.relation.rhs)))
+
+    def __str__(self):
+        return f'{self.relation.lhs} = {self.relation.rhs}'
+
+    def sides(self, values: tuple) -> tuple[Any, Any]:
+        context = dict(zip(self.var_names, values))
+        return (
+            self.relation.lhs.evaluate_in(self.algebra, context),
+            self.relation.rhs.evaluate_in(self.algebra, context))
+
+@dataclass
+class HomomorphismLaw:
+    hom: MonoidHomomorphism
+
+    var_names = ['a', 'b']
+
+    def __str__(self):
+        return 'f(a * b) = f(a) * f(b)'
+
+    def sides(self, values: tuple) -> tuple[Any, Any]:
+        a, b = values
+        return (
+            self.hom(self.hom.domain.mop_(a, b)),
+            self.hom.codomain.mop_(self.hom(a), self.hom(b)))
+
+def find_counterexample(law, assignments: list[tuple]) -> Optional[Counterexample]:
+    for values in assignments:
+        lhs_value, rhs_value = law.sides(values)
+        if lhs_value != rhs_value:
+            return Counterexample(str(law), dict(zip(law.var_names, values)), lhs_value, rhs_value)
+
+    return None
+
+def assignments(
+        elements: list, arity: int, samples: Optional[int], seed: Any) -> Iterable[tuple]:
+    if samples is None:
+        return product(elements, repeat=arity)
+
+    rng = random.Random(seed)
+    return (tuple(rng.choice(elements) for _ in range(arity)) for _ in range(samples))
+
+def check_law(
+        law, elements: list, samples: Optional[int] = None, seed: Any = None,
+        executor: Executor = None, chunk_size: int = 1000, max_pending: int = 8) -> Optional[Counterexample]:
+    """Look for a counterexample to a single law"""
+    chunks = chunked(assignments(elements, len(law.var_names), samples, seed), chunk_size)
+
+    if executor is None:
+        for chunk in chunks:
+            if (counterexample := find_counterexample(law, chunk)) is not None:
+                return counterexample
+        return None
+
+    pending = deque()
+
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(find_counterexample, law, chunk))
+            if len(pending) >= max_pending:
+                if (counterexample := pending.popleft().result()) is not None:
+                    return counterexample
+
+        while pending:
+            if (counterexample := pending.popleft().result()) is not None:
+                return counterexample
+    finally:
+        for future in pending:
+            future.cancel()
+
+    return None
+
+def check_variety(algebra: Algebra, elements: list, **options) -> Optional[Counterexample]:
+    r"""Check that an algebra satisfies the relations of its variety
+
+    Each :class:`~mathdonewrong.varieties.Relation` in
+    ``type(algebra).variety`` is evaluated in ``algebra`` with its variables
+    taken from ``elements``. Return the first :class:`Counterexample` found, or
+    ``None``.
+
+    The keyword options are ``samples``, ``seed``, ``executor``,
+    ``chunk_size``, and ``max_pending``; see the module documentation.
+
+    >>> check_variety(int_addition, [0, 1, -3, 10]) is None
+    True
+    """
+    for relation in type(algebra).variety.relations:
+        if (counterexample := check_law(RelationLaw(algebra, relation), elements, **options)) is not None:
+            return counterexample
+
+    return None
+
+def check_homomorphism(hom: MonoidHomomorphism, elements: list, **options) -> Optional[Counterexample]:
+    r"""Check that a :class:`~mathdonewrong.monoidlike.monoids.MonoidHomomorphism` is a homomorphism
+
+    Check that ``hom`` maps the identity to the identity, and that
+    :math:`f(ab) = f(a) f(b)` for elements :math:`a` and :math:`b` taken from
+    ``elements``. Return the first :class:`Counterexample` found, or ``None``.
+
+    The keyword options are the same as for :func:`check_variety`.
+    """
+    domain_id = hom.domain.id
+    if (image := hom(domain_id)) != hom.codomain.id:
+        return Counterexample('f(e) = e', {}, image, hom.codomain.id)
+
+    return check_law(HomomorphismLaw(hom), elements, **options)
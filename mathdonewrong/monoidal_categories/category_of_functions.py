@@ -8,14 +8,24 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
-from typing import Callable, List, TypeVar
-from mathdonewrong.monoidal_categories.monoidal_categories import CartesianClosedCategory
+from typing import Callable, Iterable, List, TypeVar
+from mathdonewrong.expressions import Expression
+from mathdonewrong.monoidal_categories.monoidalexpr import Compose
+from mathdonewrong.monoidal_categories.monoidal_categories import CartesianClosedCategory, CartesianMonoidalCategory
+from mathdonewrong.monoidal_categories.structural import compile_structural, is_structural
 
 A, B, C, D = TypeVar('A'), TypeVar('B'), TypeVar('C'), TypeVar('D')
 
 Func = Callable[[A], B]
 
-class CategoryOfUnaryFunctions(CartesianClosedCategory):
+class CategoryOfTupleFunctions(CartesianMonoidalCategory):
+    """Category of unary functions, with pairs represented as tuples
+
+    This has the structural arrows of :class:`CategoryOfUnaryFunctions`, but
+    isn't closed, so it can be shared by categories whose arrows are functions
+    on something other than single values.
+    """
+
     def id(self, A: type):
         def id_func(x: A) -> A:
             return x
@@ -97,27 +107,202 @@ class CategoryOfUnaryFunctions(CartesianClosedCategory):
 
         return diagonal_func
 
-    def into(self, A: type, f: Func[B, C]) -> Func[Func[A, B], Func[A, C]]:
-        def into_func(g: Func[A, B]) -> Func[A, C]:
-            def composed_func(x: A) -> C:
-                return f(g(x))
+class CategoryOfUnaryFunctions(CategoryOfTupleFunctions, CartesianClosedCategory):
+    def exp(self, A: type, B: type) -> type:
+        return Callable
 
-            return composed_func
+    def const(self, A: type, value: A) -> Func[None, A]:
+        def const_func(_: None) -> A:
+            return value
 
-        return into_func
+        return const_func
+
+    def into(self, A: type, f: Func[B, C]) -> Func[Func[A, B], Func[A, C]]:
+        return PostComposer(f)
 
     def curry(self, f: Func[tuple[A, B], C]) -> Func[A, Func[B, C]]:
-        def curried_func(x: A) -> Func[B, C]:
-            def partial_func(y: B) -> C:
-                return f(x, y)
+        if isinstance(f, Uncurried):
+            return f.f
+        else:
+            return Curried(f)
 
-            return partial_func
+    def curry_inv(self, f: Func[A, Func[B, C]]) -> Func[tuple[A, B], C]:
+        if isinstance(f, Curried):
+            return f.f
+        else:
+            return Uncurried(f)
 
-        return curried_func
+class Pipeline:
+    """A sequence of functions, applied one after another in a loop"""
 
-    def curry_inv(self, f: Func[A, Func[B, C]]) -> Func[tuple[A, B], C]:
-        def uncurried_func(t: tuple[A, B]) -> C:
-            x, y = t
-            return f(x)(y)
+    __slots__ = ('funcs',)
+
+    def __init__(self, funcs: Iterable[Func]):
+        self.funcs = tuple(funcs)
+
+    def __call__(self, x):
+        for f in self.funcs:
+            x = f(x)
+        return x
+
+    def __repr__(self):
+        return f'Pipeline({self.funcs!r})'
+
+class StackedPipeline:
+    """Two functions applied side by side to the two halves of a pair"""
+
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left: Func, right: Func):
+        self.left = left
+        self.right = right
+
+    def __call__(self, t):
+        x, y = t
+        return self.left(x), self.right(y)
+
+    def __repr__(self):
+        return f'StackedPipeline({self.left!r}, {self.right!r})'
+
+class PartialApplication:
+    """A function on pairs with the first element of the pair filled in"""
+
+    __slots__ = ('f', 'x')
+
+    def __init__(self, f: Func, x):
+        self.f = f
+        self.x = x
+
+    def __call__(self, y):
+        return self.f((self.x, y))
+
+    def __repr__(self):
+        return f'PartialApplication({self.f!r}, {self.x!r})'
+
+class Curried:
+    """The curried form of a function on pairs"""
 
-        return uncurried_func
+    __slots__ = ('f',)
+
+    def __init__(self, f: Func):
+        self.f = f
+
+    def __call__(self, x) -> PartialApplication:
+        return PartialApplication(self.f, x)
+
+    def __repr__(self):
+        return f'Curried({self.f!r})'
+
+class Uncurried:
+    """The uncurried form of a function which returns functions"""
+
+    __slots__ = ('f',)
+
+    def __init__(self, f: Func):
+        self.f = f
+
+    def __call__(self, t):
+        x, y = t
+        return self.f(x)(y)
+
+    def __repr__(self):
+        return f'Uncurried({self.f!r})'
+
+class PostComposer:
+    """A function which composes other functions with ``f``
+
+    Composing a :class:`Pipeline` with ``f`` gives a single flat
+    :class:`Pipeline`, so chains of ``Into`` don't nest.
+    """
+
+    __slots__ = ('f',)
+
+    def __init__(self, f: Func):
+        self.f = f
+
+    def __call__(self, g: Func) -> Pipeline:
+        g_funcs = g.funcs if isinstance(g, Pipeline) else (g,)
+        f_funcs = self.f.funcs if isinstance(self.f, Pipeline) else (self.f,)
+        return Pipeline(g_funcs + f_funcs)
+
+    def __repr__(self):
+        return f'PostComposer({self.f!r})'
+
+class PipelineCategory(CategoryOfUnaryFunctions):
+    r"""
+    Category of unary functions with flattened composition
+
+    In :class:`CategoryOfUnaryFunctions`, every composition creates a new
+    closure, so a chain of :math:`n` compositions costs :math:`n` nested Python
+    calls. Here, composition instead produces a flat :class:`Pipeline`;
+    identities disappear from pipelines, and adjacent :class:`StackedPipeline`\s
+    are fused (using the fact that composing :math:`f \otimes g` with
+    :math:`h \otimes k` gives :math:`(f h) \otimes (g k)`).
+
+    Use :meth:`evaluate` rather than ``evaluate_in`` to evaluate long chains of
+    ``Compose``\s without recursing once per composition. :meth:`evaluate` also
+    collapses each run of structural arrows into a single function using
+    :func:`~mathdonewrong.monoidal_categories.structural.compile_structural`.
+    """
+
+    def id(self, A: type) -> Pipeline:
+        return Pipeline(())
+
+    def compose(self, f: Func[A, B], g: Func[B, C]) -> Func[A, C]:
+        return self.compose_all([f, g])
+
+    def stack(self, f: Func[A, C], g: Func[B, D]) -> Func[tuple[A, B], tuple[C, D]]:
+        return StackedPipeline(f, g)
+
+    def compose_all(self, funcs: Iterable[Func]) -> Func:
+        """Compose a sequence of functions, in order, into a single function"""
+        stages = []
+
+        for f in funcs:
+            for stage in (f.funcs if isinstance(f, Pipeline) else (f,)):
+                if isinstance(stage, StackedPipeline) and stages and isinstance(stages[-1], StackedPipeline):
+                    previous = stages.pop()
+                    stage = StackedPipeline(
+                        self.compose(previous.left, stage.left),
+                        self.compose(previous.right, stage.right))
+                stages.append(stage)
+
+        if len(stages) == 1:
+            return stages[0]
+        else:
+            return Pipeline(stages)
+
+    def evaluate(self, expr: Expression, context: dict) -> Func:
+        r"""Evaluate an arrow expression, flattening nested ``Compose``\s without recursion"""
+        funcs = []
+        structural = []
+        stack = [expr]
+
+        def flush_structural():
+            if any(stage.name != 'Id' for stage in structural):
+                chain = structural[0]
+                for stage in structural[1:]:
+                    chain = Compose(chain, stage)
+
+                # If the run can't be compiled for any reason (including the
+                # generated code being too big for the compiler), it's still
+                # fine to evaluate it one stage at a time.
+                try:
+                    funcs.append(compile_structural(chain).func)
+                except (ValueError, SyntaxError, MemoryError, RecursionError):
+                    funcs.extend(stage.evaluate_in(self, context) for stage in structural)
+
+            structural.clear()
+
+        while stack:
+            node = stack.pop()
+            if node.tag == 'oper' and node.name == 'Compose':
+                stack.extend(reversed(node.operands))
+            elif is_structural(node):
+                structural.append(node)
+            else:
+                flush_structural()
+                funcs.append(node.evaluate_in(self, context))
+
+        flush_structural()
+        return self.compose_all(funcs)
@@ -0,0 +1,110 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+A category of functions on batches of columns
+
+In :class:`~mathdonewrong.monoidal_categories.category_of_functions.CategoryOfUnaryFunctions`,
+an arrow is applied to one value at a time. In :class:`ColumnarCategory`, an
+arrow is applied to a whole batch of values at once, stored column by column.
+
+The objects are schemas: a :class:`Column` is a single column, the unit is
+``None``, and a pair of schemas describes a batch made of a batch for each
+schema. A batch is therefore a tree of columns with the same shape as its
+schema.
+
+Structural arrows only rearrange columns, so they never copy any data:
+``Diagonal`` gives two references to the same columns, and ``Drop`` lets go of
+its columns. Arrows which do actual computation are made with :func:`lift` and
+:func:`lift2`.
+"""
+
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Iterable, Sequence
+
+from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfTupleFunctions
+
+@dataclass(frozen=True)
+class Column:
+    """A schema for a single column
+
+    If ``typecode`` is given, the column is stored as an ``array.array`` with
+    that type code; otherwise it's stored as a list.
+    """
+
+    name: str
+    typecode: str | None = None
+
+    def make(self, values: Iterable) -> Sequence:
+        return make_column(values, self.typecode)
+
+Schema = Column | None | tuple['Schema', 'Schema']
+
+def make_column(values: Iterable, typecode: str | None) -> Sequence:
+    if typecode is None:
+        return list(values)
+    else:
+        return array(typecode, values)
+
+def lift(f: Callable, typecode: str | None = None) -> Callable[[Sequence], Sequence]:
+    """Turn a function on single values into an arrow from one column to one column
+
+    The lifted function still calls ``f`` once per row, in Python; nothing is
+    vectorized. What's saved by working in batches is the per-row cost of the
+    structural arrows, which move whole columns at once.
+    """
+    def lifted(column: Sequence) -> Sequence:
+        return make_column(map(f, column), typecode)
+
+    return lifted
+
+def lift2(f: Callable, typecode: str | None = None) -> Callable[[tuple[Sequence, Sequence]], Sequence]:
+    """Turn a function of two values into an arrow from a pair of columns to one column
+
+    As with :func:`lift`, ``f`` is called once per row.
+    """
+    def lifted(columns: tuple[Sequence, Sequence]) -> Sequence:
+        xs, ys = columns
+        return make_column(map(f, xs, ys), typecode)
+
+    return lifted
+
+def to_columns(schema: Schema, rows: Sequence):
+    """Convert a sequence of rows (nested tuples) into a batch with the given schema"""
+    if schema is None:
+        return None
+    elif isinstance(schema, Column):
+        return schema.make(rows)
+    else:
+        left, right = schema
+        return (to_columns(left, [row[0] for row in rows]),
+                to_columns(right, [row[1] for row in rows]))
+
+def to_rows(schema: Schema, batch, length: int) -> list:
+    """Convert a batch with the given schema back into a list of rows"""
+    if schema is None:
+        return [None] * length
+    elif isinstance(schema, Column):
+        return list(batch)
+    else:
+        left, right = schema
+        batch_l, batch_r = batch
+        return list(zip(to_rows(left, batch_l, length), to_rows(right, batch_r, length)))
+
+class ColumnarCategory(CategoryOfTupleFunctions):
+    """Category of functions on batches of columns
+
+    A batch is a tree of tuples, just like a single value in
+    :class:`~mathdonewrong.monoidal_categories.category_of_functions.CategoryOfUnaryFunctions`,
+    so the structural arrows are the same. Only the objects (schemas) and the
+    arrows made by :func:`lift` and :func:`lift2` are specific to batches.
+    """
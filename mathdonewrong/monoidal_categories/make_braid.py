@@ -8,18 +8,20 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
-from mathdonewrong.monoidal_categories.monoidalexpr import Braid, Compose, Drop, Id, MonoidalExpr, Stack, Unit, Var
+from typing import Callable
+
+from mathdonewrong.monoidal_categories.monoidalexpr import AssocLeft, AssocRight, Braid, Compose, Diagonal, Drop, Id, MonoidalExpr, Stack, Unit, UnitLeft, UnitLeftInv, UnitRight, UnitRightInv, Var
 
 VarTree = str | None | tuple['VarTree', 'VarTree']
 
-def vartree_to_expr(tree: VarTree) -> MonoidalExpr:
+def vartree_to_expr(tree: VarTree, leaf_to_expr: Callable[[str], MonoidalExpr] = Var) -> MonoidalExpr:
     if tree is None:
         return Unit()
     elif isinstance(tree, str):
-        return Var(tree)
+        return leaf_to_expr(tree)
     else:
         left, right = tree
-        return Stack(vartree_to_expr(left), vartree_to_expr(right))
+        return Stack(vartree_to_expr(left, leaf_to_expr), vartree_to_expr(right, leaf_to_expr))
 
 def vartree_to_set(tree: VarTree) -> set[str]:
     if tree is None:
@@ -30,40 +32,54 @@ def vartree_to_set(tree: VarTree) -> set[str]:
         left, right = tree
         return vartree_to_set(left) | vartree_to_set(right)
 
-def make_braid(domain: VarTree, codomain: VarTree) -> MonoidalExpr:
-    if domain == codomain:
-        return Id(vartree_to_expr(domain))
-    elif isinstance(domain, tuple) and isinstance(codomain, tuple):
-        domain_l, domain_r = domain
-        codomain_l, codomain_r = codomain
+def vartree_leaves(tree: VarTree) -> list[str]:
+    leaves = []
+    stack = [tree]
 
-        if domain_l == codomain_r and domain_r == codomain_l:
-            return Braid(vartree_to_expr(domain_l), vartree_to_expr(domain_r))
-        elif vartree_to_set(domain_l) >= vartree_to_set(codomain_l) and vartree_to_set(domain_r) >= vartree_to_set(codomain_r):
-            left = make_braid(domain_l, codomain_l)
-            right = make_braid(domain_r, codomain_r)
-            return Stack(left, right)
-        elif vartree_to_set(domain_l) >= vartree_to_set(codomain_r) and vartree_to_set(domain_r) >= vartree_to_set(codomain_l):
-            left = make_braid(domain_l, codomain_r)
-            right = make_braid(domain_r, codomain_l)
-            stack = Stack(left, right)
-            swap = Braid(vartree_to_expr(codomain_r), vartree_to_expr(codomain_l))
-            return Compose(stack, swap)
-
-    raise NotImplementedError(f"I can't figure out how to make a braid from {domain} to {codomain} yet.")
-
-    # Let me think about how to do this the smart way.
-    #
-    # First of all, domain must not contain any duplicate variables. If it
-    # doesn't, we can proceed.
+    while stack:
+        tree = stack.pop()
+        if isinstance(tree, str):
+            leaves.append(tree)
+        elif tree is not None:
+            left, right = tree
+            stack.append(right)
+            stack.append(left)
+
+    return leaves
+
+def balanced_vartree(leaves: list[str]) -> VarTree:
+    if not leaves:
+        return None
+    elif len(leaves) == 1:
+        return leaves[0]
+    else:
+        middle = len(leaves) // 2
+        return (balanced_vartree(leaves[:middle]), balanced_vartree(leaves[middle:]))
+
+def make_braid(domain: VarTree, codomain: VarTree, leaf_to_expr: Callable[[str], MonoidalExpr] = Var) -> MonoidalExpr:
+    """Make a structural arrow which rearranges variables
+
+    Given two trees of variable names, produce an arrow (built out of
+    ``Braid``, ``AssocLeft``, ``AssocRight``, ``Stack`` and friends) from the
+    domain to the codomain which sends each variable to its own position(s). The
+    domain must not contain any variable more than once. Variables in the
+    domain but not in the codomain are dropped with ``Drop``, and variables
+    which appear more than once in the codomain are copied with ``Diagonal``.
+
+    Objects are made out of variable names using ``leaf_to_expr``.
+    """
+    leaves = vartree_leaves(domain)
+    if len(set(leaves)) != len(leaves):
+        raise ValueError(f"the domain {domain} contains a variable more than once")
+
+    # The general strategy, implemented in BraidRouter, is as follows.
     #
-    # If codomain is None, then of course I can always just do a Drop.
+    # If the codomain is None, then of course I can always just do a Drop.
     #
-    # If codomain is a single variable, then I need to search the domain for it.
-    # It has to appear exactly once, and if it does, I can basically do a
-    # sequence of Drops in order to obtain it.
+    # If the domain contains variables which aren't needed, I first prune them
+    # (with a Drop for each maximal unneeded subtree, followed by unitors).
     #
-    # If codomain is a pair, then things are a little more complicated. The
+    # If the codomain is a pair, then things are a little more complicated. The
     # easiest case is that the domain is also a pair, and I can get codomain_l
     # from domain_l and codomain_r from domain_r. Then I can do those two things
     # and Stack them.
@@ -72,20 +88,240 @@ def make_braid(domain: VarTree, codomain: VarTree) -> MonoidalExpr:
     # domain_r and codomain_r from domain_l. In that case, I can do as above and
     # then do a Braid afterwards.
     #
-    # If neither of those is the case, then we have kind of a more complicated
-    # situation. Let's start by assuming that we don't need to drop or
-    # diagonalize any variables.
-    #
-    # In this case, there are potentially some variables that need to move from
-    # the left to the right, and potentially some that need to move from the
-    # right to the left. If both are the case, we can just do one move followed
-    # by the other move. Otherwise, without loss of generality, assume that we
-    # only need to move variables from the left to the right. In this case, we
-    # can follow a 3-step process:
-    #
-    # 1. Gather the variables that need to move into codomain[0][1].
-    # 2. Use associativity to move them all into codomain[1][0].
-    # 3. Distribute them all to where they need to go.
+    # If some variables are needed on both sides, I use a Diagonal to copy the
+    # whole domain, and then prune each copy separately.
     #
-    # Whew, does that seem complicated yet? Let's go ahead and try to implement
-    # everything piece by piece.
+    # Otherwise, some variables need to move from the left to the right, and
+    # some from the right to the left. In this case, I "split" the domain into
+    # the variables needed on the left and the variables needed on the right,
+    # working from the leaves upward. Each level of the split takes a constant
+    # number of Braids and associators, so the whole split takes time
+    # proportional to the depth of the domain. Lopsided domains are reassociated
+    # into balanced trees first, which keeps the total work near-linear.
+
+    return BraidRouter(leaf_to_expr).route(domain, codomain)
+
+class BraidRouter:
+    def __init__(self, leaf_to_expr: Callable[[str], MonoidalExpr] = Var):
+        self.leaf_to_expr = leaf_to_expr
+        self.var_sets = {}
+        self.depths = {}
+        self.exprs = {}
+        self.rebalance = True
+
+    def vars(self, tree: VarTree) -> frozenset[str]:
+        # The cache is keyed on id(tree), so it stores the tree itself in order
+        # to make sure that the id hasn't been reused.
+        cached = self.var_sets.get(id(tree))
+        if cached is not None and cached[0] is tree:
+            return cached[1]
+
+        if tree is None:
+            result = frozenset()
+        elif isinstance(tree, str):
+            result = frozenset([tree])
+        else:
+            left, right = tree
+            result = self.vars(left) | self.vars(right)
+
+        self.var_sets[id(tree)] = (tree, result)
+        return result
+
+    def depth(self, tree: VarTree) -> int:
+        cached = self.depths.get(id(tree))
+        if cached is not None and cached[0] is tree:
+            return cached[1]
+
+        if isinstance(tree, tuple):
+            left, right = tree
+            result = max(self.depth(left), self.depth(right)) + 1
+        else:
+            result = 0
+
+        self.depths[id(tree)] = (tree, result)
+        return result
+
+    def obj(self, tree: VarTree) -> MonoidalExpr:
+        cached = self.exprs.get(id(tree))
+        if cached is not None and cached[0] is tree:
+            return cached[1]
+
+        if tree is None:
+            result = Unit()
+        elif isinstance(tree, str):
+            result = self.leaf_to_expr(tree)
+        else:
+            left, right = tree
+            result = Stack(self.obj(left), self.obj(right))
+
+        self.exprs[id(tree)] = (tree, result)
+        return result
+
+    @staticmethod
+    def compose(f: MonoidalExpr, g: MonoidalExpr) -> MonoidalExpr:
+        if isinstance(f, Id):
+            return g
+        elif isinstance(g, Id):
+            return f
+        else:
+            return Compose(f, g)
+
+    @staticmethod
+    def stack(f: MonoidalExpr, g: MonoidalExpr) -> MonoidalExpr:
+        if isinstance(f, Id) and isinstance(g, Id):
+            return Id(Stack(*f.operands, *g.operands))
+        else:
+            return Stack(f, g)
+
+    def route(self, domain: VarTree, codomain: VarTree) -> MonoidalExpr:
+        obj, compose, stack = self.obj, self.compose, self.stack
+
+        if domain == codomain:
+            return Id(obj(domain))
+        elif codomain is None:
+            return Drop(obj(domain))
+
+        have, need = self.vars(domain), self.vars(codomain)
+
+        if not need <= have:
+            missing = ', '.join(sorted(need - have))
+            raise ValueError(f"can't make a braid from {domain} to {codomain}: missing {missing}")
+        elif have != need:
+            prune, pruned = self.prune(domain, need)
+            return compose(prune, self.route(pruned, codomain))
+
+        if domain is None:
+            # The codomain is a tree of units.
+            codomain_l, codomain_r = codomain
+            return compose(UnitLeft(Unit()), stack(self.route(None, codomain_l), self.route(None, codomain_r)))
+
+        if isinstance(domain, tuple):
+            domain_l, domain_r = domain
+
+            # Get rid of units in the domain.
+            if not self.vars(domain_l):
+                strip = compose(stack(self.route(domain_l, None), Id(obj(domain_r))), UnitLeftInv(obj(domain_r)))
+                return compose(strip, self.route(domain_r, codomain))
+            elif not self.vars(domain_r):
+                strip = compose(stack(Id(obj(domain_l)), self.route(domain_r, None)), UnitRightInv(obj(domain_l)))
+                return compose(strip, self.route(domain_l, codomain))
+
+        codomain_l, codomain_r = codomain
+        need_l, need_r = self.vars(codomain_l), self.vars(codomain_r)
+
+        if not need_l:
+            return compose(UnitLeft(obj(domain)), stack(self.route(None, codomain_l), self.route(domain, codomain_r)))
+        elif not need_r:
+            return compose(UnitRight(obj(domain)), stack(self.route(domain, codomain_l), self.route(None, codomain_r)))
+        elif need_l & need_r:
+            return compose(Diagonal(obj(domain)), stack(self.route(domain, codomain_l), self.route(domain, codomain_r)))
+
+        # Now the domain is a pair, and each variable is needed on exactly one
+        # side of the codomain.
+        domain_l, domain_r = domain
+
+        if domain_l == codomain_r and domain_r == codomain_l:
+            return Braid(obj(domain_l), obj(domain_r))
+        elif self.vars(domain_l) == need_l:
+            return stack(self.route(domain_l, codomain_l), self.route(domain_r, codomain_r))
+        elif self.vars(domain_l) == need_r:
+            swap = Braid(obj(codomain_r), obj(codomain_l))
+            return compose(stack(self.route(domain_l, codomain_r), self.route(domain_r, codomain_l)), swap)
+        elif self.rebalance and self.depth(domain) > 2 * len(have).bit_length() + 2:
+            # Splitting a lopsided tree is expensive, so first reassociate the
+            # domain into a balanced tree. That only needs to be done once.
+            balanced = balanced_vartree(vartree_leaves(domain))
+            self.rebalance = False
+            try:
+                reassociate = self.route(domain, balanced)
+            finally:
+                self.rebalance = True
+            return compose(reassociate, self.route(balanced, codomain))
+        else:
+            split, left, right = self.split(domain, need_l)
+            return compose(split, stack(self.route(left, codomain_l), self.route(right, codomain_r)))
+
+    def prune(self, domain: VarTree, keep: frozenset[str]) -> tuple[MonoidalExpr, VarTree]:
+        """Drop the variables not in ``keep``
+
+        Return an arrow from the domain to a tree of the remaining variables, and
+        that tree.
+        """
+        have = self.vars(domain)
+
+        if have <= keep:
+            return Id(self.obj(domain)), domain
+        elif not have & keep:
+            return Drop(self.obj(domain)), None
+
+        domain_l, domain_r = domain
+        prune_l, pruned_l = self.prune(domain_l, keep)
+        prune_r, pruned_r = self.prune(domain_r, keep)
+        prune = self.stack(prune_l, prune_r)
+
+        if pruned_l is None:
+            return self.compose(prune, UnitLeftInv(self.obj(pruned_r))), pruned_r
+        elif pruned_r is None:
+            return self.compose(prune, UnitRightInv(self.obj(pruned_l))), pruned_l
+        else:
+            return prune, (pruned_l, pruned_r)
+
+    def split(self, domain: VarTree, left_vars: frozenset[str]) -> tuple[MonoidalExpr, VarTree, VarTree]:
+        """Separate the variables in ``left_vars`` from the other variables
+
+        Return an arrow from the domain to a pair ``(left, right)``, where
+        ``left`` contains exactly the variables in ``left_vars`` and ``right``
+        contains the rest, along with ``left`` and ``right``. If one of those
+        would be empty, it's ``None``, and the arrow goes to the other one
+        alone (not to a pair).
+        """
+        have = self.vars(domain)
+
+        if have <= left_vars:
+            return Id(self.obj(domain)), domain, None
+        elif not have & left_vars:
+            return Id(self.obj(domain)), None, domain
+
+        obj, compose, stack = self.obj, self.compose, self.stack
+
+        domain_l, domain_r = domain
+        split_l, al, ar = self.split(domain_l, left_vars)
+        split_r, bl, br = self.split(domain_r, left_vars)
+        arrow = stack(split_l, split_r)
+
+        if ar is None and bl is None:
+            # (al, br)
+            pass
+        elif al is None and br is None:
+            # (ar, bl) -> (bl, ar)
+            arrow = compose(arrow, Braid(obj(ar), obj(bl)))
+        elif ar is None:
+            # (al, (bl, br)) -> ((al, bl), br)
+            arrow = compose(arrow, AssocLeft(obj(al), obj(bl), obj(br)))
+        elif al is None:
+            # (ar, (bl, br)) -> ((ar, bl), br) -> ((bl, ar), br) -> (bl, (ar, br))
+            arrow = compose(arrow, AssocLeft(obj(ar), obj(bl), obj(br)))
+            arrow = compose(arrow, stack(Braid(obj(ar), obj(bl)), Id(obj(br))))
+            arrow = compose(arrow, AssocRight(obj(bl), obj(ar), obj(br)))
+        elif br is None:
+            # ((al, ar), bl) -> (al, (ar, bl)) -> (al, (bl, ar)) -> ((al, bl), ar)
+            arrow = compose(arrow, AssocRight(obj(al), obj(ar), obj(bl)))
+            arrow = compose(arrow, stack(Id(obj(al)), Braid(obj(ar), obj(bl))))
+            arrow = compose(arrow, AssocLeft(obj(al), obj(bl), obj(ar)))
+        elif bl is None:
+            # ((al, ar), br) -> (al, (ar, br))
+            arrow = compose(arrow, AssocRight(obj(al), obj(ar), obj(br)))
+        else:
+            # ((al, ar), (bl, br)) -> (al, (ar, (bl, br))) -> (al, ((ar, bl), br))
+            #   -> (al, ((bl, ar), br)) -> (al, (bl, (ar, br))) -> ((al, bl), (ar, br))
+            b = (bl, br)
+            ar_br = (ar, br)
+            arrow = compose(arrow, AssocRight(obj(al), obj(ar), obj(b)))
+            arrow = compose(arrow, stack(Id(obj(al)), AssocLeft(obj(ar), obj(bl), obj(br))))
+            arrow = compose(arrow, stack(Id(obj(al)), stack(Braid(obj(ar), obj(bl)), Id(obj(br)))))
+            arrow = compose(arrow, stack(Id(obj(al)), AssocRight(obj(bl), obj(ar), obj(br))))
+            arrow = compose(arrow, AssocLeft(obj(al), obj(bl), obj(ar_br)))
+
+        left = al if bl is None else bl if al is None else (al, bl)
+        right = ar if br is None else br if ar is None else (ar, br)
+        return arrow, left, right
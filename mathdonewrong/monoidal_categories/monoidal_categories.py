@@ -56,6 +56,9 @@ class CartesianMonoidalCategory(SymmetricMonoidalCategory):
         raise NotImplementedError
 
 class ClosedMonoidalCategory(MonoidalCategory):
+    def exp(self, A: Ob, B: Ob) -> Ob:
+        raise NotImplementedError
+
     def into(self, A: Ob, f: Arr[B, C]) -> Arr[A >> B, A >> C]:
         raise NotImplementedError
 
@@ -11,75 +11,86 @@
 import mathdonewrong.expressions as ex
 
 class MonoidalExpr(ex.Expression):
-    pass
+    __slots__ = ()
 
 class Var(MonoidalExpr, ex.Var):
-    pass
+    __slots__ = ()
+
+class Literal(MonoidalExpr, ex.Literal):
+    __slots__ = ()
 
 class Id(MonoidalExpr, ex.NamedOper):
     # ==> A -> A
-    pass
+    __slots__ = ()
 
 class Compose(MonoidalExpr, ex.NamedOper):
     # A -> B, B -> C ==> A -> C
-    pass
+    __slots__ = ()
 
 class Stack(MonoidalExpr, ex.NamedOper):
     # A -> C, B -> D ==> A * B -> C * D
-    pass
+    __slots__ = ()
 
 class AssocRight(MonoidalExpr, ex.NamedOper):
     # ==> (A * B) * C -> A * (B * C)
-    pass
+    __slots__ = ()
 
 class AssocLeft(MonoidalExpr, ex.NamedOper):
     # ==> A * (B * C) -> (A * B) * C
-    pass
+    __slots__ = ()
 
 class Unit(MonoidalExpr, ex.NamedOper):
     # 1
-    pass
+    __slots__ = ()
 
 class UnitLeft(MonoidalExpr, ex.NamedOper):
     # ==> A -> 1 * A
-    pass
+    __slots__ = ()
 
 class UnitRight(MonoidalExpr, ex.NamedOper):
     # ==> A -> A * 1
-    pass
+    __slots__ = ()
 
 class UnitLeftInv(MonoidalExpr, ex.NamedOper):
     # ==> 1 * A -> A
-    pass
+    __slots__ = ()
 
 class UnitRightInv(MonoidalExpr, ex.NamedOper):
     # ==> A * 1 -> A
-    pass
+    __slots__ = ()
 
 class Braid(MonoidalExpr, ex.NamedOper):
     # ==> A * B -> B * A
-    pass
+    __slots__ = ()
 
 class BraidInv(MonoidalExpr, ex.NamedOper):
     # ==> B * A -> A * B
-    pass
+    __slots__ = ()
 
 class Drop(MonoidalExpr, ex.NamedOper):
     # ==> A -> 1
-    pass
+    __slots__ = ()
 
 class Diagonal(MonoidalExpr, ex.NamedOper):
     # ==> A -> A * A
-    pass
+    __slots__ = ()
+
+class Exp(MonoidalExpr, ex.NamedOper):
+    # A >> B
+    __slots__ = ()
+
+class Const(MonoidalExpr, ex.NamedOper):
+    # ==> 1 -> A (written Const(A, x), for a value x in A)
+    __slots__ = ()
 
 class Into(MonoidalExpr, ex.NamedOper):
     # B -> C ==> A >> B -> A >> C
-    pass
+    __slots__ = ()
 
 class Curry(MonoidalExpr, ex.NamedOper):
     # A * B -> C ==> A -> B >> C
-    pass
+    __slots__ = ()
 
 class CurryInv(MonoidalExpr, ex.NamedOper):
     # A -> B >> C ==> A * B -> C
-    pass
+    __slots__ = ()
@@ -0,0 +1,191 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+Simplifying monoidal expressions
+
+Generated monoidal expressions (such as the ones produced by
+:func:`~mathdonewrong.monoidal_categories.make_braid.make_braid`) tend to
+contain structural arrows that undo each other, such as a ``Braid`` followed by
+a ``BraidInv``. The :func:`optimize` function removes these using the coherence
+laws of symmetric monoidal categories:
+
+* identities are units for composition: ``Compose(Id(A), f) = f``;
+* each structural arrow is cancelled by its inverse, e.g. ``AssocRight(A, B, C)``
+  followed by ``AssocLeft(A, B, C)`` is ``Id(Stack(Stack(A, B), C))``, and a
+  ``Braid(A, B)`` followed by ``Braid(B, A)`` is an identity;
+* ``Stack(Id(A), Id(B)) = Id(Stack(A, B))``;
+* composing two ``Stack``\s gives a ``Stack`` of compositions (the interchange
+  law), which brings more pairs of inverses next to each other.
+
+Composition is associative, so chains of ``Compose``\s are treated as flat
+lists, and the result is a left-nested chain.
+
+If a :class:`~mathdonewrong.monoidal_categories.typechecker.TypeChecker` is
+given, the expression is typechecked first, and any structural arrow which
+turns out to be an identity (such as ``Braid(Unit(), Unit())``, or a chain of
+associators that ends up where it started) is replaced with an ``Id`` on its
+known object.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+
+from mathdonewrong.expressions import Expression
+from mathdonewrong.monoidal_categories.monoidalexpr import Compose, Id, MonoidalExpr, Stack, Unit
+from mathdonewrong.monoidal_categories.structural import is_structural, structural_shapes
+from mathdonewrong.monoidal_categories.typechecker import TypeChecker
+
+@dataclass
+class OptimizationResult:
+    expr: MonoidalExpr
+    nodes_removed: int
+
+def is_oper(expr: Expression, name: str) -> bool:
+    return expr.tag == 'oper' and expr.name == name
+
+def node_count(expr: Expression) -> int:
+    count = 0
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.tag == 'oper':
+            stack.extend(node.operands)
+
+    return count
+
+def cancel(f: MonoidalExpr, g: MonoidalExpr) -> MonoidalExpr | None:
+    """If ``g`` is the inverse of ``f``, return the identity that composing them gives"""
+    if f.tag != 'oper' or g.tag != 'oper' or f.operands == () or g.operands == ():
+        return None
+
+    pair = (f.name, g.name)
+
+    if pair in [('Braid', 'BraidInv'), ('BraidInv', 'Braid')] and f.operands == g.operands:
+        A, B = f.operands
+        return Id(Stack(A, B) if f.name == 'Braid' else Stack(B, A))
+    elif pair == ('Braid', 'Braid') and f.operands == g.operands[::-1]:
+        return Id(Stack(*f.operands))
+    elif pair == ('AssocRight', 'AssocLeft') and f.operands == g.operands:
+        A, B, C = f.operands
+        return Id(Stack(Stack(A, B), C))
+    elif pair == ('AssocLeft', 'AssocRight') and f.operands == g.operands:
+        A, B, C = f.operands
+        return Id(Stack(A, Stack(B, C)))
+    elif pair in [('UnitLeft', 'UnitLeftInv'), ('UnitRight', 'UnitRightInv')] and f.operands == g.operands:
+        return Id(*f.operands)
+    elif pair == ('UnitLeftInv', 'UnitLeft') and f.operands == g.operands:
+        return Id(Stack(Unit(), *f.operands))
+    elif pair == ('UnitRightInv', 'UnitRight') and f.operands == g.operands:
+        return Id(Stack(*f.operands, Unit()))
+
+    return None
+
+def erase_identity(expr: MonoidalExpr, checker: TypeChecker) -> MonoidalExpr:
+    """If ``expr`` is a structural arrow which does nothing, return the identity on its object"""
+    if is_oper(expr, 'Id') or not is_structural(expr):
+        return expr
+
+    arrow_type = checker.infer(expr)
+    if arrow_type.domain != arrow_type.codomain:
+        return expr
+
+    domain, codomain = structural_shapes(expr)
+    if domain == codomain:
+        return Id(arrow_type.domain)
+    else:
+        return expr
+
+def simplify_chain(stages: list[MonoidalExpr], checker: TypeChecker | None = None) -> MonoidalExpr:
+    result = []
+
+    for stage in stages:
+        while result:
+            previous = result[-1]
+            if is_oper(stage, 'Id'):
+                stage = previous
+            elif is_oper(previous, 'Id'):
+                pass
+            elif (identity := cancel(previous, stage)) is not None:
+                stage = identity
+            elif is_oper(previous, 'Stack') and is_oper(stage, 'Stack'):
+                (f, g), (h, k) = previous.operands, stage.operands
+                stage = simplify(Stack(Compose(f, h), Compose(g, k)), checker)
+            else:
+                break
+            result.pop()
+
+        result.append(stage)
+
+    expr = result[0]
+    for stage in result[1:]:
+        expr = Compose(expr, stage)
+
+    return expr
+
+def compose_stages(expr: MonoidalExpr) -> list[MonoidalExpr]:
+    stages = []
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+        if is_oper(node, 'Compose'):
+            stack.extend(reversed(node.operands))
+        else:
+            stages.append(node)
+
+    return stages
+
+def simplify(expr: MonoidalExpr, checker: TypeChecker | None = None) -> MonoidalExpr:
+    """Make a single bottom-up simplification pass over an expression"""
+    if expr.tag != 'oper':
+        return expr
+
+    if is_oper(expr, 'Compose'):
+        expr = simplify_chain([simplify(stage, checker) for stage in compose_stages(expr)], checker)
+    else:
+        operands = [simplify(operand, checker) for operand in expr.operands]
+        if any(new is not old for new, old in zip(operands, expr.operands)):
+            expr = expr.copy_with_new_operands(operands)
+
+        if is_oper(expr, 'Stack') and all(is_oper(operand, 'Id') for operand in expr.operands):
+            (A,), (B,) = (operand.operands for operand in expr.operands)
+            expr = Id(Stack(A, B))
+
+    if checker is not None:
+        expr = erase_identity(expr, checker)
+
+    return expr
+
+def optimize(expr: MonoidalExpr, checker: TypeChecker | None = None) -> OptimizationResult:
+    """Simplify a monoidal expression until nothing more can be simplified
+
+    Return the simplified expression along with the number of nodes that were
+    removed. If ``checker`` is given, the expression is typechecked first
+    (raising ``TypeError`` if it isn't well typed), and type information is
+    used to find more simplifications.
+    """
+    original_size = node_count(expr)
+
+    if checker is not None:
+        # Each pass looks up the types of the same subexpressions again, so
+        # remember them, but only until the optimization is done.
+        checker = TypeChecker(checker.context, remember=True)
+        checker.infer(expr)
+
+    while True:
+        simplified = simplify(expr, checker)
+        if simplified == expr:
+            break
+        expr = simplified
+
+    return OptimizationResult(expr, original_size - node_count(expr))
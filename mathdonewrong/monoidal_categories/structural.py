@@ -0,0 +1,307 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+Compiling structural arrows
+
+Arrows such as ``Braid``, ``AssocLeft`` and ``Diagonal`` don't compute anything;
+they only move data around. Any arrow built entirely out of these (together
+with ``Id``, ``Compose`` and ``Stack``) sends each leaf of its output to some
+leaf of its input, so it can be described by a single index map.
+
+:func:`compile_structural` works out that index map once, and then generates a
+function which unpacks its input and builds its output in one step, instead of
+building every intermediate tuple the way :class:`CategoryOfUnaryFunctions`
+does.
+
+An object expression is treated as a single leaf unless it's a ``Unit`` or a
+``Stack``.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Sequence
+
+from mathdonewrong.monoidal_categories.monoidalexpr import MonoidalExpr
+
+STRUCTURAL_NAMES = frozenset([
+    'Id', 'Compose', 'Stack', 'AssocLeft', 'AssocRight', 'UnitLeft', 'UnitRight',
+    'UnitLeftInv', 'UnitRightInv', 'Braid', 'BraidInv', 'Drop', 'Diagonal',
+])
+
+# A shape is None (the unit), an int (the index of an input leaf), or a pair of
+# shapes.
+Shape = None | int | tuple['Shape', 'Shape']
+
+class Leaf:
+    """A placeholder for an input leaf, used while tracing an arrow"""
+
+    __slots__ = ('index',)
+
+    def __init__(self, index: int):
+        self.index = index
+
+def is_structural(expr: MonoidalExpr) -> bool:
+    """Tell whether an arrow is built entirely out of structural arrows"""
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+        if node.tag != 'oper' or node.name not in STRUCTURAL_NAMES:
+            return False
+        if node.name in ('Compose', 'Stack'):
+            stack.extend(node.operands)
+
+    return True
+
+def object_shape(obj: MonoidalExpr, leaves: list[Leaf]):
+    """Make a tree of fresh leaves with the shape of an object"""
+    if obj.tag == 'oper' and obj.name == 'Unit':
+        return None
+    elif obj.tag == 'oper' and obj.name == 'Stack':
+        left, right = obj.operands
+        return object_shape(left, leaves), object_shape(right, leaves)
+    else:
+        leaf = Leaf(len(leaves))
+        leaves.append(leaf)
+        return leaf
+
+def domain_object(expr: MonoidalExpr) -> tuple:
+    """Find the domain of a structural arrow
+
+    The result is a tuple ``('Stack', left, right)``, ``('Unit',)`` or
+    ``('Object', obj)``, so that nothing new needs to be built.
+    """
+    while expr.name == 'Compose':
+        expr = expr.operands[0]
+
+    name, operands = expr.name, expr.operands
+
+    if name == 'Stack':
+        return ('Stack', domain_object(operands[0]), domain_object(operands[1]))
+    elif name == 'AssocRight':
+        A, B, C = operands
+        return ('Stack', ('Stack', ('Object', A), ('Object', B)), ('Object', C))
+    elif name == 'AssocLeft':
+        A, B, C = operands
+        return ('Stack', ('Object', A), ('Stack', ('Object', B), ('Object', C)))
+    elif name == 'UnitLeftInv':
+        return ('Stack', ('Unit',), ('Object', operands[0]))
+    elif name == 'UnitRightInv':
+        return ('Stack', ('Object', operands[0]), ('Unit',))
+    elif name == 'Braid':
+        A, B = operands
+        return ('Stack', ('Object', A), ('Object', B))
+    elif name == 'BraidInv':
+        A, B = operands
+        return ('Stack', ('Object', B), ('Object', A))
+    else:
+        # Id, UnitLeft, UnitRight, Drop and Diagonal
+        return ('Object', operands[0])
+
+def domain_shape(domain: tuple, leaves: list[Leaf]):
+    if domain[0] == 'Stack':
+        return domain_shape(domain[1], leaves), domain_shape(domain[2], leaves)
+    elif domain[0] == 'Unit':
+        return None
+    else:
+        return object_shape(domain[1], leaves)
+
+def trace(expr: MonoidalExpr, value):
+    """Apply a structural arrow to a tree of placeholders"""
+    name, operands = expr.name, expr.operands
+
+    if name == 'Compose':
+        # Go through chains of Compose in order, without recursing on each one.
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            if node.name == 'Compose':
+                stack.extend(reversed(node.operands))
+            else:
+                value = trace(node, value)
+        return value
+    elif name == 'Stack':
+        f, g = operands
+        x, y = value
+        return trace(f, x), trace(g, y)
+    elif name == 'Id':
+        return value
+    elif name == 'AssocRight':
+        (x, y), z = value
+        return x, (y, z)
+    elif name == 'AssocLeft':
+        x, (y, z) = value
+        return (x, y), z
+    elif name == 'UnitLeft':
+        return None, value
+    elif name == 'UnitRight':
+        return value, None
+    elif name == 'UnitLeftInv':
+        _, x = value
+        return x
+    elif name == 'UnitRightInv':
+        x, _ = value
+        return x
+    elif name in ('Braid', 'BraidInv'):
+        x, y = value
+        return y, x
+    elif name == 'Drop':
+        return None
+    elif name == 'Diagonal':
+        return value, value
+    else:
+        raise ValueError(f"{name} is not a structural arrow")
+
+def to_shape(value) -> Shape:
+    if value is None:
+        return None
+    elif isinstance(value, Leaf):
+        return value.index
+    else:
+        left, right = value
+        return to_shape(left), to_shape(right)
+
+def shape_leaves(shape: Shape) -> Iterator[int | None]:
+    stack = [shape]
+
+    while stack:
+        shape = stack.pop()
+        if isinstance(shape, tuple):
+            stack.append(shape[1])
+            stack.append(shape[0])
+        else:
+            yield shape
+
+# Tuples nested more deeply than this are unpacked into, or packed from,
+# temporary variables, since the compiler can't handle deeply nested
+# parentheses.
+MAX_NESTING = 16
+
+def unpack_target(shape: Shape, pending: list[tuple[Shape, str]], depth: int = 0) -> str:
+    if shape is None:
+        return '_'
+    elif isinstance(shape, int):
+        return f'a{shape}'
+    elif depth == MAX_NESTING:
+        temp = f'u{len(pending)}'
+        pending.append((shape, temp))
+        return temp
+    else:
+        return f'({unpack_target(shape[0], pending, depth + 1)}, {unpack_target(shape[1], pending, depth + 1)})'
+
+def unpack_lines(shape: Shape, source: str) -> list[str]:
+    """Make statements which unpack the tuple named ``source`` into variables ``a0``, ``a1``, ..."""
+    lines = []
+    pending = [(shape, source)]
+    done = 0
+
+    while done < len(pending):
+        shape, source = pending[done]
+        done += 1
+        lines.append(f'{unpack_target(shape, pending)} = {source}')
+
+    return lines
+
+def pack_lines(shape: Shape) -> tuple[list[str], str]:
+    """Make statements which build a value with the given shape out of ``a0``, ``a1``, ...
+
+    Return the statements and an expression for the value.
+    """
+    lines = []
+    values: list[tuple[str, int]] = []
+    stack = [(shape, False)]
+
+    while stack:
+        shape, ready = stack.pop()
+        if shape is None:
+            values.append(('None', 0))
+        elif isinstance(shape, int):
+            values.append((f'a{shape}', 0))
+        elif not ready:
+            stack.append((shape, True))
+            stack.append((shape[1], False))
+            stack.append((shape[0], False))
+        else:
+            right, right_depth = values.pop()
+            left, left_depth = values.pop()
+            value, depth = f'({left}, {right})', max(left_depth, right_depth) + 1
+            if depth == MAX_NESTING:
+                temp = f'p{len(lines)}'
+                lines.append(f'{temp} = {value}')
+                value, depth = temp, 0
+            values.append((value, depth))
+
+    return lines, values[0][0]
+
+@dataclass
+class StructuralMap:
+    """A compiled structural arrow
+
+    ``domain`` is the shape of the input, with the input leaves numbered from
+    left to right, and ``codomain`` is the shape of the output, with each leaf
+    labeled by the input leaf it comes from. ``index_map`` lists the output
+    leaves in order, with ``None`` for units.
+    """
+
+    domain: Shape
+    codomain: Shape
+    func: Callable = field(init=False, repr=False)
+
+    def __post_init__(self):
+        pack, result = pack_lines(self.codomain)
+        body = unpack_lines(self.domain, 't') + pack + [f'return {result}']
+        source = 'def structural_func(t):\n' + ''.join(f'    {line}\n' for line in body)
+        namespace = {}
+        exec(source, namespace)
+        self.func = namespace['structural_func']
+
+    @property
+    def index_map(self) -> tuple[int | None, ...]:
+        return tuple(shape_leaves(self.codomain))
+
+    def __call__(self, value):
+        return self.func(value)
+
+    def apply_all(self, values: Iterable) -> Iterator:
+        """Apply the map to each of a sequence of inputs"""
+        return map(self.func, values)
+
+    def apply_columns(self, columns: Sequence) -> list:
+        """Apply the map to a batch stored as one column per input leaf
+
+        Each output column is one of the input columns (or ``None`` for a unit),
+        so nothing is copied.
+        """
+        return [None if index is None else columns[index] for index in self.index_map]
+
+def compile_structural(expr: MonoidalExpr) -> StructuralMap:
+    """Collapse a structural arrow into a single :class:`StructuralMap`
+
+    Raise ``ValueError`` if the arrow isn't structural, or if its parts don't
+    fit together (for example, if a ``Braid`` is applied to something whose
+    object is just a variable).
+    """
+    return StructuralMap(*structural_shapes(expr))
+
+def structural_shapes(expr: MonoidalExpr) -> tuple[Shape, Shape]:
+    """Find the domain and codomain shapes of a structural arrow, as in :class:`StructuralMap`"""
+    if not is_structural(expr):
+        raise ValueError(f"{expr} is not built entirely out of structural arrows")
+
+    leaves = []
+    value = domain_shape(domain_object(expr), leaves)
+
+    try:
+        result = trace(expr, value)
+    except TypeError as e:
+        raise ValueError(f"the parts of {expr} don't fit together") from e
+
+    return to_shape(value), to_shape(result)
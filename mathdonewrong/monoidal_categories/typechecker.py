@@ -0,0 +1,206 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Inferring the types of monoidal expressions
+
+:class:`TypingCategory` is a category in which each arrow is just an
+:class:`ArrowType` (a domain and a codomain) and each object is an object
+expression, such as ``Stack(Var('A'), Unit())``. Evaluating an arrow expression
+in this category finds its type, or raises ``TypeError`` if the parts of the
+expression don't fit together.
+
+:class:`TypeChecker` does the same thing without recursion. It can also
+remember the type of every node it has seen, so that checking an expression
+which shares subexpressions with one checked earlier is cheap.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+
+from mathdonewrong.expressions import Expression
+from mathdonewrong.monoidal_categories.monoidal_categories import CartesianClosedCategory
+from mathdonewrong.monoidal_categories.monoidalexpr import Exp, MonoidalExpr, Stack, Unit, Var
+
+@dataclass(frozen=True)
+class ArrowType:
+    domain: MonoidalExpr
+    codomain: MonoidalExpr
+
+    def __str__(self):
+        return f'{self.domain} -> {self.codomain}'
+
+def check_object(A) -> MonoidalExpr:
+    if isinstance(A, ArrowType):
+        raise TypeError(f"expected an object, but got an arrow of type {A}")
+    return A
+
+def check_arrow(f) -> ArrowType:
+    if not isinstance(f, ArrowType):
+        raise TypeError(f"expected an arrow, but got the object {f}")
+    return f
+
+def split_stack(A: MonoidalExpr, role: str) -> tuple[MonoidalExpr, MonoidalExpr]:
+    if A.tag != 'oper' or A.name != 'Stack':
+        raise TypeError(f"expected the {role} to be a product, but it's {A}")
+    return A.operands
+
+def split_exp(A: MonoidalExpr, role: str) -> tuple[MonoidalExpr, MonoidalExpr]:
+    if A.tag != 'oper' or A.name != 'Exp':
+        raise TypeError(f"expected the {role} to be an exponential, but it's {A}")
+    return A.operands
+
+class TypingCategory(CartesianClosedCategory):
+    """A category whose arrows are arrow types"""
+
+    def id(self, A: MonoidalExpr) -> ArrowType:
+        A = check_object(A)
+        return ArrowType(A, A)
+
+    def compose(self, f: ArrowType, g: ArrowType) -> ArrowType:
+        f, g = check_arrow(f), check_arrow(g)
+        if f.codomain != g.domain:
+            raise TypeError(f"can't compose an arrow of type {f} with an arrow of type {g}")
+        return ArrowType(f.domain, g.codomain)
+
+    def domain(self, f: ArrowType) -> MonoidalExpr:
+        return f.domain
+
+    def codomain(self, f: ArrowType) -> MonoidalExpr:
+        return f.codomain
+
+    def stack(self, f, g):
+        # Stack is used both for objects and for arrows.
+        if isinstance(f, ArrowType) and isinstance(g, ArrowType):
+            return ArrowType(Stack(f.domain, g.domain), Stack(f.codomain, g.codomain))
+        else:
+            return Stack(check_object(f), check_object(g))
+
+    def assoc_right(self, A, B, C) -> ArrowType:
+        A, B, C = check_object(A), check_object(B), check_object(C)
+        return ArrowType(Stack(Stack(A, B), C), Stack(A, Stack(B, C)))
+
+    def assoc_left(self, A, B, C) -> ArrowType:
+        A, B, C = check_object(A), check_object(B), check_object(C)
+        return ArrowType(Stack(A, Stack(B, C)), Stack(Stack(A, B), C))
+
+    def unit(self) -> MonoidalExpr:
+        return Unit()
+
+    def unit_left(self, A) -> ArrowType:
+        A = check_object(A)
+        return ArrowType(A, Stack(Unit(), A))
+
+    def unit_right(self, A) -> ArrowType:
+        A = check_object(A)
+        return ArrowType(A, Stack(A, Unit()))
+
+    def unit_left_inv(self, A) -> ArrowType:
+        A = check_object(A)
+        return ArrowType(Stack(Unit(), A), A)
+
+    def unit_right_inv(self, A) -> ArrowType:
+        A = check_object(A)
+        return ArrowType(Stack(A, Unit()), A)
+
+    def braid(self, A, B) -> ArrowType:
+        A, B = check_object(A), check_object(B)
+        return ArrowType(Stack(A, B), Stack(B, A))
+
+    def braid_inv(self, A, B) -> ArrowType:
+        A, B = check_object(A), check_object(B)
+        return ArrowType(Stack(B, A), Stack(A, B))
+
+    def drop(self, A) -> ArrowType:
+        A = check_object(A)
+        return ArrowType(A, Unit())
+
+    def diagonal(self, A) -> ArrowType:
+        A = check_object(A)
+        return ArrowType(A, Stack(A, A))
+
+    def exp(self, A, B) -> MonoidalExpr:
+        return Exp(check_object(A), check_object(B))
+
+    def const(self, A, value) -> ArrowType:
+        return ArrowType(Unit(), check_object(A))
+
+    def into(self, A, f) -> ArrowType:
+        A, f = check_object(A), check_arrow(f)
+        return ArrowType(Exp(A, f.domain), Exp(A, f.codomain))
+
+    def curry(self, f) -> ArrowType:
+        f = check_arrow(f)
+        A, B = split_stack(f.domain, 'domain of a curried arrow')
+        return ArrowType(A, Exp(B, f.codomain))
+
+    def curry_inv(self, f) -> ArrowType:
+        f = check_arrow(f)
+        B, C = split_exp(f.codomain, 'codomain of an uncurried arrow')
+        return ArrowType(Stack(f.domain, B), C)
+
+class TypeChecker:
+    r"""Infer the types of arrow expressions
+
+    ``context`` maps variable names to :class:`ArrowType`\s (for arrow
+    variables) or object expressions. Variables that aren't in the context
+    stand for objects, namely themselves.
+
+    Normally, the type of each node is only remembered during a single call to
+    :meth:`infer`. If ``remember`` is true, the types are kept in ``types``
+    for as long as the checker exists (along with the nodes themselves), so a
+    remembering checker should only be kept for the length of one job.
+    """
+
+    def __init__(self, context: dict | None = None, remember: bool = False):
+        self.category = TypingCategory()
+        self.context = {} if context is None else context
+        self.remember = remember
+        self.types = {}
+
+    def infer(self, expr: Expression):
+        """Find the type of an arrow expression (or the object an object expression stands for)
+
+        Raise ``TypeError`` if the expression isn't well typed.
+        """
+        types = self.types if self.remember else {}
+        stack = [(expr, False)]
+
+        while stack:
+            node, ready = stack.pop()
+
+            cached = types.get(id(node))
+            if cached is not None and cached[0] is node:
+                continue
+
+            if node.tag == 'var':
+                result = self.context.get(node.name, Var(node.name))
+            elif node.tag == 'literal':
+                result = node.value
+            elif not ready:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands)
+                continue
+            else:
+                operand_types = [types[id(operand)][1] for operand in node.operands]
+                try:
+                    result = self.category.operate(node.name, operand_types)
+                except TypeError as e:
+                    raise TypeError(f"in {node}: {e}") from None
+
+            # The node is stored along with its type so that the id can't be
+            # reused by a different node.
+            types[id(node)] = (node, result)
+
+        return types[id(expr)][1]
+
+def typecheck(expr: Expression, context: dict | None = None):
+    """Find the type of an arrow expression, raising ``TypeError`` if it isn't well typed"""
+    return TypeChecker(context).infer(expr)
@@ -16,5 +16,8 @@ Eventually, this module will contain definitions of monoids and various kinds of
 algebras related to monoids.
 
 For now, only plain old monoids are defined. See
-:mod:`mathdonewrong.monoidlike.monoids`.
+:mod:`mathdonewrong.monoidlike.monoids`, and
+:mod:`mathdonewrong.monoidlike.finite_monoids` for monoids given by Cayley
+tables, and :mod:`mathdonewrong.monoidlike.free_monoids` for deciding (and
+proving) equality in free monoids.
 """
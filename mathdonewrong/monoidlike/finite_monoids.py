@@ -0,0 +1,140 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+Finite monoids
+
+A finite monoid can be described completely by its *Cayley table*: number the
+elements :math:`0, 1, \ldots, n - 1`, and write down the number of the product
+of each pair of elements.
+
+.. autoclass:: mathdonewrong.monoidlike.finite_monoids.FiniteMonoid
+   :members:
+"""
+
+from __future__ import annotations
+from array import array
+from itertools import repeat
+from operator import add, mul
+from typing import Any, Hashable, Sequence
+
+from mathdonewrong.monoidlike.monoids import Monoid
+
+class FiniteMonoid(Monoid):
+    r"""
+    Monoid given by a Cayley table
+
+    A ``FiniteMonoid`` has a list of ``elements`` (which must be hashable) and a
+    ``table`` such that ``table[i][j]`` is the index of the product of
+    ``elements[i]`` and ``elements[j]``.
+
+    Besides the usual monoid operations on elements, a ``FiniteMonoid`` can
+    operate on element *indices* stored in :class:`array.array`\s, many at a
+    time; see :meth:`mop_indices` and :meth:`mop_all_indices`.
+
+    >>> FiniteMonoid.from_monoid(bool_xor, [False, True]).mop_indices(array('I', [0, 1, 1]), array('I', [1, 1, 0]))
+    array('I', [1, 0, 1])
+    """
+
+    def __init__(self, elements: Sequence[Hashable], table: Sequence[Sequence[int]]):
+        self.elements = list(elements)
+        self.size = n = len(self.elements)
+        self.indices = {x: i for i, x in enumerate(self.elements)}
+
+        if len(self.indices) != n:
+            raise ValueError("the elements of a finite monoid must be distinct")
+        if len(table) != n or any(len(row) != n for row in table):
+            raise ValueError(f"the Cayley table of a monoid with {n} elements must be {n} by {n}")
+
+        # The table is stored flattened, so that the product of i and j is
+        # self.table[i * n + j].
+        self.table = array('I', (k for row in table for k in row))
+        if any(k >= n for k in self.table):
+            raise ValueError("the Cayley table contains an index which is out of range")
+
+        self.id_index = self.find_identity()
+        if self.id_index is None:
+            raise ValueError("the Cayley table has no identity element")
+
+    @classmethod
+    def from_monoid(cls, monoid: Monoid, elements: Sequence[Hashable]) -> FiniteMonoid:
+        """Tabulate a monoid on a list of elements
+
+        The list must be closed under the monoid operation.
+        """
+        indices = {x: i for i, x in enumerate(elements)}
+
+        try:
+            table = [[indices[monoid.mop_(a, b)] for b in elements] for a in elements]
+        except KeyError as e:
+            raise ValueError(f"the elements are not closed under the monoid operation: {e.args[0]!r} is missing") from None
+
+        return cls(elements, table)
+
+    def find_identity(self) -> int | None:
+        """Find the index of the identity element, or ``None`` if there isn't one"""
+        n, table = self.size, self.table
+        everything = array('I', range(n))
+
+        for i in range(n):
+            if table[i * n:(i + 1) * n] == everything and table[i::n] == everything:
+                return i
+
+        return None
+
+    def is_associative(self) -> bool:
+        """Check whether the table is associative
+
+        This takes :math:`O(n^2)` array operations of length :math:`n`.
+        """
+        n, table = self.size, self.table
+
+        for a in range(n):
+            for b in range(n):
+                ab = table[a * n + b]
+                left = table[ab * n:(ab + 1) * n]
+                right = array('I', map(table.__getitem__, map(add, repeat(a * n), table[b * n:(b + 1) * n])))
+                if left != right:
+                    return False
+
+        return True
+
+    def id_(self) -> Any:
+        return self.elements[self.id_index]
+
+    def mop_(self, a: Any, b: Any) -> Any:
+        return self.elements[self.table[self.indices[a] * self.size + self.indices[b]]]
+
+    def mop_all(self, elements: list) -> Any:
+        indices = array('I', map(self.indices.__getitem__, elements))
+        return self.elements[self.mop_all_indices(indices)]
+
+    def to_indices(self, elements: Sequence) -> array:
+        """Convert a sequence of elements into an array of indices"""
+        return array('I', map(self.indices.__getitem__, elements))
+
+    def from_indices(self, indices: Sequence[int]) -> list:
+        """Convert a sequence of indices into a list of elements"""
+        return list(map(self.elements.__getitem__, indices))
+
+    def mop_indices(self, xs: array, ys: array) -> array:
+        """Multiply two equally long arrays of indices elementwise"""
+        offsets = map(mul, xs, repeat(self.size))
+        return array('I', map(self.table.__getitem__, map(add, offsets, ys)))
+
+    def mop_all_indices(self, xs: array) -> int:
+        """Multiply together all of the elements in an array of indices, in order"""
+        while len(xs) > 1:
+            products = self.mop_indices(xs[0::2], xs[1::2])
+            if len(xs) % 2 == 1:
+                products.append(xs[-1])
+            xs = products
+
+        return xs[0] if xs else self.id_index
@@ -0,0 +1,154 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+Free monoids
+
+Two :class:`~mathdonewrong.monoidlike.monoids.MonoidExpr`\s are equal in the
+free monoid if and only if they contain the same variables and literals in the
+same order, ignoring parentheses and identity elements. In other words, each
+expression is equal to a *word*, and the word problem for the free monoid is
+just comparison of words.
+
+This module computes those words, and also produces
+:class:`~mathdonewrong.monoidlike.monoids.MonoidEquation`\s proving that two
+expressions with the same word are equal.
+
+.. autofunction:: monoid_word
+
+.. autofunction:: free_monoid_equal
+
+.. autofunction:: prove_equal
+"""
+
+from __future__ import annotations
+from typing import Any, Hashable
+
+from mathdonewrong.monoidlike.monoids import Id, MonLiteral, MonoidEquation, MonoidExpr, MonVar, Mop
+from mathdonewrong.monoidlike.proof_store import InternedEquation, ProofStore
+
+Atom = tuple[str, Hashable]
+
+def monoid_word(expr: MonoidExpr) -> tuple[Atom, ...]:
+    """Flatten a monoid expression into a word
+
+    The word is a tuple of atoms, where each atom is either ``('var', name)`` or
+    ``('literal', value)``. All ``Mop`` nesting and all ``Id``\\s are removed.
+    """
+    word = []
+    stack = [expr]
+
+    while stack:
+        expr = stack.pop()
+        tag = expr.tag
+
+        if tag == 'var':
+            word.append(('var', expr.name))
+        elif tag == 'literal':
+            word.append(('literal', expr.value))
+        elif expr.name == 'Mop':
+            left, right = expr.operands
+            stack.append(right)
+            stack.append(left)
+        elif expr.name == 'Id':
+            pass
+        else:
+            raise ValueError(f"{expr} is not a monoid expression")
+
+    return tuple(word)
+
+def free_monoid_equal(a: MonoidExpr, b: MonoidExpr) -> bool:
+    """Decide whether two monoid expressions are equal in the free monoid"""
+    return monoid_word(a) == monoid_word(b)
+
+def atom_to_expr(atom: Atom) -> MonoidExpr:
+    tag, payload = atom
+    return MonVar(payload) if tag == 'var' else MonLiteral(payload)
+
+def word_to_expr(word: tuple[Atom, ...]) -> MonoidExpr:
+    """Build the right-nested expression for a word, such as ``x * (y * z)``"""
+    if not word:
+        return Id()
+
+    expr = atom_to_expr(word[-1])
+    for atom in reversed(word[:-1]):
+        expr = Mop(atom_to_expr(atom), expr)
+
+    return expr
+
+def normalize_in(store: ProofStore, expr_id: int) -> InternedEquation:
+    """Prove, in a ``ProofStore``, that an expression is equal to the right-nested form of its word
+
+    This works on expression ids, following the spine of the expression
+    with a loop and an explicit stack instead of recursion.
+    """
+    keys = store.table.keys
+    id_expr = store.id_expr
+
+    # Each frame is (proof that the original expression equals x y, x), where
+    # y is the subexpression currently being normalized.
+    frames: list[tuple[InternedEquation, int]] = []
+    proof = store.refl(expr_id)
+
+    while True:
+        key = keys[proof.rhs]
+        if key[0] != 'oper' or key[1] != 'Mop':
+            break
+
+        left, right = key[2]
+        left_key = keys[left]
+
+        if left_key[0] == 'oper' and left_key[1] == 'Mop':
+            # (x y) z = x (y z)
+            x, y = left_key[2]
+            step = store.assoc(store.refl(x), store.refl(y), store.refl(right))
+            proof = store.eq_trans(proof, step)
+        elif left == id_expr:
+            # e z = z
+            proof = store.eq_trans(proof, store.left_id(store.refl(right)))
+        else:
+            frames.append((proof, left))
+            proof = store.refl(right)
+
+    while frames:
+        outer_proof, left = frames.pop()
+        left_refl = store.refl(left)
+        step = store.mop_(left_refl, proof)
+        if proof.rhs == id_expr:
+            # x e = x
+            step = store.eq_trans(step, store.right_id(left_refl))
+        proof = store.eq_trans(outer_proof, step)
+
+    return proof
+
+def normalization_proof(expr: MonoidExpr) -> MonoidEquation:
+    """Prove that an expression is equal to the right-nested form of its word
+
+    The proof uses one ``assoc`` step for each rotation of a left-nested
+    ``Mop`` and one ``left_id`` or ``right_id`` step for each ``Id``, so its
+    length is linear in the size of the expression.
+    """
+    store = ProofStore()
+    return store.to_equation(normalize_in(store, store.table.intern(expr)))
+
+def prove_equal(lhs: MonoidExpr, rhs: MonoidExpr) -> MonoidEquation:
+    """Prove that two expressions are equal in the free monoid
+
+    Raise ``ValueError`` if they aren't. Both sides are interned in one
+    :class:`~mathdonewrong.monoidlike.proof_store.ProofStore`, so each
+    ``trans`` step compares expression ids rather than trees.
+    """
+    if not free_monoid_equal(lhs, rhs):
+        raise ValueError(f"{lhs} and {rhs} are not equal in the free monoid")
+
+    store = ProofStore()
+    lhs_proof = normalize_in(store, store.table.intern(lhs))
+    rhs_proof = normalize_in(store, store.table.intern(rhs))
+    return store.to_equation(store.eq_trans(lhs_proof, store.eq_symm(rhs_proof)))
@@ -44,10 +44,16 @@ List of members
 """
 
 from __future__ import annotations
+from collections import deque
+from concurrent.futures import Executor
 from dataclasses import dataclass
 from functools import reduce
 import inspect
-from typing import Any, Callable, TypeVar, Union
+from itertools import accumulate, chain, islice
+import operator as op
+import pickle
+import sys
+from typing import Any, Callable, Iterable, Iterator, TypeVar, Union
 from mathdonewrong.algebras import Algebra, operator, relation
 
 from mathdonewrong.expressions import Expression, Literal, NamedOper, Var
@@ -72,6 +78,12 @@ class Mop(MonoidExpr, NamedOper):
 class Assoc(MonoidExpr, NamedOper):
     pass
 
+class LeftId(MonoidExpr, NamedOper):
+    pass
+
+class RightId(MonoidExpr, NamedOper):
+    pass
+
 class Monoid(Algebra):
     """
     Set with associative operator with identity
@@ -97,6 +109,92 @@ class Monoid(Algebra):
     def mop(self, *args: T) -> T:
         return reduce(self.mop_, args, self.id)
 
+    def mop_all(self, elements: list[T]) -> T:
+        """Combine a list of elements, in order, using a balanced tree
+
+        Since the monoid operation is associative, the elements can be combined
+        pairwise in a balanced tree instead of from left to right. This matters
+        for monoids like :class:`StringMonoid`, where combining from left to
+        right takes quadratic time.
+
+        Subclasses which have a faster way of combining many elements at once
+        (such as ``str.join``) should override this.
+        """
+        return tree_reduce(self.mop_, elements, self.id)
+
+    def fold(self, elements: Iterable[T], executor: Executor = None, chunk_size: int = 10000) -> T:
+        """Combine a (possibly very long) sequence of elements
+
+        This computes the same result as :meth:`mop`, but uses :meth:`mop_all`
+        instead of combining the elements one at a time.
+
+        If an ``executor`` (such as a
+        :class:`~concurrent.futures.ProcessPoolExecutor`) is given, the elements
+        are split into chunks of ``chunk_size`` elements, the chunks are
+        combined in the executor, and then the results are combined.
+        """
+        if executor is None:
+            return self.mop_all(list(elements))
+
+        partial_results = list(executor.map(self.mop_all, chunked(elements, chunk_size)))
+        return self.mop_all(partial_results)
+
+    def scan_all(self, elements: list[T], initial: T) -> list[T]:
+        """Get the prefix products of a list of elements, starting from ``initial``
+
+        The result has the same length as ``elements``; its first entry is
+        ``initial`` times the first element, and so on.
+
+        Subclasses which have a faster way of computing running products (such
+        as ``itertools.accumulate`` with a built-in operator) should override
+        this.
+        """
+        return list(islice(accumulate(elements, self.mop_, initial=initial), 1, None))
+
+    def scan(self, elements: Iterable[T], executor: Executor = None, chunk_size: int = 10000) -> Iterator[T]:
+        """Generate all of the prefix products of a sequence of elements
+
+        For example, ``int_addition.scan([1, 2, 3])`` generates 1, 3, and 6.
+
+        Without an ``executor``, the products are generated lazily, so the input
+        may be an arbitrarily long iterator.
+
+        With an ``executor``, the whole input is read, split into chunks of
+        ``chunk_size`` elements, and scanned in two parallel passes: first each
+        chunk is reduced to its product, and then each chunk is scanned starting
+        from the product of all of the chunks before it.
+        """
+        if executor is None:
+            yield from accumulate(elements, self.mop_)
+            return
+
+        chunks = list(chunked(elements, chunk_size))
+        totals = list(executor.map(self.mop_all, chunks))
+        offsets = accumulate(totals[:-1], self.mop_, initial=self.id)
+
+        for chunk_scan in executor.map(self.scan_all, chunks, offsets):
+            yield from chunk_scan
+
+    def power(self, x: T, n: int) -> T:
+        r"""Combine ``x`` with itself ``n`` times
+
+        This uses repeated squaring (which is valid because the monoid operation
+        is associative), so it only performs about :math:`2 \log_2 n`
+        operations.
+        """
+        if n < 0:
+            raise ValueError(f"can't raise a monoid element to the negative power {n}")
+
+        result = self.id
+        while n > 0:
+            if n & 1:
+                result = self.mop_(result, x)
+            n >>= 1
+            if n > 0:
+                x = self.mop_(x, x)
+
+        return result
+
     @relation()
     def left_id(self, a: T):
         return self.mop_(self.id_(), a)
@@ -118,6 +216,28 @@ class Monoid(Algebra):
     def assoc_rhs(self, a: T, b: T, c: T):
         return self.mop_(a, self.mop_(b, c))
 
+def tree_reduce(f: Callable[[T, T], T], elements: list[T], initial: T) -> T:
+    """Combine a list of elements pairwise in a balanced tree
+
+    Return ``initial`` if the list is empty.
+    """
+    if not elements:
+        return initial
+
+    while len(elements) > 1:
+        paired = [f(elements[i], elements[i + 1]) for i in range(0, len(elements) - 1, 2)]
+        if len(elements) % 2 == 1:
+            paired.append(elements[-1])
+        elements = paired
+
+    return elements[0]
+
+def chunked(elements: Iterable[T], chunk_size: int) -> Iterable[list[T]]:
+    """Split an iterable into lists of at most ``chunk_size`` elements"""
+    iterator = iter(elements)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
 class CommutativeMonoid(Monoid):
     pass
 
@@ -150,13 +270,18 @@ class IntAddition(CommutativeMonoid, AdditiveMonoid):
     def id_(self) -> int:
         return 0
 
+    def mop_all(self, elements: list[int]) -> int:
+        return sum(elements)
+
+    def scan_all(self, elements: list[int], initial: int) -> list[int]:
+        return list(islice(accumulate(elements, initial=initial), 1, None))
+
 int_addition = IntAddition()
 
 class IntMultiplication(CommutativeMonoid, MultiplicativeMonoid):
     T = int
 
-    @property
-    def id(self) -> int:
+    def id_(self) -> int:
         return 1
 
 int_multiplication = IntMultiplication()
@@ -167,16 +292,21 @@ class StringMonoid(AdditiveMonoid):
     def id_(self) -> str:
         return ''
 
+    def mop_all(self, elements: list[str]) -> str:
+        return ''.join(elements)
+
 string_monoid = StringMonoid()
 
 class TupleMonoid(AdditiveMonoid):
     def __init__(self, T: type):
         self.T = tuple[T, ...]
 
-    @property
-    def id(self) -> tuple[T, ...]:
+    def id_(self) -> tuple[T, ...]:
         return ()
 
+    def mop_all(self, elements: list[tuple[T, ...]]) -> tuple[T, ...]:
+        return tuple(chain.from_iterable(elements))
+
 tuple_monoid = TupleMonoid(Any)
 
 class MonoidHomomorphism:
@@ -192,6 +322,9 @@ class MonoidHomomorphism:
 
     >>> int_addition_to_bool_disjunction.on_generators()
     [(1, True)]
+
+    Since a homomorphism respects the monoid operation, it can be applied to a
+    long sequence piece by piece; see :meth:`map_reduce`.
     """
     def __init__(self, f: Callable, domain: Monoid = None, codomain: Monoid = None):
         if domain is None:
@@ -204,12 +337,80 @@ class MonoidHomomorphism:
         self.codomain = codomain
         self.f = f
 
+        # These make it possible to pickle (by name) a homomorphism defined at
+        # the top level of a module, which is needed for sending it to worker
+        # processes.
+        self.__module__ = getattr(f, '__module__', None)
+        self.__qualname__ = getattr(f, '__qualname__', None)
+
     def __call__(self, x: domain.T) -> codomain.T:
         return self.f(x)
 
+    def __reduce__(self):
+        # A homomorphism defined at the top level of a module is pickled by
+        # name. Otherwise, it's rebuilt from its function and monoids, which
+        # only works if the function can itself be pickled by name.
+        if lookup_qualname(self.__module__, self.__qualname__) is self:
+            return self.__qualname__
+        elif lookup_qualname(getattr(self.f, '__module__', None), getattr(self.f, '__qualname__', None)) is self.f:
+            return (MonoidHomomorphism, (self.f, self.domain, self.codomain))
+        else:
+            raise pickle.PicklingError(
+                f"can't pickle the homomorphism {self.__qualname__ or self.f!r}, because neither it nor its "
+                f"function is defined at the top level of a module")
+
     def on_generators(self) -> list[tuple[domain.T, codomain.T]]:
         return [(x, self(x)) for x in self.domain.generators]
 
+    def apply_to_chunk(self, chunk: list[domain.T]) -> codomain.T:
+        """Apply this homomorphism to the product of a list of elements"""
+        return self(self.domain.mop_all(chunk))
+
+    def map_reduce(
+            self, elements: Iterable[domain.T], executor: Executor = None,
+            chunk_size: int = 10000, max_pending: int = 16) -> codomain.T:
+        """Apply this homomorphism to the product of a sequence of elements
+
+        The elements are split into chunks of ``chunk_size`` elements, this
+        homomorphism is applied to the product of each chunk (see
+        :meth:`apply_to_chunk`), and the results are combined using the
+        codomain's ``mop_``. Because this is a homomorphism, the result is the
+        same as applying it to the product of all of the elements.
+
+        If an ``executor`` is given, the chunks are processed in the executor.
+        At most ``max_pending`` chunks are in flight at once, so ``elements``
+        can be an arbitrarily long iterator. A
+        :class:`~concurrent.futures.ProcessPoolExecutor` only works if this
+        homomorphism is defined at the top level of a module.
+        """
+        result = self.codomain.id
+
+        if executor is None:
+            for chunk in chunked(elements, chunk_size):
+                result = self.codomain.mop_(result, self.apply_to_chunk(chunk))
+            return result
+
+        pending = deque()
+        for chunk in chunked(elements, chunk_size):
+            pending.append(executor.submit(self.apply_to_chunk, chunk))
+            if len(pending) >= max_pending:
+                result = self.codomain.mop_(result, pending.popleft().result())
+
+        while pending:
+            result = self.codomain.mop_(result, pending.popleft().result())
+
+        return result
+
+def lookup_qualname(module_name: str, qualname: str):
+    """Find the object with the given qualified name in a module, or None"""
+    if module_name is None or qualname is None or '<' in qualname:
+        return None
+
+    found = sys.modules.get(module_name)
+    for part in qualname.split('.'):
+        found = getattr(found, part, None)
+    return found
+
 def mk_monoid_homomorphism(domain: Monoid = None, codomain: Monoid = None):
     def decorator(f: Callable[[domain.T], codomain.T]) -> MonoidHomomorphism[domain, codomain]:
         return MonoidHomomorphism(f, domain, codomain)
@@ -250,8 +451,6 @@ class MonoidEquation:
     methods is have their ``valid`` flag set to ``True`` if and only if all of
     the input equations have their ``valid`` flags set to ``True``. (For those
     methods that take no equations as inputs, ``valid`` is always ``True``.)
-
-    TODO: Add ``left_id`` and ``right_id`` methods.
     """
     lhs: MonoidExpr
     rhs: MonoidExpr
@@ -290,6 +489,22 @@ class MonoidEquation:
             (self * (b * c)).rhs,
             valid=self.valid and b.valid and c.valid)
 
+    def left_id(self) -> MonoidEquation:
+        r"""
+        Left identity
+
+        Given the equation :math:`A = B`, create the equation :math:`e A = B`.
+        """
+        return MonoidEquation(Id() * self.lhs, self.rhs, self.valid)
+
+    def right_id(self) -> MonoidEquation:
+        r"""
+        Right identity
+
+        Given the equation :math:`A = B`, create the equation :math:`A e = B`.
+        """
+        return MonoidEquation(self.lhs * Id(), self.rhs, self.valid)
+
     @staticmethod
     def refl(a: MonoidExpr) -> MonoidEquation:
         r"""
@@ -333,9 +548,6 @@ class MonoidEqualityAlgebra(Monoid):
     multiplying by ``id`` on the left will produce the equation :math:`e A = e
     B` instead of giving back :math:`A = B`.
 
-    (actually, it doesn't implement ``left_id`` and ``right_id`` yet, but those
-    will be pretty easy to add)
-
     I think that this "monoid" is actually a monoidal category. Objects are
     monoid expressions (:class:`MonoidExpr`\s), and morphisms are assertions
     that one expression (the domain or LHS) is equivalent to another expression
@@ -355,6 +567,12 @@ class MonoidEqualityAlgebra(Monoid):
     def assoc(self, a: MonoidEquation, b: MonoidEquation, c: MonoidEquation) -> MonoidEquation:
         return a.assoc(b, c)
 
+    def left_id(self, a: MonoidEquation) -> MonoidEquation:
+        return a.left_id()
+
+    def right_id(self, a: MonoidEquation) -> MonoidEquation:
+        return a.right_id()
+
     def eq_symm(self, a: MonoidEquation) -> MonoidEquation:
         return a.symm()
 
@@ -382,6 +600,9 @@ class BoolDisjunction(CommutativeMonoid):
     def mop_(self, a: bool, b: bool):
         return a | b
 
+    def scan_all(self, elements: list[bool], initial: bool) -> list[bool]:
+        return list(islice(accumulate(elements, op.or_, initial=initial), 1, None))
+
 bool_disjunction = BoolDisjunction()
 
 class BoolXor(CommutativeMonoid):
@@ -405,6 +626,9 @@ class BoolXor(CommutativeMonoid):
     def mop_(self, a: bool, b: bool):
         return a ^ b
 
+    def scan_all(self, elements: list[bool], initial: bool) -> list[bool]:
+        return list(islice(accumulate(elements, op.xor, initial=initial), 1, None))
+
 bool_xor = BoolXor()
 
 class TrivialMonoid(Monoid):
@@ -0,0 +1,132 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+Compact storage of monoid equality proofs
+
+Every :class:`~mathdonewrong.monoidlike.monoids.MonoidEquation` stores its own
+``lhs`` and ``rhs`` trees, and checking ``trans`` compares two trees. In a
+:class:`ProofStore`, all expressions live in a shared
+:class:`~mathdonewrong.expression_table.ExpressionTable`, and an
+:class:`InternedEquation` just holds two expression ids. Every rule, including
+the side condition of ``trans``, takes constant time.
+
+.. autoclass:: InternedEquation
+
+.. autoclass:: ProofStore
+   :members:
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from mathdonewrong.expression_table import ExpressionTable
+from mathdonewrong.monoidlike.monoids import Id, MonoidEqualityAlgebra, MonoidEquation, MonoidExpr, Mop
+
+@dataclass
+class InternedEquation:
+    """An equation between the expressions with ids ``lhs`` and ``rhs`` in some :class:`ProofStore`"""
+    lhs: int
+    rhs: int
+    valid: bool
+
+MOP = Mop(Id(), Id())
+
+class ProofStore(MonoidEqualityAlgebra):
+    r"""
+    Monoid equality algebra with interned expressions
+
+    This works just like
+    :class:`~mathdonewrong.monoidlike.monoids.MonoidEqualityAlgebra`, except
+    that its elements are :class:`InternedEquation`\s whose expressions are
+    stored in ``self.table``. (So, for example, proof expressions can be
+    evaluated in a ``ProofStore``.)
+
+    For very long proofs, use :meth:`check_derivation` instead of evaluating a
+    deeply nested proof expression.
+    """
+    T = InternedEquation
+
+    def __init__(self, table: ExpressionTable = None):
+        self.table = table if table is not None else ExpressionTable()
+        self.id_expr = self.table.intern(Id())
+
+    def mop_ids(self, a: int, b: int) -> int:
+        return self.table.intern_oper(MOP, (a, b))
+
+    def refl(self, a: MonoidExpr | int) -> InternedEquation:
+        """Create the equation :math:`A = A` from an expression or an expression id"""
+        if not isinstance(a, int):
+            a = self.table.intern(a)
+        return InternedEquation(a, a, True)
+
+    def id_(self) -> InternedEquation:
+        return InternedEquation(self.id_expr, self.id_expr, True)
+
+    def mop_(self, a: InternedEquation, b: InternedEquation) -> InternedEquation:
+        return InternedEquation(self.mop_ids(a.lhs, b.lhs), self.mop_ids(a.rhs, b.rhs), a.valid and b.valid)
+
+    def assoc(self, a: InternedEquation, b: InternedEquation, c: InternedEquation) -> InternedEquation:
+        return InternedEquation(
+            self.mop_ids(self.mop_ids(a.lhs, b.lhs), c.lhs),
+            self.mop_ids(a.rhs, self.mop_ids(b.rhs, c.rhs)),
+            a.valid and b.valid and c.valid)
+
+    def left_id(self, a: InternedEquation) -> InternedEquation:
+        return InternedEquation(self.mop_ids(self.id_expr, a.lhs), a.rhs, a.valid)
+
+    def right_id(self, a: InternedEquation) -> InternedEquation:
+        return InternedEquation(self.mop_ids(a.lhs, self.id_expr), a.rhs, a.valid)
+
+    def eq_symm(self, a: InternedEquation) -> InternedEquation:
+        return InternedEquation(a.rhs, a.lhs, a.valid)
+
+    def eq_trans(self, a: InternedEquation, b: InternedEquation) -> InternedEquation:
+        return InternedEquation(a.lhs, b.rhs, a.valid and b.valid and a.rhs == b.lhs)
+
+    rules = {
+        'refl': refl,
+        'id': id_,
+        'mop': mop_,
+        'assoc': assoc,
+        'left_id': left_id,
+        'right_id': right_id,
+        'symm': eq_symm,
+        'trans': eq_trans,
+    }
+
+    def check_derivation(self, steps: Iterable[tuple]) -> list[InternedEquation]:
+        """Check a whole derivation, one step at a time
+
+        Each step is a tuple ``(rule, *args)``. For the ``'refl'`` rule, the
+        argument is an expression (or expression id); for all other rules
+        (``'id'``, ``'mop'``, ``'assoc'``, ``'left_id'``, ``'right_id'``,
+        ``'symm'``, and ``'trans'``), the arguments are the indices of earlier
+        steps. Return the list of equations produced by the steps; the
+        derivation proves its last equation if that equation is ``valid``.
+        """
+        results = []
+
+        for rule_name, *args in steps:
+            rule = self.rules.get(rule_name)
+            if rule is None:
+                raise ValueError(f"unknown proof rule {rule_name!r}")
+
+            if rule_name != 'refl':
+                args = [results[i] for i in args]
+
+            results.append(rule(self, *args))
+
+        return results
+
+    def to_equation(self, a: InternedEquation) -> MonoidEquation:
+        """Convert to an ordinary :class:`~mathdonewrong.monoidlike.monoids.MonoidEquation`"""
+        return MonoidEquation(self.table.expr(a.lhs), self.table.expr(a.rhs), a.valid)
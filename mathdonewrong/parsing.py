@@ -0,0 +1,288 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+r"""
+Parsing expressions from text
+
+A :class:`Grammar` reads the notation that ``str`` produces for expressions.
+It's driven by the same class attributes that ``str`` uses: each
+:class:`~mathdonewrong.expressions.BinaryOper` or
+:class:`~mathdonewrong.expressions.PrefixOper` subclass gives its ``name`` (the
+symbol) and its ``precedence``. Binary operators are left-associative, as in
+``BinaryOper.__str__``.
+
+Besides operators, the notation has:
+
+* variables, like ``x``;
+* constants, which are names mapped to fixed expressions (like ``True`` for the
+  Boolean constant ``T``);
+* operator applications, like ``f(x, y)`` or ``Compose(f, g)``;
+* numbers, which become ``Literal``\s, and quoted strings, which become
+  ``Literal``\s holding strings (``str`` doesn't quote them, so these have to be
+  quoted by hand). If ``-`` isn't a prefix operator, a number (or a constant
+  standing for a numeric literal) can have a ``-`` sign, so ``f(-1)`` reads
+  ``Literal(-1)``. If ``-`` is a prefix operator, ``-1`` is that operator
+  applied to ``1``, as in ``x - -1``.
+
+The default grammar, used by :func:`parse`, has the constants ``True``,
+``False``, ``None``, ``inf`` and ``nan``, standing for the literals that
+``str`` writes that way, so literals of those types read back as literals.
+Other grammars only have the constants they're given (a Boolean grammar, for
+example, reads ``True`` as the Boolean constant ``T``).
+
+So an expression reads back as itself when its literals are numbers,
+``bool``\s or ``None`` (except for ``nan``, which isn't equal to itself), and
+its variables aren't named like constants. String literals and literals of
+other types don't read back.
+
+Parsing is done with operator-precedence parsing (the iterative form of
+precedence climbing), using explicit stacks, so deeply nested input doesn't
+run into Python's recursion limit. :meth:`Grammar.parse_many` reads one
+expression per line from a file or any other iterable of lines, yielding each
+one as soon as it's parsed.
+
+.. autoclass:: Grammar
+   :members:
+"""
+
+from __future__ import annotations
+import math
+import re
+from typing import Callable, Iterable, Iterator, Mapping, Optional
+
+from mathdonewrong.expressions import BinaryOper, Expression, Literal, Oper, PrefixOper, Var
+
+NUMBER = r'\d+(?:\.\d*)?(?:[eE][+-]?\d+)?'
+STRING = r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\""
+NAME = r'[A-Za-z_][A-Za-z0-9_]*'
+
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0'}
+
+def unquote(token: str) -> str:
+    """Decode a quoted string token, allowing backslash escapes"""
+    return re.sub(r'\\(.)', lambda m: ESCAPES.get(m.group(1), m.group(1)), token[1:-1])
+
+def parse_number(token: str):
+    if any(c in token for c in '.eE'):
+        return float(token)
+    else:
+        return int(token)
+
+class Grammar:
+    r"""
+    A notation for expressions, made out of operator classes
+
+    ``binary`` and ``prefix`` are ``BinaryOper`` and ``PrefixOper`` subclasses.
+    ``named`` are classes which are written like ``Name(x, y)`` and constructed
+    by calling the class with the operands, as with ``NamedOper``\s; any other
+    name followed by parentheses becomes a plain ``Oper``. ``constants`` maps
+    names to the expressions they stand for. Variables are made with ``var``
+    and literals with ``literal``.
+    """
+
+    def __init__(self,
+                 binary: Iterable[type[BinaryOper]] = (),
+                 prefix: Iterable[type[PrefixOper]] = (),
+                 named: Iterable[type[Oper]] = (),
+                 constants: Optional[Mapping[str, Expression]] = None,
+                 var: Callable[[str], Expression] = Var,
+                 literal: Callable[[object], Expression] = Literal):
+        self.binary = {cls.name: cls for cls in binary}
+        self.prefix = {cls.name: cls for cls in prefix}
+        self.named = {cls.__name__: cls for cls in named}
+        self.constants = dict(constants or {})
+        self.var = var
+        self.literal = literal
+
+        # Longer symbols go first, so that, for example, "**" isn't read as two
+        # "*"s.
+        symbols = sorted({*self.binary, *self.prefix} - {''}, key=len, reverse=True)
+        symbol_pattern = '|'.join(re.escape(symbol) for symbol in symbols if not re.fullmatch(NAME, symbol))
+
+        # Each match is one token, along with the spaces before it.
+        self.token_re = re.compile(r'\s*(?:' + '|'.join([
+            f'(?P<number>{NUMBER})',
+            f'(?P<string>{STRING})',
+            f'(?P<name>{NAME})',
+            r'(?P<punct>[(),])',
+            f'(?P<symbol>{symbol_pattern})' if symbol_pattern else '(?P<symbol>(?!))',
+            r'(?P<sign>-)',
+        ]) + ')')
+
+    def tokenize(self, text: str) -> Iterator[tuple[str, str, int]]:
+        """Split text into ``(kind, token, column)`` triples, skipping spaces"""
+        position = 0
+        end = len(text.rstrip())
+        match = self.token_re.match
+
+        while position < end:
+            token_match = match(text, position)
+            if token_match is None:
+                position += len(text[position:]) - len(text[position:].lstrip())
+                raise ValueError(f"unexpected character {text[position]!r} at column {position}")
+
+            kind = token_match.lastgroup
+            token = token_match.group(kind)
+            if kind == 'name' and (token in self.binary or token in self.prefix):
+                kind = 'symbol'
+            yield kind, token, token_match.start(kind)
+
+            position = token_match.end()
+
+    def parse(self, text: str) -> Expression:
+        """Parse a single expression
+
+        Raise ``ValueError`` if the text isn't a well-formed expression.
+        """
+        tokens = list(self.tokenize(text))
+        output: list[Expression] = []
+
+        # Entries are ('binary', cls), ('prefix', cls), ('paren', column), or
+        # ('call', column, name, number of outputs before the call's operands).
+        operators: list[tuple] = []
+        expecting_operand = True
+
+        def reduce():
+            entry = operators.pop()
+            if entry[0] == 'binary':
+                right = output.pop()
+                left = output.pop()
+                output.append(entry[1](left, right))
+            else:
+                output.append(entry[1](output.pop()))
+
+        def reduce_to_bracket(column: int) -> tuple:
+            while operators and operators[-1][0] in ('binary', 'prefix'):
+                reduce()
+            if not operators:
+                raise ValueError(f"unmatched {text[column]!r} at column {column}")
+            return operators[-1]
+
+        i = 0
+        while i < len(tokens):
+            kind, token, column = tokens[i]
+            i += 1
+
+            if expecting_operand:
+                if kind == 'symbol' and token in self.prefix:
+                    operators.append(('prefix', self.prefix[token]))
+                elif token == '-' and (negated := self.negative_literal(tokens, i)) is not None:
+                    i += 1
+                    output.append(negated)
+                    expecting_operand = False
+                elif kind == 'name' and i < len(tokens) and tokens[i][1] == '(':
+                    i += 1
+                    if i < len(tokens) and tokens[i][1] == ')':
+                        i += 1
+                        output.append(self.make_oper(token, []))
+                        expecting_operand = False
+                    else:
+                        operators.append(('call', column, token, len(output)))
+                elif kind == 'name':
+                    output.append(self.constants[token] if token in self.constants else self.var(token))
+                    expecting_operand = False
+                elif kind == 'number':
+                    output.append(self.literal(parse_number(token)))
+                    expecting_operand = False
+                elif kind == 'string':
+                    output.append(self.literal(unquote(token)))
+                    expecting_operand = False
+                elif token == '(':
+                    operators.append(('paren', column))
+                else:
+                    raise ValueError(f"expected an operand at column {column}, but found {token!r}")
+            elif kind == 'symbol' and token in self.binary:
+                cls = self.binary[token]
+                precedence = cls.precedence
+
+                # Finish the operators on the stack that bind more tightly, and
+                # binary operators that bind equally tightly, since binary
+                # operators are left-associative. A prefix operator's operand
+                # includes any binary operators that bind at least as tightly
+                # as it does, as in PrefixOper.__str__.
+                while operators and operators[-1][0] in ('binary', 'prefix') and \
+                        (operators[-1][1].precedence > precedence or
+                         operators[-1][0] == 'binary' and operators[-1][1].precedence == precedence):
+                    reduce()
+
+                operators.append(('binary', cls))
+                expecting_operand = True
+            elif token == ',':
+                if reduce_to_bracket(column)[0] != 'call':
+                    raise ValueError(f"unexpected ',' at column {column}")
+                expecting_operand = True
+            elif token == ')':
+                entry = reduce_to_bracket(column)
+                operators.pop()
+                if entry[0] == 'call':
+                    _, _, name, start = entry
+                    operands = output[start:]
+                    del output[start:]
+                    output.append(self.make_oper(name, operands))
+            else:
+                raise ValueError(f"expected an operator at column {column}, but found {token!r}")
+
+        if expecting_operand:
+            raise ValueError("unexpected end of expression")
+
+        while operators:
+            if operators[-1][0] in ('paren', 'call'):
+                raise ValueError(f"unclosed '(' at column {operators[-1][1]}")
+            reduce()
+
+        return output[0]
+
+    def negative_literal(self, tokens: list[tuple[str, str, int]], i: int) -> Optional[Expression]:
+        """If ``tokens[i]`` is a number that a ``-`` sign applies to, make the negative literal"""
+        if i >= len(tokens):
+            return None
+
+        kind, token, _ = tokens[i]
+        if kind == 'number':
+            return self.literal(-parse_number(token))
+
+        constant = self.constants.get(token) if kind == 'name' else None
+        if constant is not None and constant.tag == 'literal' and type(constant.value) in (int, float):
+            return self.literal(-constant.value)
+
+        return None
+
+    def make_oper(self, name: str, operands: list[Expression]) -> Expression:
+        if name in self.named:
+            return self.named[name](*operands)
+        else:
+            return Oper(name, *operands)
+
+    def parse_many(self, lines: Iterable[str]) -> Iterator[Expression]:
+        """Parse one expression per line, skipping blank lines
+
+        ``lines`` can be an open text file, so large files are read as they're
+        parsed, rather than all at once.
+        """
+        for line_number, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    yield self.parse(line)
+                except ValueError as e:
+                    raise ValueError(f"line {line_number}: {e}") from None
+
+LITERAL_CONSTANTS = {
+    'True': Literal(True),
+    'False': Literal(False),
+    'None': Literal(None),
+    'inf': Literal(math.inf),
+    'nan': Literal(math.nan),
+}
+
+default_grammar = Grammar(constants=LITERAL_CONSTANTS)
+
+def parse(text: str) -> Expression:
+    """Parse an expression made of variables, literals and operator applications"""
+    return default_grammar.parse(text)
@@ -0,0 +1,292 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Finding instances of a pattern in a collection of expressions
+
+A :class:`PatternIndex` holds a collection of expressions, and answers queries
+like "which of these expressions contain a subexpression of the form
+``Mop(Id(), a)``?", where the variables in the pattern can stand for anything.
+
+Every distinct subexpression in the collection is stored once (using an
+:class:`~mathdonewrong.expression_table.ExpressionTable`), and filed under its
+*fingerprint*: what it has at a few fixed positions near its root. For example,
+the fingerprint of ``Mop(Id(), Var('x'))`` says that it has ``Mop`` with two
+operands at the root, ``Id`` with no operands at the first operand, ``x`` at
+the second operand, and nothing below that. Only subexpressions whose
+fingerprints are compatible with the pattern's are actually matched against it.
+
+Variables in the stored expressions are treated like constants: ``Var('x')`` in
+a pattern matches anything, but ``Var('x')`` in a stored expression is only
+matched by a pattern variable.
+
+.. autoclass:: PatternIndex
+   :members:
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Hashable, Iterator, Optional, Sequence
+
+from mathdonewrong.expression_table import ExpressionTable
+from mathdonewrong.expressions import Expression
+
+Position = tuple[int, ...]
+
+DEFAULT_POSITIONS: tuple[Position, ...] = ((), (0,), (1,), (2,), (0, 0), (0, 1), (1, 0), (1, 1))
+
+# Fingerprint features, besides the symbols themselves: there's nothing at this
+# position, there's a pattern variable here, or there's a pattern variable
+# above this position.
+NOTHING = 'N'
+ANYTHING = 'A'
+BELOW_VAR = 'B'
+
+# PatternIndex doesn't bother compacting tables smaller than this
+MIN_COMPACT_SIZE = 64
+
+@dataclass
+class Match:
+    """An instance of a pattern in an expression in a :class:`PatternIndex`
+
+    ``position`` is the path from the root of the expression to the instance,
+    as a tuple of operand indices, and ``bindings`` gives the subexpressions
+    that the pattern's variables stand for.
+    """
+
+    handle: int
+    position: Position
+    bindings: dict[str, Expression]
+
+def symbol_of_key(key: tuple) -> Hashable:
+    if key[0] == 'oper':
+        return ('oper', key[1], len(key[2]))
+    else:
+        return key
+
+def pattern_feature(pattern: Expression, position: Position) -> Hashable:
+    node = pattern
+    for index in position:
+        if node.tag == 'var':
+            return BELOW_VAR
+        elif node.tag != 'oper' or index >= len(node.operands):
+            return NOTHING
+        node = node.operands[index]
+
+    if node.tag == 'var':
+        return ANYTHING
+    elif node.tag == 'literal':
+        return ('literal', node.value)
+    else:
+        return ('oper', node.name, len(node.operands))
+
+class PatternIndex:
+    """
+    An index of expressions, for finding instances of patterns in them
+
+    Each inserted expression gets an integer *handle*, which is used to delete
+    it and to identify it in query results.
+
+    The table of subexpressions only ever grows, so deleting an expression
+    leaves its subexpressions in the table. Once more than half of the table
+    isn't used by any stored expression, :meth:`delete` calls :meth:`compact`
+    to build a fresh one, so the index stays in proportion to what it holds.
+    """
+
+    def __init__(self, positions: Sequence[Position] = DEFAULT_POSITIONS):
+        self.positions = tuple(positions)
+        self.table = ExpressionTable()
+        self.trie: dict = {}
+        self.roots: dict[int, int] = {}
+
+        # For each stored subexpression, the handles of the expressions it
+        # occurs in, along with its positions in each of them.
+        self.occurrences: dict[int, dict[int, list[Position]]] = {}
+        self.next_handle = 0
+
+    def __len__(self) -> int:
+        """The number of expressions in the index"""
+        return len(self.roots)
+
+    def fingerprint(self, term_id: int) -> list[Hashable]:
+        keys = self.table.keys
+        features = []
+
+        for position in self.positions:
+            key = keys[term_id]
+            for index in position:
+                if key[0] != 'oper' or index >= len(key[2]):
+                    key = None
+                    break
+                key = keys[key[2][index]]
+
+            features.append(NOTHING if key is None else symbol_of_key(key))
+
+        return features
+
+    def subterms(self, root_id: int) -> Iterator[tuple[int, Position]]:
+        keys = self.table.keys
+        stack = [(root_id, ())]
+
+        while stack:
+            term_id, position = stack.pop()
+            yield term_id, position
+
+            key = keys[term_id]
+            if key[0] == 'oper':
+                stack.extend((operand_id, position + (index,)) for index, operand_id in enumerate(key[2]))
+
+    def insert(self, expr: Expression) -> int:
+        """Add an expression to the index, returning its handle"""
+        handle = self.next_handle
+        self.next_handle += 1
+        self.insert_with_handle(handle, expr)
+        return handle
+
+    def insert_with_handle(self, handle: int, expr: Expression):
+        root_id = self.table.intern(expr)
+        self.roots[handle] = root_id
+
+        for term_id, position in self.subterms(root_id):
+            occurrences = self.occurrences.get(term_id)
+            if occurrences is None:
+                occurrences = self.occurrences[term_id] = {}
+                self.trie_insert(term_id)
+            occurrences.setdefault(handle, []).append(position)
+
+    def delete(self, handle: int):
+        """Remove an expression from the index
+
+        Raise ``ValueError`` if there's no expression with the given handle.
+        """
+        root_id = self.roots.pop(handle, None)
+        if root_id is None:
+            raise ValueError(f"there's no expression with handle {handle}")
+
+        for term_id, _ in self.subterms(root_id):
+            occurrences = self.occurrences.get(term_id)
+            if occurrences is None:
+                continue
+
+            occurrences.pop(handle, None)
+            if not occurrences:
+                del self.occurrences[term_id]
+                self.trie_delete(term_id)
+
+        if len(self.table) > 2 * len(self.occurrences) + MIN_COMPACT_SIZE:
+            self.compact()
+
+    def compact(self):
+        """Rebuild the table of subexpressions, leaving out the ones no expression uses
+
+        Handles stay the same.
+        """
+        exprs = {handle: self.expr(handle) for handle in self.roots}
+
+        self.table = ExpressionTable()
+        self.trie = {}
+        self.roots = {}
+        self.occurrences = {}
+
+        for handle, expr in exprs.items():
+            self.insert_with_handle(handle, expr)
+
+    def expr(self, handle: int) -> Expression:
+        """Get the expression with the given handle"""
+        return self.table.expr(self.roots[handle])
+
+    def trie_insert(self, term_id: int):
+        node = self.trie
+        for feature in self.fingerprint(term_id):
+            node = node.setdefault(feature, {})
+        node[term_id] = None
+
+    def trie_delete(self, term_id: int):
+        path = []
+        node = self.trie
+        for feature in self.fingerprint(term_id):
+            path.append((node, feature))
+            node = node[feature]
+        del node[term_id]
+
+        # Prune the branches that have become empty.
+        for parent, feature in reversed(path):
+            if parent[feature]:
+                break
+            del parent[feature]
+
+    def candidates(self, pattern: Expression) -> Iterator[int]:
+        """Find the stored subexpressions whose fingerprints are compatible with a pattern"""
+        features = [pattern_feature(pattern, position) for position in self.positions]
+        depth = len(features)
+        stack = [(self.trie, 0)]
+
+        while stack:
+            node, level = stack.pop()
+
+            if level == depth:
+                yield from node
+                continue
+
+            feature = features[level]
+            if feature == BELOW_VAR:
+                stack.extend((child, level + 1) for child in node.values())
+            elif feature == ANYTHING:
+                stack.extend((child, level + 1) for key, child in node.items() if key != NOTHING)
+            elif (child := node.get(feature)) is not None:
+                stack.append((child, level + 1))
+
+    def match(self, pattern: Expression, term_id: int) -> Optional[dict[str, int]]:
+        """Match a pattern against a stored subexpression, returning the ids the variables are bound to"""
+        keys = self.table.keys
+        bindings = {}
+        stack = [(pattern, term_id)]
+
+        while stack:
+            pattern, term_id = stack.pop()
+            tag = pattern.tag
+
+            if tag == 'var':
+                if bindings.setdefault(pattern.name, term_id) != term_id:
+                    return None
+            elif tag == 'literal':
+                if keys[term_id] != ('literal', pattern.value):
+                    return None
+            else:
+                key = keys[term_id]
+                if key[0] != 'oper' or key[1] != pattern.name or len(key[2]) != len(pattern.operands):
+                    return None
+                stack.extend(zip(pattern.operands, key[2]))
+
+        return bindings
+
+    def query(self, pattern: Expression) -> Iterator[Match]:
+        """Find every instance of a pattern in the stored expressions"""
+        exprs = self.table.exprs
+
+        for term_id in self.candidates(pattern):
+            bindings = self.match(pattern, term_id)
+            if bindings is None:
+                continue
+
+            bound_exprs = {name: exprs[bound_id] for name, bound_id in bindings.items()}
+            for handle, positions in self.occurrences[term_id].items():
+                for position in positions:
+                    yield Match(handle, position, bound_exprs)
+
+    def containing(self, pattern: Expression) -> set[int]:
+        """Find the handles of the expressions that contain an instance of a pattern"""
+        handles = set()
+
+        for term_id in self.candidates(pattern):
+            if self.match(pattern, term_id) is not None:
+                handles.update(self.occurrences[term_id])
+
+        return handles
@@ -0,0 +1,289 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+"""
+Rewriting expressions using the relations of a variety
+
+The relations of a variety are equations, like ``Mop(Id(), a) = a``. If each
+equation is given a direction (``Mop(Id(), a) -> a``), it becomes a *rewrite
+rule*, and a set of rewrite rules can be used to simplify expressions: keep
+replacing instances of left-hand sides with the corresponding right-hand sides
+until no rule applies. The result is called a *normal form*.
+
+A relation is oriented from its bigger side to its smaller side. If the sides
+are the same size, it's oriented the way it's written, unless the two sides are
+the same up to renaming variables (like ``a * b = b * a``), in which case it
+can't be used as a rule at all.
+
+:class:`RewriteSystem` stores its rules indexed by the operator at the head of
+their left-hand sides, so only rules which could possibly match are tried.
+Expressions are normalized innermost-first, using an
+:class:`~mathdonewrong.expression_table.ExpressionTable` so that each distinct
+subexpression is normalized only once.
+
+.. autoclass:: RewriteSystem
+   :members:
+
+.. autofunction:: orient
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from mathdonewrong.algebras import AlgebraClass
+from mathdonewrong.expression_table import ExpressionTable
+from mathdonewrong.expressions import Expression, var_names
+from mathdonewrong.varieties import Relation, Variety
+
+@dataclass
+class Rule:
+    lhs: Expression
+    rhs: Expression
+
+    def __str__(self):
+        return f'{self.lhs} -> {self.rhs}'
+
+def expr_size(expr: Expression) -> int:
+    size = 0
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+        size += 1
+        if node.tag == 'oper':
+            stack.extend(node.operands)
+
+    return size
+
+def is_variant(lhs: Expression, rhs: Expression) -> bool:
+    """Tell whether two expressions are the same up to renaming variables"""
+    renaming = {}
+    stack = [(lhs, rhs)]
+
+    while stack:
+        left, right = stack.pop()
+
+        if left.tag != right.tag:
+            return False
+        elif left.tag == 'var':
+            if renaming.setdefault(left.name, right.name) != right.name:
+                return False
+        elif left.tag == 'literal':
+            if left.value != right.value:
+                return False
+        elif left.name != right.name or len(left.operands) != len(right.operands):
+            return False
+        else:
+            stack.extend(zip(left.operands, right.operands))
+
+    return len(set(renaming.values())) == len(renaming)
+
+def is_rule(lhs: Expression, rhs: Expression) -> bool:
+    return lhs.tag != 'var' and set(var_names(rhs)) <= set(var_names(lhs))
+
+def orient(relation: Relation) -> Optional[Rule]:
+    """Turn a relation into a rewrite rule, or return ``None`` if it can't be oriented"""
+    lhs, rhs = relation.lhs, relation.rhs
+    lhs_size, rhs_size = expr_size(lhs), expr_size(rhs)
+
+    if is_variant(lhs, rhs):
+        return None
+    elif lhs_size >= rhs_size and is_rule(lhs, rhs):
+        return Rule(lhs, rhs)
+    elif rhs_size >= lhs_size and is_rule(rhs, lhs):
+        return Rule(rhs, lhs)
+    else:
+        return None
+
+def head(expr: Expression) -> tuple:
+    if expr.tag == 'oper':
+        return (expr.name, len(expr.operands))
+    else:
+        return (expr.tag,)
+
+class RewriteSystem:
+    """A set of rewrite rules, indexed by the heads of their left-hand sides"""
+
+    def __init__(self, rules: Iterable[Rule] = ()):
+        self.rules: list[Rule] = []
+        self.index: dict[tuple, list[Rule]] = {}
+        self.table = ExpressionTable()
+        self.normal_forms: dict[int, int] = {}
+
+        for rule in rules:
+            self.add_rule(rule)
+
+    @staticmethod
+    def from_variety(variety: Variety) -> RewriteSystem:
+        """Make a rewrite system out of whichever relations of a variety can be oriented"""
+        rules = (orient(relation) for relation in variety.relations)
+        return RewriteSystem(rule for rule in rules if rule is not None)
+
+    @staticmethod
+    def from_algebra_class(cls: AlgebraClass) -> RewriteSystem:
+        return RewriteSystem.from_variety(cls.variety)
+
+    def add_rule(self, rule: Rule):
+        if not is_rule(rule.lhs, rule.rhs):
+            raise ValueError(f"{rule} can't be used as a rewrite rule")
+
+        self.rules.append(rule)
+        self.index.setdefault(head(rule.lhs), []).append(rule)
+
+        # Results computed with the old rules might not be normal anymore.
+        self.normal_forms.clear()
+
+    def match(self, pattern: Expression, term_id: int,
+              matched: Optional[dict[tuple[type, str], int]] = None) -> Optional[dict[str, int]]:
+        """Match a pattern against an interned term, returning the ids the variables are bound to
+
+        If ``matched`` is given, the id of the term matched by each operator in
+        the pattern is stored in it, keyed on the class and name of the
+        operator (keeping the first one if there are several).
+        """
+        table = self.table
+        bindings = {}
+        stack = [(pattern, term_id)]
+
+        while stack:
+            pattern, term_id = stack.pop()
+            tag = pattern.tag
+
+            if tag == 'var':
+                if bindings.setdefault(pattern.name, term_id) != term_id:
+                    return None
+            elif tag == 'literal':
+                if table.key(term_id) != ('literal', pattern.value):
+                    return None
+            else:
+                key = table.key(term_id)
+                if key[0] != 'oper' or key[1] != pattern.name or len(key[2]) != len(pattern.operands):
+                    return None
+                if matched is not None:
+                    matched.setdefault((type(pattern), pattern.name), term_id)
+                stack.extend(zip(pattern.operands, key[2]))
+
+        return bindings
+
+    def instantiate(self, pattern: Expression, bindings: dict[str, int],
+                    matched: Optional[dict[tuple[type, str], int]] = None) -> int:
+        """Substitute interned terms for the variables in a pattern, giving an interned term
+
+        ``matched`` is as in :meth:`match`. An operator of the same class and
+        name as one that matched is built with the class of the term it
+        matched; any other operator is built with its own class.
+        """
+        matched = matched or {}
+        results = {}
+        stack = [(pattern, False)]
+
+        while stack:
+            node, operands_done = stack.pop()
+
+            if node.tag == 'var':
+                results[id(node)] = bindings[node.name]
+            elif node.tag == 'literal':
+                results[id(node)] = self.table.intern(node)
+            elif not operands_done:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in node.operands)
+            else:
+                # Build the new node with the same class as the expression being
+                # rewritten, if it has a matching operator.
+                matched_id = matched.get((type(node), node.name))
+                template = node if matched_id is None else self.table.expr(matched_id)
+                operand_ids = [results[id(operand)] for operand in node.operands]
+                results[id(node)] = self.table.intern_oper(template, operand_ids)
+
+        return results[id(pattern)]
+
+    def rewrite_at_root(self, term_id: int) -> Optional[int]:
+        """Apply the first rule that matches at the root of a term, if any"""
+        key = self.table.key(term_id)
+        rule_head = (key[1], len(key[2])) if key[0] == 'oper' else (key[0],)
+
+        for rule in self.index.get(rule_head, ()):
+            matched = {}
+            bindings = self.match(rule.lhs, term_id, matched)
+            if bindings is not None:
+                return self.instantiate(rule.rhs, bindings, matched)
+
+        return None
+
+    def normalize_id(self, term_id: int, max_steps: Optional[int] = None) -> int:
+        """Find the normal form of an interned term
+
+        Raise ``ValueError`` if more than ``max_steps`` rewrites are needed.
+        """
+        table, normal_forms = self.table, self.normal_forms
+        root = term_id
+        steps = 0
+
+        # Each task is (term, stage, rewritten term). In stage 0, a rule is
+        # tried at the root of the term before its operands are normalized;
+        # this keeps things like reassociating a long chain from taking
+        # quadratic time. In stage 1, the operands have been normalized, and
+        # rules are tried at the root again. In stage 2, the term has been
+        # rewritten, and the result has been normalized.
+        stack = [(term_id, 0, None)]
+
+        def rewrite(term_id: int, current: int) -> bool:
+            nonlocal steps
+
+            rewritten = self.rewrite_at_root(current)
+            if rewritten is None:
+                return False
+
+            steps += 1
+            if max_steps is not None and steps > max_steps:
+                raise ValueError(f"normalization took more than {max_steps} steps")
+
+            stack.append((term_id, 2, rewritten))
+            stack.append((rewritten, 0, None))
+            return True
+
+        while stack:
+            term_id, stage, rewritten = stack.pop()
+
+            if stage == 2:
+                normal_forms[term_id] = normal_forms[rewritten]
+                continue
+            elif term_id in normal_forms:
+                continue
+
+            key = table.key(term_id)
+
+            if key[0] != 'oper':
+                if not rewrite(term_id, term_id):
+                    normal_forms[term_id] = term_id
+            elif stage == 0:
+                if not rewrite(term_id, term_id):
+                    stack.append((term_id, 1, None))
+                    stack.extend((operand_id, 0, None) for operand_id in key[2])
+            else:
+                operand_ids = [normal_forms[operand_id] for operand_id in key[2]]
+                current = table.intern_oper(table.expr(term_id), operand_ids)
+
+                if current != term_id and current in normal_forms:
+                    normal_forms[term_id] = normal_forms[current]
+                elif not rewrite(term_id, current):
+                    normal_forms[term_id] = normal_forms[current] = current
+
+        return normal_forms[root]
+
+    def normalize(self, expr: Expression, max_steps: Optional[int] = None) -> Expression:
+        """Rewrite an expression until no rule applies
+
+        Results for subexpressions are remembered, so normalizing many
+        expressions with a lot in common is cheap.
+        """
+        normal_id = self.normalize_id(self.table.intern(expr), max_steps)
+        return self.table.expr(normal_id)
@@ -8,7 +8,7 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
-from mathdonewrong.categories.examples import DictCategory, MonoidToCategory
+from mathdonewrong.categories.examples import DictCategory, EndomorphismMonoid, MonoidToCategory
 from mathdonewrong.monoidlike.monoids import int_addition, int_multiplication, string_monoid
 
 def test_MonoidToCategory():
@@ -36,3 +36,15 @@ def test_DictCategory():
 
     assert cat.compose(d1, d2) == {'a': 'one', 'b': 'two', 'c': 'three'}
     assert list(cat.compose(d1, d2)) == ['a', 'b', 'c']
+
+def test_EndomorphismMonoid_power():
+    rotations = EndomorphismMonoid(DictCategory(), [0, 1, 2, 3, 4])
+    rotate = {x: (x + 1) % 5 for x in range(5)}
+
+    assert rotations.power(rotate, 0) == {0: 0, 1: 1, 2: 2, 3: 3, 4: 4}
+    assert rotations.power(rotate, 3) == {x: (x + 3) % 5 for x in range(5)}
+    assert rotations.power(rotate, 10**18 + 2) == {x: (x + 2) % 5 for x in range(5)}
+
+def test_power_via_MonoidToCategory():
+    cat = MonoidToCategory(string_monoid)
+    assert cat.monoid.power('ab', 3) == cat.compose('ab', cat.compose('ab', 'ab'))
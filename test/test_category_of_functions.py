@@ -8,8 +8,8 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
-from mathdonewrong.monoidal_categories import AssocLeft, AssocRight, Braid, BraidInv, Compose, Curry, CurryInv, Diagonal, Drop, Id, Into, Stack, Unit, UnitRight, UnitRightInv, UnitLeft, UnitLeftInv, Var
-from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions
+from mathdonewrong.monoidal_categories import AssocLeft, AssocRight, Braid, BraidInv, Compose, Const, Curry, CurryInv, Diagonal, Drop, Id, Into, Literal, Stack, Unit, UnitRight, UnitRightInv, UnitLeft, UnitLeftInv, Var
+from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions, Curried, PartialApplication, Pipeline, PipelineCategory, StackedPipeline
 
 cat = CategoryOfUnaryFunctions()
 
@@ -115,11 +115,84 @@ def test_into():
 def test_curry():
     expr = Curry(Var('f'))
 
-    func = expr.evaluate_in(cat, {'f': lambda x, y: x * 100 + y})
+    func = expr.evaluate_in(cat, {'f': lambda t: t[0] * 100 + t[1]})
     assert func(2)(3) == 203
 
+def test_const():
+    expr = Const(Literal(str), Literal('hello'))
+
+    func = expr.evaluate_in(cat, {})
+    assert func(None) == 'hello'
+
 def test_curry_inv():
     expr = CurryInv(Var('f'))
 
     func = expr.evaluate_in(cat, {'f': lambda x: lambda y: x * 100 + y})
     assert func((2, 3)) == 203
+
+def test_curry_makes_slotted_partial_applications():
+    func = Curry(Var('f')).evaluate_in(cat, {'f': lambda t: t[0] * 100 + t[1]})
+
+    partial = func(2)
+    assert isinstance(partial, PartialApplication)
+    assert not hasattr(partial, '__dict__')
+    assert partial(3) == 203
+
+def test_curry_round_trips_fuse():
+    f = lambda t: t[0] * 100 + t[1]
+    g = lambda x: lambda y: x - y
+
+    assert CurryInv(Curry(Var('f'))).evaluate_in(cat, {'f': f}) is f
+    assert Curry(CurryInv(Var('g'))).evaluate_in(cat, {'g': g}) is g
+
+    curried = Curry(Var('f')).evaluate_in(cat, {'f': f})
+    assert isinstance(curried, Curried)
+    assert curried(4)(5) == 405
+
+def test_into_chains_are_flat():
+    expr = Compose(Into(Var('A'), Var('f')), Into(Var('A'), Var('g')))
+
+    func = expr.evaluate_in(cat, {'A': int, 'f': lambda x: x * 2, 'g': lambda x: x + 100})
+    composed = func(lambda x: x - 1)
+    assert isinstance(composed, Pipeline)
+    assert len(composed.funcs) == 3
+    assert composed(5) == 108
+
+# Flattened pipelines
+
+pipeline_cat = PipelineCategory()
+
+def test_pipeline_compose_is_flat():
+    expr = Compose(Compose(Var('f'), Id(Var('A'))), Compose(Var('g'), Var('f')))
+
+    func = expr.evaluate_in(pipeline_cat, {'A': int, 'f': lambda x: x * 2, 'g': lambda x: x + 100})
+    assert isinstance(func, Pipeline)
+    assert len(func.funcs) == 3
+    assert func(1) == 204
+
+def test_pipeline_identity_disappears():
+    expr = Compose(Id(Var('A')), Compose(Var('f'), Id(Var('A'))))
+
+    func = expr.evaluate_in(pipeline_cat, {'A': int, 'f': abs})
+    assert func is abs
+
+def test_pipeline_stacks_are_fused():
+    expr = Compose(Stack(Var('f'), Var('g')), Stack(Var('g'), Var('f')))
+
+    func = expr.evaluate_in(pipeline_cat, {'f': lambda x: x * 2, 'g': lambda x: x + 100})
+    assert isinstance(func, StackedPipeline)
+    assert func((1, 2)) == (102, 204)
+
+def test_pipeline_long_chain():
+    expr = Var('f')
+    for _ in range(20000):
+        expr = Compose(expr, Var('f'))
+
+    func = pipeline_cat.evaluate(expr, {'f': lambda x: x + 1})
+    assert func(0) == 20001
+
+def test_pipeline_structural_operations():
+    expr = Compose(Compose(Diagonal(Var('A')), Stack(Var('f'), Id(Var('A')))), Braid(Var('A'), Var('A')))
+
+    func = pipeline_cat.evaluate(expr, {'A': int, 'f': lambda x: x * 3})
+    assert func(5) == (5, 15)
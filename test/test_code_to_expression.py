@@ -10,16 +10,14 @@
 
 import pytest
 from mathdonewrong.code_to_expression import expressionize
-#from mathdonewrong.lambda_calc.lambda_exprs import Apply, Lambda, LamConst, LamVar
-
-pytest.skip(allow_module_level=True)
+from mathdonewrong.lambda_calc.lambda_exprs import Apply, Lambda, LConst, LVar
 
 @expressionize
 def t_var(x):
     return x
 
 def test_expressionize_var():
-    assert t_var.expression == LamVar('x')
+    assert t_var.expression == LVar('x')
 
 @expressionize
 def t_const_5():
@@ -30,8 +28,8 @@ def t_const_hello():
     return 'hello'
 
 def test_expressionize_const():
-    assert t_const_5.expression == LamConst('5')
-    assert t_const_hello.expression == LamConst(repr('hello'))
+    assert t_const_5.expression == LConst('5')
+    assert t_const_hello.expression == LConst(repr('hello'))
 
 @expressionize
 def t_var_with_decoy(x):
@@ -39,7 +37,7 @@ def t_var_with_decoy(x):
     return x
 
 def test_expressionize_var_with_decoy():
-    assert t_var_with_decoy.expression == LamVar('x')
+    assert t_var_with_decoy.expression == LVar('x')
 
 @expressionize
 def t_var_with_temp(x):
@@ -47,14 +45,14 @@ def t_var_with_temp(x):
     return y
 
 def test_expressionize_var_with_temp():
-    assert t_var_with_temp.expression == LamVar('x')
+    assert t_var_with_temp.expression == LVar('x')
 
 @expressionize
 def t_apply(f, x):
     return f(x)
 
 def test_expressionize_apply():
-    assert t_apply.expression == Apply(LamVar('f'), LamVar('x'))
+    assert t_apply.expression == Apply(LVar('f'), LVar('x'))
 
 @expressionize
 def t_lambda_x_x():
@@ -65,15 +63,15 @@ def t_lambda_x_y_x():
     return lambda x: lambda y: x
 
 def test_expressionize_lambda():
-    assert t_lambda_x_x.expression == Lambda('x', LamVar('x'))
-    assert t_lambda_x_y_x.expression == Lambda('x', Lambda('y', LamVar('x')))
+    assert t_lambda_x_x.expression == Lambda('x', LVar('x'))
+    assert t_lambda_x_y_x.expression == Lambda('x', Lambda('y', LVar('x')))
 
 @expressionize
 def t_apply_lambda_to_lambda():
     return (lambda x: x)(lambda y: y)
 
 def test_expressionize_apply_lambda_to_lambda():
-    assert t_apply_lambda_to_lambda.expression == Apply(Lambda('x', LamVar('x')), Lambda('y', LamVar('y')))
+    assert t_apply_lambda_to_lambda.expression == Apply(Lambda('x', LVar('x')), Lambda('y', LVar('y')))
 
 
 
@@ -8,11 +8,13 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
+import gc
+
 import pytest
-from mathdonewrong.code_to_monoidal import MonoidalExprWithContext, expressionize_m
+from mathdonewrong.code_to_monoidal import MonoidalExprWithContext, expressionize_m, function_to_monoidal, translation_cache
 from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions
-
-pytest.skip(allow_module_level=True)
+from mathdonewrong.monoidal_categories.monoidalexpr import Exp, Unit
+from mathdonewrong.monoidal_categories.typechecker import typecheck
 
 cat = CategoryOfUnaryFunctions()
 
@@ -46,7 +48,7 @@ def test_make_adjustment_from_x_to_x_y():
     func = adjustment.evaluate_in(cat, {'x': None})
     assert func(('orange', 'purple')) == 'orange'
 
-def text_make_adjustment_from_x_to_x_x_error():
+def test_make_adjustment_from_x_to_x_x_error():
     with pytest.raises(ValueError):
         MonoidalExprWithContext.make_adjustment(('x',), ('x', 'x'))
 
@@ -88,5 +90,140 @@ def test_expressionize_m_take():
         func = input_func.expression.evaluate_in(cat, {})
         assert func(('red', 'yellow')) == input_func('red', 'yellow')
 
+@expressionize_m
+def t_const():
+    return 'hello'
+
+@expressionize_m
+def t_apply(f, x):
+    return f(x)
+
+@expressionize_m
+def t_apply_twice(f, x):
+    return f(f(x))
+
+@expressionize_m
+def t_apply_global(x):
+    return abs(x)
+
+@expressionize_m
+def t_apply_lambda(x):
+    return (lambda y: y)(x)
+
+@expressionize_m
+def t_make_const_func(x):
+    return lambda y: x
+
+@expressionize_m
+def t_with_temp(x, y):
+    z = y
+    return z
+
+def test_expressionize_m_const():
+    func = t_const.expression.evaluate_in(cat, {})
+    assert func(None) == 'hello'
+
+def test_expressionize_m_apply():
+    for input_func in [t_apply, t_apply_twice]:
+        func = input_func.expression.evaluate_in(cat, {})
+        assert func((lambda n: n * 3, 5)) == input_func(lambda n: n * 3, 5)
+
+def test_expressionize_m_global():
+    func = t_apply_global.expression.evaluate_in(cat, {})
+    assert func(-7) == 7
+
+def test_expressionize_m_lambda():
+    func = t_apply_lambda.expression.evaluate_in(cat, {})
+    assert func('green') == 'green'
+
+    func = t_make_const_func.expression.evaluate_in(cat, {})
+    assert func('orange')('purple') == 'orange'
+
+def test_expressionize_m_temp():
+    func = t_with_temp.expression.evaluate_in(cat, {})
+    assert func(('red', 'blue')) == 'blue'
+
+def make_adder(n):
+    def add(x):
+        return plus(x, n)
+
+    return add
+
+def plus(t):
+    x, y = t
+    return x + y
+
+def test_closure_variables():
+    assert function_to_monoidal(make_adder(10)).evaluate_in(cat, {})(5) == 15
+    assert function_to_monoidal(make_adder(20)).evaluate_in(cat, {})(5) == 25
+
+def test_translation_is_cached():
+    add_10, add_20 = make_adder(10), make_adder(20)
+    function_to_monoidal(add_10)
+
+    cached = translation_cache[add_10.__code__]
+    function_to_monoidal(add_20)
+    assert translation_cache[add_20.__code__] is cached
+
+def test_translations_typecheck():
+    functions = [
+        t_id, t_x_y_take_x, t_x_y_take_y, t_y_x_take_x, t_y_x_take_y, t_const, t_apply, t_apply_twice,
+        t_apply_global, t_apply_lambda, t_make_const_func, t_with_temp,
+    ]
+
+    for f in functions:
+        typecheck(f.expression)
+    typecheck(function_to_monoidal(make_adder(10)))
+
+    arrow_type = typecheck(t_apply_twice.expression)
+    (func_type, arg_type), result_type = arrow_type.domain.operands, arrow_type.codomain
+    assert func_type == Exp(arg_type, arg_type)
+    assert result_type == arg_type
+
+    assert typecheck(t_const.expression).domain == Unit()
+
+def t_self_apply(f):
+    return f(f)
+
+def test_untypeable_function():
+    with pytest.raises(TypeError):
+        function_to_monoidal(t_self_apply)
+
+@expressionize_m
+def t_call_later(x):
+    return later(x)
+
+def later(x):
+    return x + 1
+
+def test_globals_are_looked_up_when_used():
+    global later
+    assert t_call_later.expression.evaluate_in(cat, {})(1) == 2
+
+    original = later
+    later = lambda x: x * 10
+    try:
+        assert t_call_later.expression.evaluate_in(cat, {})(1) == 10
+        assert t_call_later(1) == 10
+    finally:
+        later = original
+
+def test_translation_cache_is_weak():
+    namespace = {}
+    exec('def f(x):\n    return x', namespace)
+    code = namespace['f'].__code__
+    translation_cache[code] = MonoidalExprWithContext((), None, {}, None)
+
+    del namespace, code
+    gc.collect()
+    assert not any(key.co_filename == '<string>' and key.co_name == 'f' for key in translation_cache)
+
+def test_undefined_free_variable():
+    def f(x):
+        return undefined_function(x)
+
+    with pytest.raises(ValueError):
+        function_to_monoidal(f)
+
 if __name__ == '__main__':
     pytest.main([__file__])
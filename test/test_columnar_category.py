@@ -0,0 +1,73 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+from array import array
+
+from mathdonewrong.monoidal_categories import Braid, Compose, Diagonal, Drop, Id, Stack, UnitLeftInv, Var
+from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions
+from mathdonewrong.monoidal_categories.columnar_category import Column, ColumnarCategory, lift, lift2, to_columns, to_rows
+from mathdonewrong.monoidal_categories.make_braid import make_braid
+
+cat = ColumnarCategory()
+
+x_col = Column('x', 'q')
+y_col = Column('y', 'd')
+
+def test_to_columns_and_back():
+    schema = (x_col, (None, y_col))
+    rows = [(1, (None, 1.5)), (2, (None, 2.5))]
+
+    batch = to_columns(schema, rows)
+    assert batch == (array('q', [1, 2]), (None, array('d', [1.5, 2.5])))
+    assert to_rows(schema, batch, 2) == rows
+
+def test_diagonal_shares_columns():
+    xs = array('q', [1, 2, 3])
+
+    left, right = Diagonal(Var('X')).evaluate_in(cat, {'X': x_col})(xs)
+    assert left is xs and right is xs
+
+def test_drop_releases_columns():
+    func = Compose(Stack(Drop(Var('X')), Id(Var('Y'))), UnitLeftInv(Var('Y'))).evaluate_in(cat, {'X': x_col, 'Y': y_col})
+
+    ys = array('d', [0.5])
+    assert func((array('q', [1]), ys)) is ys
+
+def test_lifted_arrows_match_row_by_row_evaluation():
+    expr = Compose(
+        Compose(Diagonal(Stack(Var('X'), Var('Y'))), Stack(Var('add'), Braid(Var('X'), Var('Y')))),
+        Stack(Var('double'), Stack(Id(Var('Y')), Var('double'))))
+
+    columnar_func = expr.evaluate_in(cat, {
+        'X': x_col, 'Y': x_col,
+        'add': lift2(lambda a, b: a + b, 'q'),
+        'double': lift(lambda a: a * 2, 'q'),
+    })
+    row_func = expr.evaluate_in(CategoryOfUnaryFunctions(), {
+        'X': int, 'Y': int,
+        'add': lambda t: t[0] + t[1],
+        'double': lambda a: a * 2,
+    })
+
+    schema = (x_col, x_col)
+    rows = [(i, 10 * i) for i in range(100)]
+    out_schema = (x_col, (x_col, x_col))
+
+    result = columnar_func(to_columns(schema, rows))
+    assert to_rows(out_schema, result, len(rows)) == [row_func(row) for row in rows]
+
+def test_make_braid_on_columns():
+    expr = make_braid((('a', 'b'), 'c'), ('c', ('a', 'a')))
+
+    func = expr.evaluate_in(cat, {name: Column(name) for name in 'abc'})
+    a, b, c = ['a'], ['b'], ['c']
+    result = func(((a, b), c))
+    assert result == (c, (a, a))
+    assert result[1][0] is a and result[1][1] is a
@@ -0,0 +1,149 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+from mathdonewrong.boolean_algebra.boolexpr import And, Not, Or, Var as BVar
+from mathdonewrong import egraph as egraph_module
+from mathdonewrong.egraph import EGraph, rules_from_relations, rules_from_variety, saturate
+from mathdonewrong.expressions import Oper, Var
+from mathdonewrong.monoidal_categories.monoidalexpr import Braid, Compose, Id, Stack, Var as MVar
+from mathdonewrong.monoidlike.monoids import Id as MonId, Monoid, MonVar, Mop
+
+x, y, z = BVar('x'), BVar('y'), BVar('z')
+a, b = BVar('a'), BVar('b')
+
+bool_rules = rules_from_relations([
+    (Not(And(x, y)), Or(Not(x), Not(y))),
+    (Not(Or(x, y)), And(Not(x), Not(y))),
+    (Not(Not(x)), x),
+    (And(x, y), And(y, x)),
+    (Or(x, y), Or(y, x)),
+])
+
+def test_rules_from_relations():
+    assert len(rules_from_relations([(Not(Not(x)), x)])) == 1
+    assert len(rules_from_relations([(And(x, y), And(y, x))])) == 2
+    assert len(rules_from_variety(Monoid.variety)) == 4
+
+def test_union_and_rebuild():
+    egraph = EGraph()
+    f_a = egraph.add(Oper('f', Var('a')))
+    f_b = egraph.add(Oper('f', Var('b')))
+    assert egraph.find(f_a) != egraph.find(f_b)
+
+    egraph.union(egraph.add(Var('a')), egraph.add(Var('b')))
+    egraph.rebuild()
+
+    assert egraph.find(f_a) == egraph.find(f_b)
+    assert egraph.equivalent(Oper('g', Oper('f', Var('a'))), Oper('g', Oper('f', Var('b'))))
+
+def test_search():
+    egraph = EGraph()
+    egraph.add(And(Not(a), Not(Not(b))))
+
+    matches = egraph.search(Not(x))
+    assert len(matches) == 3
+    assert len(egraph.search(And(Not(x), Not(y)))) == 1
+
+def test_saturate_de_morgan():
+    egraph = EGraph()
+    root = egraph.add(Not(And(Not(a), Not(b))))
+
+    report = egraph.run(bool_rules)
+    assert report.stop_reason == 'saturated'
+
+    cost, result = egraph.extract(root)
+    assert cost == 3
+    assert result in (Or(a, b), Or(b, a))
+    assert isinstance(result, Or)
+
+def test_extract_keeps_classes_with_the_same_name():
+    rules = rules_from_variety(Monoid.variety)
+    p, q, r = MonVar('p'), MonVar('q'), MonVar('r')
+
+    egraph = EGraph()
+    egraph.add(Mop(Mop(p, q), r))
+    plain = egraph.add(Oper('Mop', Oper('Mop', Oper('Id'), Var('s')), Var('t')))
+    egraph.run(rules)
+
+    cost, result = egraph.extract(plain)
+    assert result == Oper('Mop', Var('s'), Var('t'))
+    assert type(result) is Oper
+    assert type(result.operands[0]) is Var
+
+def test_cost_model():
+    def expensive_and(key, operand_costs):
+        return (10 if key[:2] == ('oper', '&') else 1) + sum(operand_costs)
+
+    assert saturate(Not(And(a, b)), bool_rules) == Not(And(a, b))
+
+    result = saturate(Not(And(a, b)), bool_rules, expensive_and)
+    assert result in (Or(Not(a), Not(b)), Or(Not(b), Not(a)))
+
+def test_monoid_variety():
+    rules = rules_from_variety(Monoid.variety)
+    expr = Mop(Mop(MonId(), MonVar('p')), Mop(MonVar('q'), MonId()))
+
+    assert saturate(expr, rules) == Mop(MonVar('p'), MonVar('q'))
+
+def test_monoidal_expr():
+    P, Q = MVar('P'), MVar('Q')
+    g, h, k = MVar('g'), MVar('h'), MVar('k')
+    rules = rules_from_relations([
+        (Compose(Braid(P, Q), Braid(Q, P)), Id(Stack(P, Q))),
+        (Compose(Id(P), g), g),
+        (Compose(Compose(g, h), k), Compose(g, Compose(h, k))),
+    ])
+
+    A, B, f = MVar('A'), MVar('B'), MVar('f')
+    expr = Compose(Braid(A, B), Compose(Braid(B, A), f))
+
+    assert saturate(expr, rules) == f
+
+def test_limits():
+    rules = rules_from_relations([
+        (Oper('Mul', Oper('Mul', Var('p'), Var('q')), Var('r')), Oper('Mul', Var('p'), Oper('Mul', Var('q'), Var('r')))),
+        (Oper('Mul', Var('p'), Var('q')), Oper('Mul', Var('q'), Var('p'))),
+    ])
+
+    expr = Var('v0')
+    for i in range(1, 10):
+        expr = Oper('Mul', expr, Var(f'v{i}'))
+
+    egraph = EGraph()
+    egraph.add(expr)
+    assert egraph.run(rules, iter_limit=2).stop_reason == 'iteration limit'
+
+    egraph = EGraph()
+    egraph.add(expr)
+    report = egraph.run(rules, node_limit=500)
+    assert report.stop_reason == 'node limit'
+
+    egraph = EGraph()
+    egraph.add(expr)
+    assert egraph.run(rules, time_limit=0).stop_reason == 'time limit'
+
+def test_time_limit_within_an_iteration(monkeypatch):
+    rules = rules_from_relations([(Oper('Mul', Var('p'), Var('q')), Oper('Mul', Var('q'), Var('p')))])
+
+    expr = Var('v0')
+    for i in range(1, 10):
+        expr = Oper('Mul', expr, Var(f'v{i}'))
+
+    # A clock which goes forward one second every time it's read
+    ticks = iter(range(1_000_000))
+    monkeypatch.setattr(egraph_module.time, 'monotonic', lambda: next(ticks))
+
+    egraph = EGraph()
+    egraph.add(expr)
+    nodes = len(egraph)
+
+    report = egraph.run(rules, time_limit=3.5)
+    assert (report.iterations, report.stop_reason) == (1, 'time limit')
+    assert nodes < report.nodes < nodes + 9
@@ -0,0 +1,117 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import pytest
+
+from mathdonewrong.boolean_algebra.boolexpr import And, Not, Or, StandardBooleanAlgebra, T, Var as BoolVar
+from mathdonewrong.expression_arena import ExpressionArena
+from mathdonewrong.expressions import Literal, Oper, Var
+from mathdonewrong.monoidlike.monoids import Id, MonVar, Mop
+
+def test_round_trip():
+    arena = ExpressionArena()
+    expr = Oper('f', Var('x'), Literal(3), Oper('g'))
+    root = arena.add(expr)
+
+    assert arena.to_expr(root) == expr
+    assert arena.tag(root) == 'oper'
+    assert arena.name(root) == 'f'
+    assert [arena.tag(i) for i in arena.operand_ids(root)] == ['var', 'literal', 'oper']
+
+def test_round_trip_keeps_classes():
+    arena = ExpressionArena()
+    expr = (BoolVar('a') & ~BoolVar('b')) | T
+    result = arena.to_expr(arena.add(expr))
+
+    assert result == expr
+    assert isinstance(result, Or)
+    assert isinstance(result.operands[0], And)
+    assert isinstance(result.operands[0].operands[1], Not)
+    assert str(result) == str(expr)
+
+def test_same_names_in_different_classes():
+    arena = ExpressionArena()
+    monoid_root = arena.add(Mop(MonVar('a'), MonVar('a')))
+    bool_root = arena.add(And(BoolVar('a'), BoolVar('a')))
+
+    monoid_expr = arena.to_expr(monoid_root)
+    bool_expr = arena.to_expr(bool_root)
+    assert isinstance(monoid_expr, Mop) and isinstance(monoid_expr.operands[0], MonVar)
+    assert isinstance(bool_expr, And) and isinstance(bool_expr.operands[0], BoolVar)
+
+    shared = ExpressionArena(share_equal=True)
+    assert shared.add(MonVar('a')) != shared.add(BoolVar('a'))
+
+def test_templates_dont_keep_expressions():
+    leaf = MonVar('x')
+    arena = ExpressionArena()
+    arena.add(Mop(leaf, Mop(leaf, Id())))
+
+    assert all(template.operands == () for template in arena.templates.values())
+    assert arena.to_expr(arena.add(leaf)) is not leaf
+
+def test_literals():
+    arena = ExpressionArena()
+    roots = arena.add_all([Literal(1), Literal(True), Literal(1), Literal([1, 2])])
+
+    assert [arena.value(root) for root in roots] == [1, True, 1, [1, 2]]
+    assert type(arena.value(roots[1])) is bool
+    assert len(arena.literals) == 3
+
+    with pytest.raises(ValueError):
+        arena.name(roots[0])
+
+def test_sharing():
+    shared = Mop(MonVar('x'), Id())
+    expr = Mop(shared, shared)
+
+    arena = ExpressionArena()
+    arena.add(expr)
+    arena.add(Mop(MonVar('x'), Id()))
+    assert len(arena) == 7
+
+    arena = ExpressionArena(share_equal=True)
+    arena.add(expr)
+    assert arena.add(Mop(MonVar('x'), Id())) == arena.operand_ids(len(arena) - 1)[0]
+    assert len(arena) == 4
+
+    result = arena.to_expr(len(arena) - 1)
+    assert result.operands[0] is result.operands[1]
+
+def test_evaluate():
+    exprs = [
+        BoolVar('a') & ~BoolVar('b'),
+        (BoolVar('a') | BoolVar('b')) & T,
+        ~(BoolVar('a') & BoolVar('a')),
+    ]
+    context = {'a': True, 'b': True}
+    algebra = StandardBooleanAlgebra()
+
+    arena = ExpressionArena()
+    roots = arena.add_all(exprs)
+    values = arena.evaluate_all(algebra, context)
+
+    for expr, root in zip(exprs, roots):
+        assert arena.evaluate(root, algebra, context) == expr.evaluate_in(algebra, context)
+        assert values[root] == expr.evaluate_in(algebra, context)
+
+def test_deep_expression():
+    expr = BoolVar('a')
+    for _ in range(50_000):
+        expr = ~expr
+
+    arena = ExpressionArena()
+    root = arena.add(expr)
+
+    assert arena.evaluate(root, StandardBooleanAlgebra(), {'a': False}) == False
+
+    # Comparing with == would recurse, so compare by adding both to a table.
+    shared = ExpressionArena(share_equal=True)
+    assert shared.add(arena.to_expr(root)) == shared.add(expr)
@@ -0,0 +1,151 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import io
+import pickle
+
+import pytest
+
+from mathdonewrong.boolean_algebra.boolexpr import And, Const, Not, T, Var as BoolVar
+from mathdonewrong.expression_files import ExpressionWriter, MappedExpressions, read_expressions, write_expressions
+from mathdonewrong.expressions import Literal, Oper, Var
+
+exprs = [
+    Oper('f', Var('x'), Oper('g', Literal(3), Var('x'))),
+    Literal(None),
+    Oper('h', Literal(True), Literal(1), Literal(1.5), Literal(2 ** 100), Literal('héllo'), Literal(b'\0')),
+    Var('y'),
+]
+
+def write_to_bytes(exprs) -> bytes:
+    file = io.BytesIO()
+    write_expressions(file, exprs)
+    return file.getvalue()
+
+def test_round_trip():
+    result = list(read_expressions(io.BytesIO(write_to_bytes(exprs))))
+
+    assert result == exprs
+    assert type(result[2].operands[0].value) is bool
+    assert type(result[2].operands[1].value) is int
+
+def test_classes():
+    expr = And(BoolVar('a'), Not(T))
+    file = io.BytesIO(write_to_bytes([expr, Oper('&', Var('a'), Literal(1))]))
+
+    result, plain = read_expressions(file)
+    assert result == expr
+    assert type(result) is And
+    assert type(result.operands[0]) is BoolVar
+    assert type(result.operands[1]) is Not
+    assert type(result.operands[1].operands[0]) is Const
+    assert str(result) == str(expr)
+
+    assert type(plain) is Oper
+    assert type(plain.operands[0]) is Var
+    assert type(plain.operands[1]) is Literal
+
+def test_templates():
+    file = io.BytesIO(write_to_bytes([Not(T)]))
+
+    result, = read_expressions(file, [T])
+    assert result.operands[0].value == T.value
+
+def test_local_class():
+    class LocalOper(Oper):
+        pass
+
+    with pytest.raises(TypeError):
+        write_to_bytes([LocalOper('f')])
+
+def test_shared_nodes_written_once():
+    shared = Oper('g', Var('x'), Var('y'))
+    one = write_to_bytes([Oper('f', shared, shared)])
+    two = write_to_bytes([Oper('f', shared, Oper('g', Var('x'), Var('y')))])
+
+    assert len(one) < len(two)
+    assert list(read_expressions(io.BytesIO(one))) == list(read_expressions(io.BytesIO(two)))
+
+def test_bad_literal():
+    with pytest.raises(TypeError):
+        write_to_bytes([Literal([1, 2])])
+
+def test_bad_files():
+    with pytest.raises(ValueError):
+        list(read_expressions(io.BytesIO(b'not an expression file at all, really')))
+
+    file = io.BytesIO()
+    writer = ExpressionWriter(file)
+    writer.write(Var('x'))
+    file.seek(0)
+
+    with pytest.raises(ValueError):
+        list(read_expressions(file))
+
+@pytest.mark.parametrize('data', [b'', b'MDWEXPR\0', write_to_bytes(exprs)[:20]])
+def test_short_files(tmp_path, data):
+    with pytest.raises(ValueError, match="isn't an expression file"):
+        list(read_expressions(io.BytesIO(data)))
+
+    path = tmp_path / 'short.bin'
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match="isn't an expression file"):
+        MappedExpressions(str(path))
+
+def test_pickle_mapped(tmp_path):
+    path = tmp_path / 'exprs.bin'
+    path.write_bytes(write_to_bytes([And(BoolVar('a'), T)]))
+
+    with MappedExpressions(str(path), [T]) as mapped:
+        with pickle.loads(pickle.dumps(mapped)) as copy:
+            assert copy.path == mapped.path
+            assert list(copy) == list(mapped)
+            assert type(copy[0]) is And
+            assert type(copy[0].operands[0]) is BoolVar
+            assert copy[0].operands[1].value == T.value
+
+def test_mapped(tmp_path):
+    path = tmp_path / 'exprs.bin'
+    path.write_bytes(write_to_bytes(exprs))
+
+    with MappedExpressions(str(path)) as mapped:
+        assert len(mapped) == len(exprs)
+        assert mapped[2] == exprs[2]
+        assert list(mapped) == exprs
+
+        root = mapped.root(0)
+        assert mapped.tag(root) == 'oper'
+        assert mapped.name(root) == 'f'
+        assert mapped.node_class(root) is Oper
+
+        g = mapped.operand_ids(root)[1]
+        assert mapped.expr(g) == Oper('g', Literal(3), Var('x'))
+        assert mapped.value(mapped.operand_ids(g)[0]) == 3
+
+        with pytest.raises(IndexError):
+            mapped[len(exprs)]
+
+def test_deep_expression(tmp_path):
+    expr = Var('x')
+    for _ in range(50_000):
+        expr = Oper('f', expr)
+
+    path = tmp_path / 'deep.bin'
+    path.write_bytes(write_to_bytes([expr, Var('y')]))
+
+    result, y = read_expressions(io.BytesIO(path.read_bytes()))
+    assert y == Var('y')
+    for _ in range(50_000):
+        result, = result.operands
+    assert result == Var('x')
+
+    with MappedExpressions(str(path)) as mapped:
+        assert mapped.name(mapped.root(0)) == 'f'
+        assert mapped.expr(mapped.root(0) - 1).name == 'f'
@@ -10,7 +10,7 @@
 
 import pytest
 from mathdonewrong.algebras import Algebra
-from mathdonewrong.expressions import Expression, Literal, NamedOper, Oper, Var
+from mathdonewrong.expressions import Expression, Fold, Literal, NamedOper, Oper, Substitution, Transformer, Var, var_names
 
 class MyVar(Var):
     pass
@@ -102,6 +102,54 @@ def test_NamedOper_str():
 
 
 
+class CountNodes(Fold):
+    def fold_var(self, expr):
+        return 1
+
+    def fold_literal(self, expr):
+        return 1
+
+    def fold_oper(self, expr, operand_results):
+        return 1 + sum(operand_results)
+
+def test_fold():
+    assert CountNodes().fold(Oper('f', Var('x'), Oper('g', Literal(1)))) == 4
+
+def test_fold_deep_expression():
+    expr = Var('x')
+    for _ in range(100_000):
+        expr = Oper('f', expr)
+
+    assert CountNodes().fold(expr) == 100_001
+
+class DoubleLiterals(Transformer):
+    def fold_literal(self, expr):
+        return Literal(expr.value * 2)
+
+def test_transformer_shares_unchanged_subexpressions():
+    unchanged = Oper('g', Var('x'), Var('y'))
+    expr = MyNamedOper(unchanged, Oper('h', Literal(3)))
+
+    result = DoubleLiterals().fold(expr)
+    assert result == MyNamedOper(unchanged, Oper('h', Literal(6)))
+    assert isinstance(result, MyNamedOper)
+    assert result.operands[0] is unchanged
+
+    assert DoubleLiterals().fold(unchanged) is unchanged
+
+def test_substitution():
+    expr = Oper('f', Var('x'), Oper('g', Var('y'), Literal('x')))
+    result = Substitution({'x': Literal(1)}).fold(expr)
+
+    assert result == Oper('f', Literal(1), Oper('g', Var('y'), Literal('x')))
+    assert result.operands[1] is expr.operands[1]
+
+def test_var_names():
+    expr = Oper('f', Var('b'), Oper('g', Var('a'), Literal(1)), Var('b'))
+    assert var_names(expr) == ['b', 'a']
+    assert var_names(Literal(1)) == []
+
+
 
 if __name__ == '__main__':
     pytest.main([__file__])
@@ -0,0 +1,79 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+from array import array
+import random
+
+import pytest
+from mathdonewrong.law_checking import check_variety
+from mathdonewrong.monoidlike.finite_monoids import FiniteMonoid
+from mathdonewrong.monoidlike.monoids import bool_disjunction, bool_xor, trivial_monoid
+
+# The monoid {1, a, b} where a and b are both left zeros: ax = a and bx = b.
+left_zeros = FiniteMonoid(['1', 'a', 'b'], [
+    [0, 1, 2],
+    [1, 1, 1],
+    [2, 2, 2],
+])
+
+def test_from_monoid():
+    xor = FiniteMonoid.from_monoid(bool_xor, [False, True])
+    assert xor.id == False
+    assert xor.mop_(True, True) == False
+    assert xor.mop(True, False, True, True) == True
+
+    disjunction = FiniteMonoid.from_monoid(bool_disjunction, [True, False])
+    assert disjunction.id == False
+    assert disjunction.id_index == 1
+    assert disjunction.mop_(True, False) == True
+
+    trivial = FiniteMonoid.from_monoid(trivial_monoid, [None])
+    assert trivial.mop_(None, None) == None
+
+def test_from_monoid_not_closed():
+    with pytest.raises(ValueError):
+        FiniteMonoid.from_monoid(bool_xor, [True])
+
+def test_bad_tables():
+    with pytest.raises(ValueError):
+        FiniteMonoid(['a', 'b'], [[0, 1]])
+    with pytest.raises(ValueError):
+        FiniteMonoid(['a', 'b'], [[0, 1], [1, 2]])
+    with pytest.raises(ValueError):
+        FiniteMonoid(['a', 'b'], [[1, 1], [1, 1]])
+
+def test_is_associative():
+    assert left_zeros.is_associative()
+    assert FiniteMonoid.from_monoid(bool_xor, [False, True]).is_associative()
+
+    # Here (aa)a = ba = a, but a(aa) = ab = b.
+    assert not FiniteMonoid(['1', 'a', 'b'], [
+        [0, 1, 2],
+        [1, 2, 2],
+        [2, 1, 2],
+    ]).is_associative()
+
+def test_mop_indices():
+    xs = array('I', [0, 1, 2, 1, 0])
+    ys = array('I', [2, 0, 1, 2, 0])
+
+    assert left_zeros.mop_indices(xs, ys) == array('I', [2, 1, 2, 1, 0])
+
+def test_mop_all_indices_matches_mop():
+    rng = random.Random(0)
+    elements = [rng.choice(['1', 'a', 'b']) for _ in range(1001)]
+
+    assert left_zeros.mop_all_indices(left_zeros.to_indices(elements)) == left_zeros.indices[left_zeros.mop(*elements)]
+    assert left_zeros.mop_all(elements) == left_zeros.mop(*elements)
+    assert left_zeros.fold([]) == '1'
+    assert left_zeros.from_indices(array('I', [2, 0])) == ['b', '1']
+
+def test_finite_monoid_satisfies_monoid_laws():
+    assert check_variety(left_zeros, left_zeros.elements) is None
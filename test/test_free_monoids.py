@@ -0,0 +1,104 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import pytest
+from mathdonewrong.monoidlike.free_monoids import (
+    free_monoid_equal, monoid_word, normalization_proof, prove_equal, word_to_expr
+)
+from mathdonewrong.monoidlike.monoids import (
+    Id, LeftId, MonLiteral, MonVar, MonoidEqualityAlgebra, MonoidEquation, RightId
+)
+
+x, y, z = MonVar('x'), MonVar('y'), MonVar('z')
+L = MonLiteral
+
+def test_monoid_word():
+    assert monoid_word(Id()) == ()
+    assert monoid_word(x) == (('var', 'x'),)
+    assert monoid_word((x * Id()) * (L(3) * (Id() * y))) == (('var', 'x'), ('literal', 3), ('var', 'y'))
+
+def test_monoid_word_of_deep_expression():
+    expr = x
+    for _ in range(10000):
+        expr = expr * y
+
+    assert len(monoid_word(expr)) == 10001
+
+def test_free_monoid_equal():
+    assert free_monoid_equal((x * y) * z, x * (y * z))
+    assert free_monoid_equal(Id() * x, x * Id())
+    assert not free_monoid_equal(x * y, y * x)
+    assert not free_monoid_equal(L(1), MonVar('1'))
+
+def test_word_to_expr():
+    assert word_to_expr(()) == Id()
+    assert word_to_expr(monoid_word((x * y) * z)) == x * (y * z)
+
+def test_normalization_proof():
+    exprs = [
+        Id(),
+        x,
+        Id() * Id(),
+        ((x * y) * z) * x,
+        (x * Id()) * ((Id() * y) * (z * Id())),
+    ]
+
+    for expr in exprs:
+        proof = normalization_proof(expr)
+        assert proof.valid
+        assert proof.lhs == expr
+        assert proof.rhs == word_to_expr(monoid_word(expr))
+
+def test_prove_equal():
+    lhs = ((x * y) * Id()) * (z * x)
+    rhs = x * ((Id() * y) * (z * x))
+
+    proof = prove_equal(lhs, rhs)
+    assert proof == MonoidEquation(lhs, rhs, True)
+
+def test_prove_equal_left_nested():
+    lhs = x
+    rhs = y
+    for _ in range(200):
+        lhs = lhs * y
+    for _ in range(199):
+        rhs = y * rhs
+
+    proof = prove_equal(lhs, (x * rhs) * Id())
+    assert proof.valid
+
+def test_prove_equal_deep():
+    lhs = x
+    rhs = Id()
+    for _ in range(5000):
+        lhs = lhs * (y * Id())
+        rhs = Id() * (y * rhs)
+
+    proof = prove_equal(lhs, x * rhs)
+    assert proof.valid
+    assert proof.lhs is lhs
+    assert normalization_proof(lhs).valid
+
+def test_prove_unequal():
+    with pytest.raises(ValueError):
+        prove_equal(x * y, y * x)
+
+def test_equality_algebra_identities():
+    eq = MonoidEqualityAlgebra()
+    context = {'x': MonoidEquation.refl(x)}
+
+    assert LeftId(x).evaluate_in(eq, context) == MonoidEquation(Id() * x, x, True)
+    assert RightId(x).evaluate_in(eq, context) == MonoidEquation(x * Id(), x, True)
+
+def test_equality_algebra_variety():
+    a, b, c = MonVar('a'), MonVar('b'), MonVar('c')
+    relations = [(rel.lhs, rel.rhs) for rel in MonoidEqualityAlgebra.variety.relations]
+
+    assert relations == [(Id() * a, a), (a * Id(), a), ((a * b) * c, a * (b * c))]
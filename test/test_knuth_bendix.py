@@ -0,0 +1,134 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import io
+
+import pytest
+
+from mathdonewrong.expressions import Literal, Oper, Var
+from mathdonewrong.knuth_bendix import KBO, LPO, complete, complete_presentation, critical_pairs, equal_in, load_rules, save_rules, unify
+from mathdonewrong.monoidlike.monoids import Id, MonVar, Mop, bool_disjunction, bool_xor
+from mathdonewrong.rewriting import Rule
+
+a, b, c = Var('a'), Var('b'), Var('c')
+T = Literal(True)
+
+def mul(x, y):
+    return Oper('Mul', x, y)
+
+def inv(x):
+    return Oper('Inv', x)
+
+E = Oper('E')
+
+group_axioms = [
+    (mul(E, a), a),
+    (mul(inv(a), a), E),
+    (mul(mul(a, b), c), mul(a, mul(b, c))),
+]
+
+def test_unify():
+    assert unify(mul(a, E), mul(inv(b), c)) == {'a': inv(b), 'c': E}
+    assert unify(mul(a, a), mul(E, inv(E))) is None
+    assert unify(a, inv(a)) is None
+
+def test_lpo():
+    lpo = LPO({'E': 0, 'Mul': 1, 'Inv': 2})
+
+    assert lpo.greater(mul(mul(a, b), c), mul(a, mul(b, c)))
+    assert not lpo.greater(mul(a, mul(b, c)), mul(mul(a, b), c))
+    assert lpo.greater(inv(mul(a, b)), mul(inv(b), inv(a)))
+    assert lpo.greater(mul(a, E), a)
+    assert not lpo.greater(mul(a, b), mul(b, a))
+
+def test_kbo():
+    kbo = KBO({'E': 0, 'Mul': 1, 'Inv': 2}, {'Inv': 0})
+
+    assert kbo.greater(mul(mul(a, b), c), mul(a, mul(b, c)))
+    assert kbo.greater(inv(mul(a, b)), mul(inv(b), inv(a)))
+    assert kbo.greater(inv(inv(a)), a)
+    assert not kbo.greater(mul(a, b), mul(b, b))
+
+def test_critical_pairs():
+    assoc = Rule(mul(mul(a, b), c), mul(a, mul(b, c)))
+    left_inverse = Rule(mul(inv(a), a), E)
+
+    pairs = critical_pairs(assoc, left_inverse)
+    assert len(pairs) == 1
+    assert pairs[0][1] == mul(E, c)
+
+@pytest.mark.parametrize('ordering', [
+    LPO({'E': 0, 'Mul': 1, 'Inv': 2}),
+    KBO({'E': 0, 'Mul': 1, 'Inv': 2}, {'Inv': 0}),
+])
+def test_complete_group_axioms(ordering):
+    system = complete(group_axioms, ordering)
+    assert len(system.rules) == 10
+
+    x, y = Var('x'), Var('y')
+    assert equal_in(system, inv(mul(x, y)), mul(inv(y), inv(x)))
+    assert equal_in(system, mul(x, inv(x)), E)
+    assert equal_in(system, inv(inv(mul(x, E))), x)
+    assert not equal_in(system, mul(x, y), mul(y, x))
+
+def test_complete_with_primed_variables():
+    # Variable names like the ones completion might make up for itself
+    a1, a2 = Var("a'"), Var("a_0")
+    axioms = [
+        (mul(E, a1), a1),
+        (mul(inv(a2), a2), E),
+        (mul(mul(a1, a2), Var("a''")), mul(a1, mul(a2, Var("a''")))),
+    ]
+
+    system = complete(axioms, LPO({'E': 0, 'Mul': 1, 'Inv': 2}))
+    assert len(system.rules) == 10
+
+    x = Var('x')
+    assert equal_in(system, mul(x, inv(x)), E)
+    assert equal_in(system, inv(inv(x)), x)
+
+def test_critical_pairs_with_clashing_names():
+    primed = Var("a'")
+    left_inverse = Rule(mul(inv(primed), primed), E)
+    assoc = Rule(mul(mul(a, primed), c), mul(a, mul(primed, c)))
+
+    pairs = critical_pairs(assoc, left_inverse)
+    assert len(pairs) == 1
+    assert pairs[0][1] == mul(E, c)
+
+def test_complete_bool_xor_presentation():
+    system = complete_presentation(bool_xor)
+
+    assert equal_in(system, Mop(T, T), Id())
+    assert equal_in(system, Mop(Mop(T, T), Mop(T, Id())), T)
+    assert equal_in(system, Mop(MonVar('x'), Mop(T, T)), MonVar('x'))
+    assert not equal_in(system, Mop(T, Mop(T, T)), Id())
+
+def test_complete_bool_disjunction_presentation():
+    system = complete_presentation(bool_disjunction)
+
+    assert equal_in(system, Mop(T, Mop(T, Mop(T, T))), T)
+    assert equal_in(system, Mop(Mop(MonVar('x'), T), T), Mop(MonVar('x'), T))
+    assert not equal_in(system, Mop(T, T), Id())
+
+def test_unorientable_equation():
+    with pytest.raises(ValueError):
+        complete([(mul(a, b), mul(b, a))])
+
+def test_save_and_load():
+    system = complete_presentation(bool_xor)
+
+    file = io.StringIO()
+    save_rules(system, file)
+    file.seek(0)
+    loaded = load_rules(file)
+
+    assert [str(rule) for rule in loaded.rules] == [str(rule) for rule in system.rules]
+    assert equal_in(loaded, Mop(T, Mop(T, MonVar('x'))), MonVar('x'))
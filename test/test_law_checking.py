@@ -0,0 +1,81 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from mathdonewrong.law_checking import Counterexample, check_homomorphism, check_variety
+from mathdonewrong.monoidlike.monoids import (
+    Monoid, MonoidHomomorphism,
+    bool_disjunction, bool_xor, int_addition, int_addition_to_bool_disjunction,
+    int_addition_to_bool_xor, int_multiplication, int_scale, string_length,
+    string_monoid, trivial_monoid, tuple_monoid
+)
+
+class IntSubtraction(Monoid):
+    T = int
+
+    def id_(self) -> int:
+        return 0
+
+    def mop_(self, a: int, b: int) -> int:
+        return a - b
+
+int_subtraction = IntSubtraction()
+
+def test_monoids_satisfy_monoid_laws():
+    assert check_variety(int_addition, [0, 1, -3, 10]) is None
+    assert check_variety(int_multiplication, [0, 1, -3, 10]) is None
+    assert check_variety(string_monoid, ['', 'a', 'bc']) is None
+    assert check_variety(tuple_monoid, [(), (1,), (2, 3)]) is None
+    assert check_variety(bool_disjunction, [False, True]) is None
+    assert check_variety(bool_xor, [False, True]) is None
+    assert check_variety(trivial_monoid, [None]) is None
+
+def test_subtraction_is_not_a_monoid():
+    counterexample = check_variety(int_subtraction, [0, 1, 2])
+
+    assert counterexample == Counterexample('Mop(Id(), a) = a', {'a': 1}, -1, 1)
+
+def test_sampled_check():
+    assert check_variety(int_addition, list(range(-50, 50)), samples=200, seed=1) is None
+
+    counterexample = check_variety(int_subtraction, list(range(1, 50)), samples=200, seed=1)
+    assert counterexample is not None
+    assert counterexample.lhs_value != counterexample.rhs_value
+
+def test_homomorphisms_are_homomorphisms():
+    assert check_homomorphism(string_length, ['', 'a', 'bc', 'def']) is None
+    assert check_homomorphism(int_addition_to_bool_xor, list(range(10))) is None
+    assert check_homomorphism(int_addition_to_bool_disjunction, list(range(10))) is None
+    assert check_homomorphism(int_scale(3), list(range(-5, 5))) is None
+
+def test_non_homomorphisms():
+    @MonoidHomomorphism
+    def is_one(i: int_addition) -> bool_xor:
+        return i == 1
+
+    assert check_homomorphism(is_one, [0, 1, 2]) == Counterexample(
+        'f(a * b) = f(a) * f(b)', {'a': 1, 'b': 2}, False, True)
+
+    @MonoidHomomorphism
+    def plus_one(i: int_addition) -> int_addition:
+        return i + 1
+
+    assert check_homomorphism(plus_one, [0, 1]) == Counterexample('f(e) = e', {}, 1, 0)
+
+@pytest.mark.parametrize('executor_class', [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_check_in_executor(executor_class):
+    with executor_class(2) as executor:
+        assert check_variety(bool_xor, [False, True], executor=executor, chunk_size=2) is None
+        assert check_variety(int_addition, list(range(20)), executor=executor, chunk_size=100) is None
+        assert check_variety(int_subtraction, list(range(20)), executor=executor, chunk_size=3) is not None
+        assert check_variety(int_subtraction, list(range(20)), executor=executor, chunk_size=3, max_pending=1) is not None
+        assert check_homomorphism(string_length, ['', 'a', 'bc'], executor=executor) is None
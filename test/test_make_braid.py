@@ -8,10 +8,12 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
+import random
+
 import pytest
 
 from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions
-from mathdonewrong.monoidal_categories.make_braid import make_braid
+from mathdonewrong.monoidal_categories.make_braid import make_braid, vartree_to_set
 from mathdonewrong.monoidal_categories.monoidalexpr import Braid, Compose, Drop, Id, Stack, Unit, Var
 
 cat = CategoryOfUnaryFunctions()
@@ -31,7 +33,6 @@ def test_make_braid_pair_to_same_pair():
     expr = make_braid(('x', 'y'), ('x', 'y'))
     assert expr == Id(Stack(Var('x'), Var('y')))
 
-@pytest.mark.skip
 def test_make_braid_var_to_nothing():
     expr = make_braid('x', None)
     assert expr == Drop(Var('x'))
@@ -57,3 +58,94 @@ def test_make_braid_complicated_swap():
 
     func = expr.evaluate_in(cat, {'x': 'irrelevant', 'y': 'irrelevant', 'z': 'irrelevant'})
     assert func((('orange', 'purple'), 'green')) == ('green', ('purple', 'orange'))
+
+def fill(tree, values):
+    if tree is None:
+        return None
+    elif isinstance(tree, str):
+        return values[tree]
+    else:
+        left, right = tree
+        return (fill(left, values), fill(right, values))
+
+def braid_func(domain, codomain):
+    expr = make_braid(domain, codomain)
+    return expr.evaluate_in(cat, {name: 'irrelevant' for name in vartree_to_set(domain)})
+
+def check_braid(domain, codomain, values):
+    assert braid_func(domain, codomain)(fill(domain, values)) == fill(codomain, values)
+
+def test_make_braid_drop_some():
+    values = {'x': 1, 'y': 2, 'z': 3}
+    check_braid((('x', 'y'), 'z'), ('z', 'x'), values)
+    check_braid((('x', 'y'), 'z'), 'y', values)
+    check_braid(('x', 'y'), None, values)
+
+def test_make_braid_copy():
+    values = {'x': 1, 'y': 2}
+    check_braid('x', ('x', 'x'), values)
+    check_braid(('x', 'y'), (('y', 'x'), ('x', 'y')), values)
+
+def test_make_braid_units():
+    values = {'x': 1, 'y': 2}
+    check_braid(('x', None), 'x', values)
+    check_braid('x', (None, ('x', None)), values)
+    check_braid(None, (None, None), values)
+    check_braid(((None, 'x'), 'y'), ('y', (None, 'x')), values)
+
+def test_make_braid_interleave():
+    values = {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+    check_braid((('a', 'b'), ('c', 'd')), (('a', 'c'), ('b', 'd')), values)
+    check_braid((('a', 'b'), ('c', 'd')), (('d', 'b'), ('c', 'a')), values)
+
+def random_tree(rng, leaves):
+    if len(leaves) == 1:
+        return leaves[0]
+
+    split = rng.randrange(1, len(leaves))
+    return (random_tree(rng, leaves[:split]), random_tree(rng, leaves[split:]))
+
+def test_make_braid_random_permutations():
+    rng = random.Random(1234)
+
+    for size in [2, 3, 5, 8, 40, 200]:
+        names = [f'v{i}' for i in range(size)]
+        values = {name: i for i, name in enumerate(names)}
+        domain = random_tree(rng, names)
+        shuffled = names[:]
+        rng.shuffle(shuffled)
+        codomain = random_tree(rng, shuffled)
+        check_braid(domain, codomain, values)
+
+def test_make_braid_random_subsets_with_copies():
+    rng = random.Random(5678)
+
+    for size in [3, 6, 20]:
+        names = [f'v{i}' for i in range(size)]
+        values = {name: i for i, name in enumerate(names)}
+        domain = random_tree(rng, names)
+        chosen = [rng.choice(names) for _ in range(size)]
+        codomain = random_tree(rng, chosen)
+        check_braid(domain, codomain, values)
+
+def test_make_braid_duplicate_in_domain():
+    with pytest.raises(ValueError):
+        make_braid(('x', 'x'), 'x')
+
+def test_make_braid_missing_variable():
+    with pytest.raises(ValueError):
+        make_braid('x', ('x', 'y'))
+
+def test_make_braid_reverse_comb():
+    names = [f'v{i}' for i in range(100)]
+    values = {name: i for i, name in enumerate(names)}
+
+    domain = names[0]
+    for name in names[1:]:
+        domain = (domain, name)
+
+    codomain = names[-1]
+    for name in reversed(names[:-1]):
+        codomain = (codomain, name)
+
+    check_braid(domain, codomain, values)
@@ -8,6 +8,9 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pickle
+
 import pytest
 from mathdonewrong.equality.equality_exprs import EqSymm, EqTrans
 from mathdonewrong.expressions import Expression
@@ -16,8 +19,8 @@ from mathdonewrong.monoidlike.monoids import (
     MonoidEquation, MonoidHomomorphism,
     bool_disjunction, bool_xor, int_addition,
     int_addition_to_bool_disjunction, int_addition_to_bool_xor,
-    int_multiplication, int_scale, string_monoid,
-    trivial_monoid, trivial_to, tuple_monoid
+    int_multiplication, int_scale, string_length, string_monoid,
+    trivial_monoid, trivial_to, tuple_monoid, tree_reduce
 )
 from mathdonewrong.varieties import Operator, Relation
 
@@ -78,6 +81,40 @@ def test_homomorphism_on_generators():
     assert int_scale(3).on_generators() == [(1, 3)]
 
 
+def double(x: int) -> int:
+    return 2 * x
+
+def test_pickle_homomorphism():
+    assert pickle.loads(pickle.dumps(string_length)) is string_length
+
+    doubling = MonoidHomomorphism(double, int_addition, int_addition)
+    copy = pickle.loads(pickle.dumps(doubling))
+    assert copy.f is double
+    assert copy(21) == 42
+
+    with pytest.raises(pickle.PicklingError, match="top level"):
+        pickle.dumps(int_scale(3))
+    with pytest.raises(pickle.PicklingError, match="top level"):
+        pickle.dumps(MonoidHomomorphism(lambda x: x, int_addition, int_addition))
+
+def test_map_reduce():
+    words = (str(i) for i in range(5000))
+    assert string_length.map_reduce(words, chunk_size=128) == sum(len(str(i)) for i in range(5000))
+    assert int_addition_to_bool_xor.map_reduce([]) == False
+
+def test_map_reduce_in_executor():
+    expected = sum(len(str(i)) for i in range(5000))
+
+    with ThreadPoolExecutor(4) as executor:
+        words = (str(i) for i in range(5000))
+        assert string_length.map_reduce(words, executor, chunk_size=100, max_pending=3) == expected
+        assert int_scale(3).map_reduce(range(100), executor, chunk_size=7) == 3 * 4950
+
+    with ProcessPoolExecutor(2) as executor:
+        words = (str(i) for i in range(5000))
+        assert string_length.map_reduce(words, executor, chunk_size=500) == expected
+
+
 
 # Test various particular monoids
 
@@ -106,6 +143,72 @@ def test_tuple_monoid():
     assert tuple_monoid.mop((1, 'hello')) == (1, 'hello')
     assert tuple_monoid.mop((1, 'hello'), (), ('world',)) == (1, 'hello', 'world')
 
+def test_fold():
+    assert int_addition.fold([]) == 0
+    assert int_addition.fold(range(1001)) == 500500
+    assert int_multiplication.fold([5, 7, 3]) == 105
+    assert string_monoid.fold(['boots', ' and', ' cats']) == 'boots and cats'
+    assert tuple_monoid.fold([(1, 'hello'), (), ('world',)]) == (1, 'hello', 'world')
+    assert bool_xor.fold([True] * 7) == True
+
+def test_fold_without_bulk_combine_uses_tree():
+    calls = []
+
+    def concat(a, b):
+        calls.append((a, b))
+        return a + b
+
+    assert tree_reduce(concat, ['a', 'b', 'c', 'd', 'e'], '') == 'abcde'
+    assert calls[:2] == [('a', 'b'), ('c', 'd')]
+    assert tree_reduce(concat, [], '') == ''
+
+def test_fold_in_executor():
+    words = [str(i) for i in range(2500)]
+
+    with ThreadPoolExecutor(4) as executor:
+        assert string_monoid.fold(words, executor, chunk_size=100) == ''.join(words)
+        assert bool_disjunction.fold(iter([False] * 300), executor, chunk_size=7) == False
+
+    with ProcessPoolExecutor(2) as executor:
+        assert int_addition.fold(range(10000), executor, chunk_size=1000) == 49995000
+
+def test_scan():
+    assert list(int_addition.scan([])) == []
+    assert list(int_addition.scan([1, 2, 3, 4])) == [1, 3, 6, 10]
+    assert list(bool_xor.scan([True, True, False, True])) == [True, False, False, True]
+    assert list(string_monoid.scan(iter(['a', 'b', 'c']))) == ['a', 'ab', 'abc']
+
+def test_scan_is_lazy():
+    def naturals():
+        n = 0
+        while True:
+            n += 1
+            yield n
+
+    running_sums = int_addition.scan(naturals())
+    assert [next(running_sums) for _ in range(4)] == [1, 3, 6, 10]
+
+def test_scan_in_executor():
+    bits = [i % 3 == 0 for i in range(1000)]
+
+    with ThreadPoolExecutor(4) as executor:
+        assert list(int_addition.scan(range(1000), executor, chunk_size=64)) == list(int_addition.scan(range(1000)))
+        assert list(bool_xor.scan(bits, executor, chunk_size=10)) == list(bool_xor.scan(bits))
+        assert list(string_monoid.scan(['a', 'b', 'c'], executor, chunk_size=2)) == ['a', 'ab', 'abc']
+        assert list(int_multiplication.scan([], executor)) == []
+
+def test_power():
+    assert int_addition.power(7, 0) == 0
+    assert int_addition.power(7, 1) == 7
+    assert int_addition.power(7, 10**20) == 7 * 10**20
+    assert int_multiplication.power(3, 13) == 3**13
+    assert string_monoid.power('ab', 5) == 'ababababab'
+    assert bool_xor.power(True, 1001) == True
+    assert tuple_monoid.power((1,), 3) == (1, 1, 1)
+
+    with pytest.raises(ValueError):
+        int_addition.power(7, -1)
+
 def test_evaluation():
     assert (L(5) * L(7) * L(3)).evaluate_in(int_addition, {}) == 15
     assert (L(5) * L(7) * L(3)).evaluate_in(int_multiplication, {}) == 105
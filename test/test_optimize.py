@@ -0,0 +1,87 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import pytest
+
+from mathdonewrong.monoidal_categories import AssocLeft, AssocRight, Braid, BraidInv, Compose, Diagonal, Id, Stack, Unit, UnitLeft, UnitLeftInv, UnitRight, UnitRightInv, Var
+from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions
+from mathdonewrong.monoidal_categories.optimize import OptimizationResult, optimize
+from mathdonewrong.monoidal_categories.typechecker import ArrowType, TypeChecker
+
+cat = CategoryOfUnaryFunctions()
+
+A, B, C = Var('A'), Var('B'), Var('C')
+f, g, h, k = Var('f'), Var('g'), Var('h'), Var('k')
+
+def test_remove_identities():
+    assert optimize(Compose(Id(A), f)) == OptimizationResult(f, 3)
+    assert optimize(Compose(f, Id(A))) == OptimizationResult(f, 3)
+    assert optimize(Compose(Id(A), Id(A))) == OptimizationResult(Id(A), 3)
+
+def test_cancel_inverses():
+    assert optimize(Compose(Braid(A, B), BraidInv(A, B))).expr == Id(Stack(A, B))
+    assert optimize(Compose(BraidInv(A, B), Braid(A, B))).expr == Id(Stack(B, A))
+    assert optimize(Compose(Braid(A, B), Braid(B, A))).expr == Id(Stack(A, B))
+    assert optimize(Compose(AssocRight(A, B, C), AssocLeft(A, B, C))).expr == Id(Stack(Stack(A, B), C))
+    assert optimize(Compose(AssocLeft(A, B, C), AssocRight(A, B, C))).expr == Id(Stack(A, Stack(B, C)))
+    assert optimize(Compose(UnitLeft(A), UnitLeftInv(A))).expr == Id(A)
+    assert optimize(Compose(UnitLeftInv(A), UnitLeft(A))).expr == Id(Stack(Unit(), A))
+    assert optimize(Compose(UnitRight(A), UnitRightInv(A))).expr == Id(A)
+    assert optimize(Compose(UnitRightInv(A), UnitRight(A))).expr == Id(Stack(A, Unit()))
+
+def test_non_inverses_are_kept():
+    expr = Compose(Braid(A, B), Braid(A, B))
+    assert optimize(expr) == OptimizationResult(expr, 0)
+
+    expr = Compose(AssocRight(A, B, C), AssocLeft(B, A, C))
+    assert optimize(expr) == OptimizationResult(expr, 0)
+
+def test_nested_cancellation():
+    expr = Compose(
+        Compose(f, Compose(Braid(A, B), AssocRight(A, B, C))),
+        Compose(Compose(AssocLeft(A, B, C), BraidInv(A, B)), g))
+
+    result = optimize(expr)
+    assert result.expr == Compose(f, g)
+    assert result.nodes_removed == 18
+
+def test_interchange():
+    expr = Compose(Stack(Braid(A, B), f), Stack(BraidInv(A, B), Id(C)))
+    assert optimize(expr).expr == Stack(Id(Stack(A, B)), f)
+
+    expr = Compose(Stack(Id(A), Id(B)), Stack(f, g))
+    assert optimize(expr).expr == Stack(f, g)
+
+def test_optimized_expression_evaluates_the_same():
+    expr = Compose(
+        Compose(Diagonal(A), Compose(Braid(A, A), Stack(f, Id(A)))),
+        Compose(Stack(UnitRight(B), g), Stack(UnitRightInv(B), Id(A))))
+    context = {'A': int, 'B': int, 'f': lambda x: x * 2, 'g': lambda x: x + 100}
+
+    result = optimize(expr)
+    assert result.nodes_removed > 0
+    assert result.expr.evaluate_in(cat, context)(7) == expr.evaluate_in(cat, context)(7)
+
+def test_typed_optimization_erases_identities():
+    checker = TypeChecker({'f': ArrowType(Stack(Unit(), Unit()), A)})
+
+    expr = Compose(Braid(Unit(), Unit()), f)
+    assert optimize(expr).expr == expr
+    assert optimize(expr, checker).expr == f
+
+    # Moving the unit from the right to the left and back
+    roundabout = Compose(
+        Compose(UnitRightInv(A), UnitLeft(A)),
+        Compose(Braid(Unit(), A), Stack(Id(A), Id(Unit()))))
+    assert optimize(roundabout, checker).expr == Id(Stack(A, Unit()))
+
+def test_typed_optimization_reports_mismatches():
+    with pytest.raises(TypeError):
+        optimize(Compose(Braid(A, B), Braid(A, B)), TypeChecker())
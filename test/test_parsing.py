@@ -0,0 +1,160 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import io
+import math
+import random
+
+import pytest
+
+from mathdonewrong.boolean_algebra import And, F, Not, Or, T, Var as BoolVar, parse as parse_bool
+from mathdonewrong.expressions import BinaryOper, Literal, Oper, PrefixOper, Var
+from mathdonewrong.monoidal_categories.monoidalexpr import Braid, Compose, Id, Var as MonoidalVar
+from mathdonewrong.parsing import Grammar, parse
+
+class Add(BinaryOper):
+    name = '+'
+    precedence = 50
+
+class Sub(BinaryOper):
+    name = '-'
+    precedence = 50
+
+class Mul(BinaryOper):
+    name = '*'
+    precedence = 60
+
+class Pow(BinaryOper):
+    name = '**'
+    precedence = 70
+
+class Neg(PrefixOper):
+    name = '-'
+    precedence = 65
+
+arithmetic = Grammar(binary=[Add, Sub, Mul, Pow], prefix=[Neg])
+x, y, z = Var('x'), Var('y'), Var('z')
+
+def test_parse_plain_expressions():
+    assert parse('x') == x
+    assert parse('f(x, g(), 3, 2.5, "hi")') == Oper('f', x, Oper('g'), Literal(3), Literal(2.5), Literal('hi'))
+    assert parse(r" f('it\'s') ") == Oper('f', Literal("it's"))
+
+def test_round_trip_literals():
+    exprs = [
+        Oper('f', Literal(-1), Literal(-2.5), Literal(1e-05), Literal(-1e+20)),
+        Oper('f', Literal(True), Literal(False), Literal(None)),
+        Oper('f', Literal(math.inf), Literal(-math.inf)),
+    ]
+
+    for expr in exprs:
+        result = parse(str(expr))
+        assert result == expr
+        assert [type(operand.value) for operand in result.operands] == [type(operand.value) for operand in expr.operands]
+
+    assert math.isnan(parse('nan').value)
+
+def test_signed_numbers_with_binary_minus():
+    grammar = Grammar(binary=[Sub])
+    assert grammar.parse('x - -1') == Sub(x, Literal(-1))
+    assert grammar.parse('-1 - x') == Sub(Literal(-1), x)
+
+    # With a prefix minus, a sign is the prefix operator.
+    assert arithmetic.parse('x - -1') == Sub(x, Neg(Literal(1)))
+
+def test_limits_of_round_trips():
+    # Strings aren't quoted by str, and variables named like constants read as
+    # the constants.
+    assert parse(str(Oper('f', Literal('x')))) == Oper('f', x)
+    assert parse(str(Oper('f', Var('None')))) == Oper('f', Literal(None))
+
+def test_precedence_and_associativity():
+    assert arithmetic.parse('x + y * z') == Add(x, Mul(y, z))
+    assert arithmetic.parse('(x + y) * z') == Mul(Add(x, y), z)
+    assert arithmetic.parse('x - y - z') == Sub(Sub(x, y), z)
+    assert arithmetic.parse('x - (y - z)') == Sub(x, Sub(y, z))
+    assert arithmetic.parse('x ** 2 * y') == Mul(Pow(x, Literal(2)), y)
+
+def test_prefix_operators():
+    assert arithmetic.parse('-x * y') == Mul(Neg(x), y)
+    assert arithmetic.parse('-x ** 2') == Neg(Pow(x, Literal(2)))
+    assert arithmetic.parse('x - -y') == Sub(x, Neg(y))
+    assert arithmetic.parse('--x') == Neg(Neg(x))
+
+def test_round_trip_arithmetic():
+    exprs = [
+        Sub(Add(x, Mul(y, z)), Neg(Sub(x, y))),
+        Mul(Neg(Add(x, y)), Pow(Pow(x, y), z)),
+        Pow(x, Pow(y, Neg(z))),
+        Add(Oper('f', Sub(x, y), Literal(1)), x),
+    ]
+
+    for expr in exprs:
+        assert arithmetic.parse(str(expr)) == expr
+
+def random_bool_expr(rng, depth):
+    if depth == 0:
+        return rng.choice([BoolVar('a'), BoolVar('b'), T, F])
+
+    choice = rng.random()
+    if choice < 0.4:
+        return And(random_bool_expr(rng, depth - 1), random_bool_expr(rng, depth - 1))
+    elif choice < 0.8:
+        return Or(random_bool_expr(rng, depth - 1), random_bool_expr(rng, depth - 1))
+    else:
+        return Not(random_bool_expr(rng, depth - 1))
+
+def test_round_trip_boolexpr():
+    rng = random.Random(50)
+
+    for _ in range(500):
+        expr = random_bool_expr(rng, rng.randrange(6))
+        result = parse_bool(str(expr))
+        assert result == expr
+        assert str(result) == str(expr)
+
+    result = parse_bool('~a & True')
+    assert isinstance(result, And)
+    assert isinstance(result.operands[0].operands[0], BoolVar)
+    assert result.operands[1] is T
+
+def test_named_operators():
+    grammar = Grammar(named=[Compose, Braid, Id], var=MonoidalVar)
+    expr = Compose(Braid(MonoidalVar('A'), MonoidalVar('B')), Id(MonoidalVar('A')))
+
+    result = grammar.parse(str(expr))
+    assert result == expr
+    assert isinstance(result, Compose)
+    assert isinstance(result.operands[0].operands[0], MonoidalVar)
+
+@pytest.mark.parametrize('text', ['', 'x +', 'x y', '(x', 'x)', '* x', 'x $ y', 'f(x,', 'f(x y)', ',', '(x, y)'])
+def test_errors(text):
+    with pytest.raises(ValueError):
+        arithmetic.parse(text)
+
+@pytest.mark.parametrize('text', ['-', '-x', 'x -1', 'f(-)'])
+def test_sign_errors(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+def test_deep_nesting():
+    assert arithmetic.parse('(' * 10_000 + 'x' + ')' * 10_000) == x
+
+    result = arithmetic.parse('-' * 10_000 + 'x')
+    for _ in range(10_000):
+        result, = result.operands
+    assert result == x
+
+def test_parse_many():
+    lines = io.StringIO('x + y\n\n  -z\nf(x)\n')
+    assert list(arithmetic.parse_many(lines)) == [Add(x, y), Neg(z), Oper('f', x)]
+
+    with pytest.raises(ValueError, match='line 2'):
+        list(arithmetic.parse_many(['x', 'x +']))
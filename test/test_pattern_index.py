@@ -0,0 +1,123 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import random
+
+import pytest
+
+from mathdonewrong.expressions import Literal, Oper, Var
+from mathdonewrong.monoidlike.monoids import Id, MonVar, Mop
+from mathdonewrong.pattern_index import PatternIndex
+
+a, b = Var('a'), Var('b')
+
+def test_query_with_bindings():
+    index = PatternIndex()
+    h1 = index.insert(Mop(MonVar('x'), Mop(Id(), MonVar('y'))))
+    h2 = index.insert(Mop(MonVar('x'), MonVar('y')))
+
+    matches = list(index.query(Mop(Id(), a)))
+    assert len(matches) == 1
+    assert matches[0].handle == h1
+    assert matches[0].position == (1,)
+    assert matches[0].bindings == {'a': MonVar('y')}
+
+    assert index.containing(Mop(a, b)) == {h1, h2}
+    assert index.containing(Mop(a, a)) == set()
+
+def test_stored_variables_are_constants():
+    index = PatternIndex()
+    handle = index.insert(Oper('f', Var('x'), Literal(3)))
+
+    assert index.containing(Oper('f', a, Literal(3))) == {handle}
+    assert index.containing(Oper('f', Literal('x'), Literal(3))) == set()
+    assert index.containing(Oper('f', Oper('x'), Literal(3))) == set()
+    assert index.containing(Oper('f', a, Literal(4))) == set()
+
+def test_repeated_subexpressions():
+    index = PatternIndex()
+    handle = index.insert(Oper('g', Oper('h', Literal(1)), Oper('h', Literal(1))))
+
+    positions = sorted(match.position for match in index.query(Oper('h', a)))
+    assert positions == [(0,), (1,)]
+    assert index.containing(Oper('g', a, a)) == {handle}
+
+def test_delete():
+    index = PatternIndex()
+    h1 = index.insert(Oper('f', Oper('h', Literal(1))))
+    h2 = index.insert(Oper('h', Literal(1)))
+
+    index.delete(h1)
+    assert len(index) == 1
+    assert index.containing(Oper('h', a)) == {h2}
+    assert index.containing(Oper('f', a)) == set()
+
+    index.delete(h2)
+    assert index.containing(Oper('h', a)) == set()
+    assert index.trie == {}
+
+    with pytest.raises(ValueError):
+        index.delete(h2)
+
+def test_churn_doesnt_grow_the_table():
+    index = PatternIndex()
+    kept = index.insert(Oper('f', Var('x'), Literal(0)))
+
+    for i in range(2000):
+        index.delete(index.insert(Oper('g', Literal(i), Oper('h', Literal(i)))))
+
+    assert len(index.table) < 200
+    assert index.expr(kept) == Oper('f', Var('x'), Literal(0))
+    assert index.containing(Oper('f', a, Literal(0))) == {kept}
+    assert index.containing(Oper('g', a, b)) == set()
+
+    handle = index.insert(Oper('g', Literal(1), Var('x')))
+    assert handle != kept
+    assert index.containing(Oper('g', a, b)) == {handle}
+
+def random_expr(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return Var(rng.choice('xy')) if rng.random() < 0.5 else Literal(rng.randrange(3))
+    name = rng.choice('fgh')
+    arity = 1 if name == 'h' else 2
+    return Oper(name, *[random_expr(rng, depth - 1) for _ in range(arity)])
+
+def contains_instance(expr, pattern, index):
+    # Check by brute force, one subexpression at a time.
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if index.match(pattern, index.table.intern(node)) is not None:
+            return True
+        if node.tag == 'oper':
+            stack.extend(node.operands)
+    return False
+
+def test_random_against_brute_force():
+    rng = random.Random(45)
+    index = PatternIndex()
+    exprs = {index.insert(expr): expr for expr in (random_expr(rng, 5) for _ in range(300))}
+
+    for handle in list(exprs)[::3]:
+        index.delete(handle)
+        del exprs[handle]
+
+    patterns = [
+        Oper('f', a, b),
+        Oper('f', a, a),
+        Oper('g', Oper('h', a), Literal(1)),
+        Oper('h', Oper('h', Oper('f', a, Var('x')))),
+        Oper('f', Oper('g', a, b), Oper('h', b)),
+        a,
+    ]
+
+    for pattern in patterns:
+        expected = {handle for handle, expr in exprs.items() if contains_instance(expr, pattern, index)}
+        assert index.containing(pattern) == expected
@@ -0,0 +1,97 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import pytest
+from mathdonewrong.equality.equality_exprs import EqSymm, EqTrans
+from mathdonewrong.expression_table import ExpressionTable
+from mathdonewrong.expressions import Literal, Oper, Var
+from mathdonewrong.monoidlike.monoids import Assoc, Id, LeftId, MonoidEquation, MonVar
+from mathdonewrong.monoidlike.proof_store import ProofStore
+
+x, y, z = MonVar('x'), MonVar('y'), MonVar('z')
+
+def test_expression_table_interning():
+    table = ExpressionTable()
+
+    a = table.intern(Oper('f', Var('x'), Literal(1)))
+    b = table.intern(Oper('f', Var('x'), Literal(1)))
+    c = table.intern(Oper('f', Literal(1), Var('x')))
+
+    assert a == b
+    assert a != c
+    assert table.intern(MonVar('x')) == table.intern(Var('x'))
+    assert len(table) == 4
+    assert table.expr(c) == Oper('f', Literal(1), Var('x'))
+
+def test_shared_table():
+    table = ExpressionTable()
+    first = ProofStore(table)
+    second = ProofStore(table)
+
+    assert first.table is table
+    assert first.refl(x * y) == second.refl(x * y)
+
+def test_expression_table_deep_expression():
+    table = ExpressionTable()
+
+    expr = x
+    for _ in range(10000):
+        expr = expr * x
+
+    assert table.intern(expr) == 10000
+    assert table.intern_oper(Oper('Mop'), (0, 0)) == 1
+
+def test_store_evaluates_proof_expressions():
+    store = ProofStore()
+    context = {name: store.refl(MonVar(name)) for name in 'xyz'}
+
+    expr = EqTrans(Assoc(x * z, x, y), Assoc(x, z, x * y))
+    equation = store.to_equation(expr.evaluate_in(store, context))
+    assert equation == MonoidEquation(((x * z) * x) * y, x * (z * (x * y)), True)
+
+    expr = EqTrans(Assoc(x, z, x * y), Assoc(x * z, x, y))
+    assert not expr.evaluate_in(store, context).valid
+
+    expr = EqSymm(LeftId(y))
+    assert store.to_equation(expr.evaluate_in(store, context)) == MonoidEquation(y, Id() * y, True)
+
+def test_check_derivation():
+    store = ProofStore()
+
+    steps = [
+        ('refl', x),                # 0: x = x
+        ('refl', y),                # 1: y = y
+        ('refl', z),                # 2: z = z
+        ('assoc', 0, 1, 2),         # 3: (x y) z = x (y z)
+        ('left_id', 2),             # 4: e z = z
+        ('mop', 0, 1),              # 5: x y = x y
+        ('mop', 5, 4),              # 6: (x y)(e z) = (x y) z
+        ('trans', 6, 3),            # 7: (x y)(e z) = x (y z)
+        ('trans', 3, 6),            # 8: invalid
+    ]
+
+    results = store.check_derivation(steps)
+    assert store.to_equation(results[7]) == MonoidEquation((x * y) * (Id() * z), x * (y * z), True)
+    assert not results[8].valid
+
+def test_check_long_derivation():
+    store = ProofStore()
+
+    steps = [('refl', x), ('refl', y), ('mop', 0, 1), ('symm', 2)]
+    for i in range(3, 50000):
+        steps.append(('trans', i, 2))
+
+    results = store.check_derivation(steps)
+    assert results[-1].valid
+    assert len(store.table) == 4  # Id(), x, y, and x * y
+
+def test_unknown_rule():
+    with pytest.raises(ValueError):
+        ProofStore().check_derivation([('magic', 0)])
@@ -0,0 +1,104 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import pytest
+
+from mathdonewrong.expressions import Literal, Oper, Var
+from mathdonewrong.monoidlike.monoids import Id, MonVar, Monoid, Mop
+from mathdonewrong.rewriting import RewriteSystem, Rule, orient
+from mathdonewrong.varieties import Relation
+
+x, y, z = MonVar('x'), MonVar('y'), MonVar('z')
+a, b, c = Var('a'), Var('b'), Var('c')
+
+def test_orient():
+    assert orient(Relation(Oper('Mop', Oper('Id'), a), a)) == Rule(Oper('Mop', Oper('Id'), a), a)
+    assert orient(Relation(a, Oper('Mop', Oper('Id'), a))) == Rule(Oper('Mop', Oper('Id'), a), a)
+
+    assoc = Relation(Oper('Mop', Oper('Mop', a, b), c), Oper('Mop', a, Oper('Mop', b, c)))
+    assert orient(assoc) == Rule(assoc.lhs, assoc.rhs)
+
+def test_orient_rejects_unorientable_relations():
+    assert orient(Relation(Oper('Mop', a, b), Oper('Mop', b, a))) is None
+    assert orient(Relation(Oper('F', a), Oper('G', b))) is None
+
+def test_monoid_rules():
+    system = RewriteSystem.from_algebra_class(Monoid)
+    assert len(system.rules) == 3
+    assert set(system.index) == {('Mop', 2)}
+
+def test_normalize_monoid_expression():
+    system = RewriteSystem.from_algebra_class(Monoid)
+
+    expr = Mop(Mop(Mop(x, Id()), Mop(Id(), y)), Mop(z, Id()))
+    assert system.normalize(expr) == Mop(x, Mop(y, z))
+    assert system.normalize(Mop(Id(), Id())) == Id()
+
+def test_normalize_keeps_expression_classes():
+    system = RewriteSystem.from_algebra_class(Monoid)
+
+    result = system.normalize(Mop(Mop(x, y), z))
+    assert isinstance(result, Mop)
+    assert isinstance(result.operands[1], Mop)
+
+def test_normalize_keeps_classes_with_the_same_name():
+    system = RewriteSystem.from_algebra_class(Monoid)
+    system.normalize(Mop(Mop(x, y), z))
+
+    result = system.normalize(Oper('Mop', Oper('Mop', a, b), c))
+    assert result == Mop(a, Mop(b, c))
+    assert type(result) is Oper
+    assert type(result.operands[1]) is Oper
+
+    result = system.normalize(Mop(Mop(z, y), x))
+    assert type(result) is Mop
+    assert type(result.operands[1]) is Mop
+
+def test_nonlinear_and_literal_rules():
+    system = RewriteSystem([
+        Rule(Oper('Sub', a, a), Literal(0)),
+        Rule(Oper('Add', a, Literal(0)), a),
+    ])
+
+    assert system.normalize(Oper('Add', x, Oper('Sub', y, y))) == x
+    assert system.normalize(Oper('Sub', x, y)) == Oper('Sub', x, y)
+
+def test_normalize_long_chain():
+    system = RewriteSystem.from_algebra_class(Monoid)
+
+    names = [f'x{i}' for i in range(3000)]
+    left_nested = MonVar(names[0])
+    for name in names[1:]:
+        left_nested = Mop(Mop(left_nested, Id()), MonVar(name))
+
+    result = system.normalize(left_nested)
+
+    for name in names[:-1]:
+        assert result.operands[0] == MonVar(name)
+        result = result.operands[1]
+    assert result == MonVar(names[-1])
+
+def test_normal_forms_are_remembered():
+    system = RewriteSystem.from_algebra_class(Monoid)
+    system.normalize(Mop(Mop(x, y), z))
+    table_size = len(system.table)
+
+    assert system.normalize(Mop(Mop(x, y), z)) == Mop(x, Mop(y, z))
+    assert len(system.table) == table_size
+
+def test_max_steps():
+    system = RewriteSystem([Rule(Oper('F', a), Oper('F', Oper('F', a)))])
+
+    with pytest.raises(ValueError):
+        system.normalize(Oper('F', x), max_steps=100)
+
+def test_bad_rules_are_rejected():
+    with pytest.raises(ValueError):
+        RewriteSystem([Rule(Oper('F', a), b)])
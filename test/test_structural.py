@@ -0,0 +1,123 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import pytest
+
+from mathdonewrong.monoidal_categories import AssocLeft, AssocRight, Braid, BraidInv, Compose, Diagonal, Drop, Id, Stack, Unit, UnitLeft, UnitLeftInv, UnitRight, UnitRightInv, Var
+from mathdonewrong.monoidal_categories import category_of_functions
+from mathdonewrong.monoidal_categories.category_of_functions import CategoryOfUnaryFunctions, PipelineCategory
+from mathdonewrong.monoidal_categories.make_braid import make_braid, vartree_to_set
+from mathdonewrong.monoidal_categories.structural import compile_structural, is_structural
+
+cat = CategoryOfUnaryFunctions()
+
+A, B, C = Var('A'), Var('B'), Var('C')
+context = {'A': int, 'B': int, 'C': int}
+
+def test_is_structural():
+    assert is_structural(Compose(Braid(A, B), Stack(Id(B), Drop(A))))
+    assert not is_structural(Compose(Braid(A, B), Var('f')))
+
+@pytest.mark.parametrize('expr, value', [
+    (Id(A), 1),
+    (AssocRight(A, B, C), ((1, 2), 3)),
+    (AssocLeft(A, B, C), (1, (2, 3))),
+    (UnitLeft(A), 1),
+    (UnitRight(A), 1),
+    (UnitLeftInv(A), (None, 1)),
+    (UnitRightInv(A), (1, None)),
+    (Braid(A, B), (1, 2)),
+    (BraidInv(A, B), (2, 1)),
+    (Drop(A), 1),
+    (Diagonal(A), 1),
+])
+def test_compile_single_arrow(expr, value):
+    assert compile_structural(expr)(value) == expr.evaluate_in(cat, context)(value)
+
+def test_compile_composite():
+    expr = Compose(
+        Compose(AssocRight(A, B, C), Stack(Id(A), Braid(B, C))),
+        Compose(AssocLeft(A, C, B), Stack(Diagonal(Stack(A, C)), Drop(B))))
+
+    compiled = compile_structural(expr)
+    assert compiled.domain == ((0, 1), 2)
+    assert compiled.codomain == (((0, 2), (0, 2)), None)
+    assert compiled.index_map == (0, 2, 0, 2, None)
+    assert compiled(((1, 2), 3)) == expr.evaluate_in(cat, context)(((1, 2), 3))
+
+def test_compile_make_braid():
+    domain = ((('a', 'b'), 'c'), ('d', 'e'))
+    codomain = (('e', ('a', 'c')), ('c', 'd'))
+    expr = make_braid(domain, codomain)
+
+    compiled = compile_structural(expr)
+    value = (((1, 2), 3), (4, 5))
+    objects = {name: int for name in vartree_to_set(domain)}
+    assert compiled(value) == expr.evaluate_in(cat, objects)(value) == ((5, (1, 3)), (3, 4))
+
+def test_compile_deeply_nested_object():
+    obj, value = A, 0
+    for i in range(250):
+        obj, value = Stack(A, obj), (i + 1, value)
+
+    expr = Braid(obj, A)
+    assert compile_structural(expr)((value, 'x')) == expr.evaluate_in(cat, context)((value, 'x')) == ('x', value)
+
+def test_compile_long_make_braid():
+    names = [f'v{i}' for i in range(300)]
+    domain = codomain = None
+    for name in names:
+        domain = name if domain is None else (name, domain)
+    for name in reversed(names):
+        codomain = name if codomain is None else (name, codomain)
+
+    value, expected = 0, 299
+    for i in range(1, 300):
+        value, expected = (i, value), (299 - i, expected)
+
+    assert compile_structural(make_braid(domain, codomain))(value) == expected
+
+def test_apply_columns():
+    compiled = compile_structural(Compose(Braid(A, B), UnitRight(Stack(B, A))))
+
+    xs, ys = [1, 2, 3], [4, 5, 6]
+    assert compiled.apply_columns([xs, ys]) == [ys, xs, None]
+    assert list(compiled.apply_all([(1, 4), (2, 5)])) == [((4, 1), None), ((5, 2), None)]
+
+def test_compile_rejects_mismatched_parts():
+    with pytest.raises(ValueError):
+        compile_structural(Compose(Id(A), Braid(B, C)))
+
+def test_compile_rejects_nonstructural():
+    with pytest.raises(ValueError):
+        compile_structural(Compose(Braid(A, B), Var('f')))
+
+def test_pipeline_category_compiles_structural_runs():
+    pipeline_cat = PipelineCategory()
+    expr = Compose(Compose(Diagonal(A), Stack(Var('f'), Id(A))), Compose(UnitRight(Stack(A, A)), AssocRight(A, A, Unit())))
+
+    func = pipeline_cat.evaluate(expr, {'A': int, 'f': lambda x: x * 3})
+    assert func(5) == (15, (5, None))
+    assert len(func.funcs) == 3
+
+@pytest.mark.parametrize('compiles', [True, False])
+def test_pipeline_category_deep_structural_chain(monkeypatch, compiles):
+    if not compiles:
+        def fail(expr):
+            raise SyntaxError("too many nested parentheses")
+        monkeypatch.setattr(category_of_functions, 'compile_structural', fail)
+
+    obj, value = A, 0
+    for i in range(250):
+        obj, value = Stack(A, obj), (i + 1, value)
+
+    expr = Compose(Braid(obj, A), Compose(Var('f'), BraidInv(obj, A)))
+    objects = {'A': int, 'f': lambda t: (t[0] * 2, t[1])}
+    assert PipelineCategory().evaluate(expr, objects)((value, 3)) == expr.evaluate_in(cat, objects)((value, 3))
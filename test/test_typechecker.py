@@ -0,0 +1,95 @@
+# Copyright 2024 Tanner Swett.
+#
+# This file is part of mathdonewrong. mathdonewrong is free software: you can
+# redistribute it and/or modify it under the terms of version 3 of the GNU GPL
+# as published by the Free Software Foundation.
+#
+# mathdonewrong is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See version 3 of the GNU GPL for more details.
+
+import pytest
+
+from mathdonewrong.monoidal_categories import AssocLeft, AssocRight, Braid, Compose, Const, Curry, CurryInv, Diagonal, Drop, Exp, Id, Into, Literal, Stack, Unit, UnitLeft, UnitLeftInv, Var
+from mathdonewrong.monoidal_categories.make_braid import make_braid
+from mathdonewrong.monoidal_categories.typechecker import ArrowType, TypeChecker, TypingCategory, typecheck
+
+A, B, C = Var('A'), Var('B'), Var('C')
+f, g = Var('f'), Var('g')
+
+def test_structural_types():
+    assert typecheck(Id(A)) == ArrowType(A, A)
+    assert typecheck(AssocRight(A, B, C)) == ArrowType(Stack(Stack(A, B), C), Stack(A, Stack(B, C)))
+    assert typecheck(AssocLeft(A, B, C)) == ArrowType(Stack(A, Stack(B, C)), Stack(Stack(A, B), C))
+    assert typecheck(UnitLeft(A)) == ArrowType(A, Stack(Unit(), A))
+    assert typecheck(Drop(A)) == ArrowType(A, Unit())
+    assert typecheck(Diagonal(A)) == ArrowType(A, Stack(A, A))
+
+def test_compose_and_stack():
+    context = {'f': ArrowType(A, B), 'g': ArrowType(B, C)}
+
+    assert typecheck(Compose(f, g), context) == ArrowType(A, C)
+    assert typecheck(Stack(f, g), context) == ArrowType(Stack(A, B), Stack(B, C))
+    assert typecheck(Compose(Diagonal(A), Stack(f, Id(A))), context) == ArrowType(A, Stack(B, A))
+
+def test_closed_structure():
+    context = {'f': ArrowType(Stack(A, B), C), 'g': ArrowType(B, C)}
+
+    assert typecheck(Curry(f), context) == ArrowType(A, Exp(B, C))
+    assert typecheck(CurryInv(Curry(f)), context) == ArrowType(Stack(A, B), C)
+    assert typecheck(Into(A, g), context) == ArrowType(Exp(A, B), Exp(A, C))
+
+def test_const():
+    assert typecheck(Const(A, Literal(5))) == ArrowType(Unit(), A)
+    assert typecheck(Compose(Const(A, Literal(5)), Diagonal(A))) == ArrowType(Unit(), Stack(A, A))
+
+def test_mismatched_compose():
+    with pytest.raises(TypeError, match="can't compose"):
+        typecheck(Compose(Braid(A, B), Braid(A, B)))
+
+def test_mismatches_are_reported_deep_inside():
+    context = {'f': ArrowType(A, B)}
+    expr = Stack(Id(C), Compose(Compose(f, f), Id(B)))
+
+    with pytest.raises(TypeError, match=r"in Compose\(f, f\)"):
+        typecheck(expr, context)
+
+def test_wrong_kinds():
+    with pytest.raises(TypeError):
+        typecheck(Curry(Id(A)))
+    with pytest.raises(TypeError):
+        typecheck(UnitLeftInv(A), {'A': ArrowType(A, A)})
+    with pytest.raises(TypeError):
+        typecheck(Compose(A, Id(A)))
+
+def test_make_braid_is_well_typed():
+    domain = ((('a', 'b'), 'c'), ('d', 'e'))
+    codomain = (('e', ('a', 'c')), ('c', None))
+
+    expr = make_braid(domain, codomain)
+    assert typecheck(expr) == ArrowType(
+        Stack(Stack(Stack(Var('a'), Var('b')), Var('c')), Stack(Var('d'), Var('e'))),
+        Stack(Stack(Var('e'), Stack(Var('a'), Var('c'))), Stack(Var('c'), Unit())))
+
+def test_types_are_not_kept_by_default():
+    checker = TypeChecker({'f': ArrowType(A, A)})
+    assert checker.infer(Compose(f, f)) == ArrowType(A, A)
+    assert checker.types == {}
+
+def test_types_are_remembered():
+    checker = TypeChecker({'f': ArrowType(A, A)}, remember=True)
+    expr = f
+    for _ in range(5000):
+        expr = Compose(expr, f)
+
+    assert checker.infer(expr) == ArrowType(A, A)
+    assert len(checker.types) == 5001
+
+    # Checking a bigger expression only needs to look at the new nodes.
+    bigger = Stack(expr, expr)
+    assert checker.infer(bigger) == ArrowType(Stack(A, A), Stack(A, A))
+    assert len(checker.types) == 5002
+
+def test_evaluate_in_typing_category():
+    expr = Compose(Braid(A, B), Stack(Id(B), Drop(A)))
+    assert expr.evaluate_in(TypingCategory(), {'A': A, 'B': B}) == ArrowType(Stack(A, B), Stack(B, Unit()))